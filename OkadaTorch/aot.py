@@ -0,0 +1,242 @@
+import os
+import json
+import warnings
+import torch
+from .functional import okada, param_names
+
+
+KERNELS = {
+    # name: (model, with z)
+    "SPOINT": ("point", False),
+    "SRECTF": ("rectangle", False),
+    "DC3D0":  ("point", True),
+    "DC3D":   ("rectangle", True),
+}
+BACKENDS = ("aoti", "export")
+MANIFEST = "manifest.json"
+
+
+
+
+def kernel_name(model:str, has_z:bool):
+    """
+    Name of the kernel used for a source model, with or without `z`.
+    """
+    for name, key in KERNELS.items():
+        if key == (model, has_z):
+            return name
+    raise ValueError("'model' must be either 'point' or 'rectangle'.")
+
+
+
+def artifact_name(kernel:str, compute_strain:bool, is_degree:bool, fault_origin:str,
+                  dtype=torch.float64, device:str="cpu", backend:str="export"):
+    """
+    File name of a compiled variant in the cache directory.
+
+    All static arguments of the forward computation are encoded in the name,
+    so that one file holds exactly one variant.
+    """
+    assert kernel in KERNELS, f"'kernel' must be one of {', '.join(KERNELS)}."
+    assert backend in BACKENDS, f"'backend' must be one of {', '.join(BACKENDS)}."
+    if KERNELS[kernel][0] == "point":
+        fault_origin = "any"   # ignored for a point source
+    return "-".join([
+        kernel,
+        "strain" if compute_strain else "disp",
+        "deg" if is_degree else "rad",
+        fault_origin,
+        str(dtype).replace("torch.", ""),
+        str(torch.device(device).type),
+        backend,
+    ]) + ".pt2"
+
+
+
+class _Kernel(torch.nn.Module):
+    """
+    One variant of the forward computation as a module to be exported.
+
+    Inputs are a single source `theta` (n_params,), Poisson's ratio `nu` (0-dim tensor)
+    and 1D station coordinates of dynamic length. Output has shape (n_out, n).
+    """
+    def __init__(self, kernel:str, compute_strain:bool, is_degree:bool, fault_origin:str):
+        super().__init__()
+        self.model, self.has_z = KERNELS[kernel]
+        self.compute_strain = compute_strain
+        self.is_degree = is_degree
+        self.fault_origin = fault_origin
+
+    def forward(self, theta, nu, x, y, z=None):
+        return okada(
+            theta, x, y, z, self.model,
+            self.compute_strain, self.is_degree, self.fault_origin, nu
+        )
+
+
+
+
+def build(cache_dir:str, kernels=tuple(KERNELS), compute_strain=(True, False), is_degree=(True,),
+          fault_origin=("topleft",), dtype=torch.float64, device:str="cpu", backend:str="aoti",
+          inductor_configs:dict=None, verbose:bool=False):
+    """
+    Export compiled variants of `SPOINT`, `SRECTF`, `DC3D0` and `DC3D` to an on-disk cache.
+
+    Every combination of `kernels`, `compute_strain`, `is_degree` and `fault_origin` is
+    exported once with `torch.export` with a dynamic station dimension,
+    so that one artifact serves any number of stations (>= 2) and any Poisson's ratio.
+    This is meant to be run once per environment (e.g. in a build step),
+    and the cache is then loaded by `OkadaWrapper(cache_dir=...)` without recompiling.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Output directory. Created if it does not exist.
+    kernels : tuple of str, default all kernels
+        Subset of "SPOINT", "SRECTF", "DC3D0" and "DC3D".
+    compute_strain, is_degree : tuple of bool, default (True, False) and (True,)
+        Values of the flags to be exported.
+    fault_origin : tuple of str, default ("topleft",)
+        Values of `fault_origin` to be exported (ignored for a point source).
+    dtype : torch.dtype, default torch.float64
+        Data type of inputs and outputs.
+    device : str, default "cpu"
+        Device of inputs and outputs.
+    backend : str, default "aoti"
+        If "aoti", the exported graph is compiled by AOTInductor into a shared library
+        (fastest to load and to run, requires a working C++ compiler; inference only).
+        If "export", the exported graph is saved as is
+        (portable, no compiler required, supports autograd).
+    inductor_configs : dict, default None
+        Options passed to AOTInductor (e.g. `{"cpp.simdlen": 1}`).
+    verbose : bool, default False
+        Print each artifact as it is written.
+
+    Returns
+    -------
+    list of str
+        Paths of the written artifacts.
+    """
+
+    assert backend in BACKENDS, f"'backend' must be one of {', '.join(BACKENDS)}."
+    os.makedirs(cache_dir, exist_ok=True)
+
+    manifest_path = os.path.join(cache_dir, MANIFEST)
+    manifest = {"torch": torch.__version__, "artifacts": {}}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            old = json.load(f)
+        if old.get("torch") == torch.__version__:
+            manifest = old
+
+    n = torch.export.Dim("n", min=2)
+    paths = []
+    for kernel in kernels:
+        model, has_z = KERNELS[kernel]
+        origins = ("any",) if model == "point" else fault_origin
+        for cs in compute_strain:
+            for deg in is_degree:
+                for fo in origins:
+                    name = artifact_name(kernel, cs, deg, fo, dtype, device, backend)
+                    path = os.path.join(cache_dir, name)
+
+                    # example inputs (values are irrelevant except for avoiding singular points)
+                    theta = torch.ones(len(param_names(model)), dtype=dtype, device=device)
+                    nu = torch.tensor(0.25, dtype=dtype, device=device)
+                    x = torch.linspace(1.0, 2.0, 8, dtype=dtype, device=device)
+                    args = (theta, nu, x, x.flip(0)) + ((-x,) if has_z else ())
+                    dynamic_shapes = ({}, {}, {0: n}, {0: n}) + (({0: n},) if has_z else ())
+
+                    ep = torch.export.export(
+                        _Kernel(kernel, cs, deg, "topleft" if fo == "any" else fo),
+                        args, dynamic_shapes=dynamic_shapes
+                    )
+                    if backend == "aoti":
+                        torch._inductor.aoti_compile_and_package(
+                            ep, package_path=path, inductor_configs=inductor_configs
+                        )
+                    else:
+                        torch.export.save(ep, path)
+
+                    manifest["artifacts"][name] = {
+                        "kernel": kernel, "compute_strain": cs, "is_degree": deg,
+                        "fault_origin": fo, "dtype": str(dtype), "device": str(torch.device(device).type),
+                        "backend": backend,
+                    }
+                    with open(manifest_path, "w") as f:
+                        json.dump(manifest, f, indent=1)
+                    paths.append(path)
+                    if verbose:
+                        print(f"wrote {path}")
+
+    return paths
+
+
+
+
+class KernelCache:
+    """
+    Index of the compiled variants in a cache directory written by `build`.
+
+    Artifacts are loaded lazily on first use and kept in memory afterwards.
+    If both backends exist for a variant, the AOTInductor one is preferred.
+    Artifacts built with another version of PyTorch are ignored with a warning.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory written by `build`.
+    """
+    def __init__(self, cache_dir:str):
+        self.cache_dir = cache_dir
+        self.names = set()
+        self._loaded = {}
+
+        manifest_path = os.path.join(cache_dir, MANIFEST)
+        if not os.path.exists(manifest_path):
+            warnings.warn(f"no kernel cache in '{cache_dir}'; falling back to eager computation.")
+            return
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("torch") != torch.__version__:
+            warnings.warn(
+                f"kernel cache in '{cache_dir}' was built with torch {manifest.get('torch')} "
+                f"(running {torch.__version__}); falling back to eager computation."
+            )
+            return
+        self.names = {name for name in manifest["artifacts"]
+                      if os.path.exists(os.path.join(cache_dir, name))}
+
+
+    def lookup(self, model:str, has_z:bool, compute_strain:bool, is_degree:bool, fault_origin:str,
+               dtype, device):
+        """
+        Return the compiled variant as a callable
+        `f(theta, nu, x, y[, z]) -> Tensor (n_out, n)`, or None if it is not in the cache.
+        """
+        kernel = kernel_name(model, has_z)
+        for backend in BACKENDS:
+            name = artifact_name(kernel, compute_strain, is_degree, fault_origin, dtype, device, backend)
+            if name in self._loaded:
+                return self._loaded[name]
+            if name in self.names:
+                path = os.path.join(self.cache_dir, name)
+                if backend == "aoti":
+                    fn = torch._inductor.aoti_load_package(path)
+                else:
+                    fn = torch.export.load(path).module()
+                self._loaded[name] = fn
+                return fn
+        return None
+
+
+    def __len__(self):
+        return len(self.names)
+
+
+
+def load(cache_dir:str):
+    """
+    Open a cache directory written by `build` (see `KernelCache`).
+    """
+    return KernelCache(cache_dir)
@@ -0,0 +1,220 @@
+import math
+import torch
+from .okadawrapper import OkadaWrapper
+
+
+
+
+def stress_tensor(out, mu, nu:float=0.25):
+    """
+    Convert displacement gradients into the stress tensor (Hooke's law).
+
+    Parameters
+    ----------
+    out : list of torch.Tensor
+        Output of `OkadaWrapper.compute` with `compute_strain=True`:
+        [ux, uy, uz, uxx, uyx, uzx, uxy, uyy, uzy, uxz, uyz, uzz]
+    mu : float or torch.Tensor
+        Shear modulus. The unit of the stress is (unit of mu) * (unit of strain).
+    nu : float, default 0.25
+        Poisson's ratio.
+
+    Returns
+    -------
+    torch.Tensor
+        Stress tensor (tension positive) in the east-north-up coordinate.
+        Shape (..., 3, 3), where (...) is the shape of each tensor of `out`.
+    """
+
+    assert len(out) == 12, "displacement gradients are required (compute_strain=True)."
+
+    # G[..., i, j] = d(u_i)/d(x_j)
+    G = torch.stack(out[3:], dim=-1).reshape(*out[3].shape, 3, 3).transpose(-1, -2)
+    E = 0.5 * (G + G.transpose(-1, -2))
+
+    lam = 2.0 * mu * nu / (1.0 - 2.0 * nu)
+    tr = E.diagonal(dim1=-2, dim2=-1).sum(-1)
+    I = torch.eye(3, dtype=E.dtype, device=E.device)
+
+    return lam * tr[..., None, None] * I + 2.0 * mu * E
+
+
+
+def receiver_vectors(strike, dip, rake, is_degree:bool=True):
+    """
+    Unit normal and slip vectors of receiver faults.
+
+    Parameters
+    ----------
+    strike, dip, rake : torch.Tensor
+        Orientation of receiver faults. Same convention as the source parameters.
+    is_degree : bool, default True
+        Flag if angles are in degree or not (= in radian).
+
+    Returns
+    -------
+    n, l : torch.Tensor
+        Normal vector pointing to the hanging wall and slip vector
+        (motion of the hanging wall relative to the footwall)
+        in the east-north-up coordinate. Shape (..., 3).
+    """
+
+    strike, dip, rake = torch.broadcast_tensors(strike, dip, rake)
+    if is_degree:
+        strike, dip, rake = torch.deg2rad(strike), torch.deg2rad(dip), torch.deg2rad(rake)
+
+    ss, cs = torch.sin(strike), torch.cos(strike)
+    sd, cd = torch.sin(dip), torch.cos(dip)
+    sr, cr = torch.sin(rake), torch.cos(rake)
+    zero = torch.zeros_like(ss)
+
+    s = torch.stack([ss, cs, zero], dim=-1)                    # along strike
+    d = torch.stack([cd * cs, -cd * ss, -sd], dim=-1)           # down dip
+    n = torch.linalg.cross(d, s)
+    l = cr[..., None] * s - sr[..., None] * d
+
+    return n, l
+
+
+
+def _resolve(S, n, l, friction):
+    """
+    Resolve stress on planes with normal `n` in the slip direction `l`.
+    """
+    t = (S @ n[..., None])[..., 0]
+    normal = (n * t).sum(-1)
+    shear = (l * t).sum(-1)
+    return [shear + friction * normal, shear, normal]
+
+
+
+def _optimal(S, friction, regional_stress):
+    """
+    Coulomb stress change on optimally oriented planes.
+    """
+    if regional_stress is None:
+        # maximum over all orientations of the stress change itself
+        w = torch.linalg.eigvalsh(S)
+        c = 0.5 * (w[..., 2] + w[..., 0])
+        R = 0.5 * (w[..., 2] - w[..., 0])
+        k = (1.0 + friction**2) ** 0.5
+        shear = R / k
+        normal = c + R * friction / k
+        return [shear + friction * normal, shear, normal]
+
+    # planes optimally oriented in the total (regional + change) stress field
+    T = S + regional_stress
+    _, V = torch.linalg.eigh(T)
+    v1, v3 = V[..., 0], V[..., 2]   # most and least compressive axes
+    beta = 0.5 * math.atan2(1.0, friction)     # pi/4 for friction=0
+
+    best = None
+    for sign in [1.0, -1.0]:
+        n = math.sin(beta) * v1 + sign * math.cos(beta) * v3
+        tau = (T @ n[..., None])[..., 0]
+        tau = tau - (n * tau).sum(-1, keepdim=True) * n
+        l = tau / torch.linalg.vector_norm(tau, dim=-1, keepdim=True)
+        res = _resolve(S, n, l, friction)
+        if best is None:
+            best = res
+        else:
+            mask = res[0] > best[0]
+            best = [torch.where(mask, r, b) for r, b in zip(res, best)]
+    return best
+
+
+
+def coulomb(coords:dict, params:dict, receiver_strike=None, receiver_dip=None, receiver_rake=None,
+            mu=3.0e10, nu:float=0.25, friction:float=0.4, optimal:bool=False, regional_stress=None,
+            chunk_size:int=2**18, is_degree:bool=True, fault_origin:str="topleft", okada=None):
+    """
+    Coulomb failure stress change (ΔCFS) on receiver faults.
+
+    Displacement gradients, stress, resolved shear/normal stress and ΔCFS
+    are computed chunk by chunk, so that only `chunk_size` stations
+    are held in memory at once.
+
+    Parameters
+    ----------
+    coords : dict of torch.Tensor
+        Same as that of `OkadaWrapper.compute`.
+    params : dict of torch.Tensor
+        Same as that of `OkadaWrapper.compute`.
+    receiver_strike, receiver_dip, receiver_rake : torch.Tensor, default None
+        Orientation of receiver faults. Each value must be a scalar tensor
+        or a tensor broadcastable to the shape of `coords["x"]` (per-point orientations).
+        Ignored if `optimal` is `True`.
+    mu : float or torch.Tensor, default 3.0e10
+        Shear modulus.
+    nu : float, default 0.25
+        Poisson's ratio.
+    friction : float, default 0.4
+        Effective friction coefficient.
+    optimal : bool, default False
+        If `True`, ΔCFS is computed on optimally oriented planes.
+        Without `regional_stress`, this is the maximum ΔCFS over all orientations.
+        With `regional_stress`, planes are optimally oriented in the total stress field
+        (regional + change), and the larger value of the two conjugate planes is taken.
+    regional_stress : torch.Tensor, default None
+        Regional stress tensor (tension positive). Shape (3, 3)
+        or broadcastable to (..., 3, 3).
+    chunk_size : int, default 2**18
+        Number of stations evaluated at once.
+    is_degree : bool, default True
+        Flag if angles are in degree or not (= in radian).
+    fault_origin : str, default "topleft"
+        Same as that of `OkadaWrapper.compute`.
+    okada : OkadaWrapper, default None
+        Instance used for the forward computation. If None, a new one is created.
+
+    Returns
+    -------
+    list of torch.Tensor
+        [cfs, shear, normal]
+        Coulomb stress change, shear stress change in the slip direction
+        and normal stress change (unclamping positive).
+        The shape of each tensor is same as that of `coords["x"]`.
+    """
+
+    assert ("x" in coords) and ("y" in coords), "'coords' requires 'x' and 'y'."
+    if not optimal:
+        assert (receiver_strike is not None) and (receiver_dip is not None) and (receiver_rake is not None), \
+            "'receiver_strike', 'receiver_dip' and 'receiver_rake' are required unless 'optimal' is True."
+
+    if okada is None:
+        okada = OkadaWrapper()
+
+    shape = coords["x"].shape
+    flat = {k: coords[k].reshape(-1) for k in ["x", "y", "z"] if k in coords}
+    n_station = flat["x"].numel()
+
+    if not optimal:
+        rs, rd, rr = [torch.broadcast_to(torch.as_tensor(r), shape).reshape(-1)
+                      for r in [receiver_strike, receiver_dip, receiver_rake]]
+    if regional_stress is not None and regional_stress.dim() > 2:
+        regional_stress = torch.broadcast_to(regional_stress, (*shape, 3, 3)).reshape(-1, 3, 3)
+
+
+    cfs, shear, normal = [], [], []
+    for i in range(0, n_station, chunk_size):
+        sl = slice(i, i + chunk_size)
+        out = okada.compute(
+            {k: v[sl] for k, v in flat.items()}, params,
+            compute_strain=True, is_degree=is_degree, fault_origin=fault_origin, nu=nu
+        )
+        S = stress_tensor(out, mu, nu)
+
+        if optimal:
+            rst = regional_stress
+            if rst is not None and rst.dim() > 2:
+                rst = rst[sl]
+            res = _optimal(S, friction, rst)
+        else:
+            n, l = receiver_vectors(rs[sl], rd[sl], rr[sl], is_degree)
+            res = _resolve(S, n.to(S.dtype), l.to(S.dtype), friction)
+
+        cfs.append(res[0])
+        shear.append(res[1])
+        normal.append(res[2])
+
+    return [torch.cat(v).reshape(shape) for v in [cfs, shear, normal]]
@@ -0,0 +1,283 @@
+import torch
+from typing import NamedTuple
+
+
+
+
+class Downsampled(NamedTuple):
+    """
+    Result of quadtree downsampling.
+
+    Attributes
+    ----------
+    x, y : torch.Tensor
+        Mean coordinates of the valid pixels in each leaf. Shape (n,).
+    values : torch.Tensor
+        Mean observed value in each leaf. Shape (n,).
+    weights : torch.Tensor
+        Number of valid pixels in each leaf. Shape (n,).
+    labels : torch.Tensor (long)
+        Index of the leaf each pixel belongs to. Same shape as the input grid.
+        Pixels that are not used (NaN/Inf) are labelled -1.
+    blocks : torch.Tensor (long)
+        Row, column and size of each leaf block: [i0, j0, size]. Shape (n, 3).
+    """
+    x: torch.Tensor
+    y: torch.Tensor
+    values: torch.Tensor
+    weights: torch.Tensor
+    labels: torch.Tensor
+    blocks: torch.Tensor
+
+
+
+
+def _integral(a):
+    """
+    Summed-area table of a 2D tensor, padded with a leading row and column of zeros.
+    """
+    I = torch.zeros((a.shape[0] + 1, a.shape[1] + 1), dtype=a.dtype, device=a.device)
+    I[1:, 1:] = a.cumsum(0).cumsum(1)
+    return I
+
+
+
+def _block_sum(I, i0, j0, i1, j1):
+    """
+    Sum over the blocks [i0:i1, j0:j1] using a summed-area table.
+    """
+    return I[i1, j1] - I[i0, j1] - I[i1, j0] + I[i0, j0]
+
+
+
+def quadtree(x, y, values, threshold, min_size:int=1, max_size:int=None, score=None):
+    """
+    Downsample a dense 2D grid (e.g. an interferogram) with a quadtree.
+
+    Blocks are split recursively into four children while the split criterion is satisfied.
+    If `score` is not given, a block is split when the variance of `values` in it exceeds `threshold`
+    (variance-based quadtree).
+    If `score` is given, a block is split when the sum of `score` in it exceeds `threshold`
+    (e.g. model resolution computed by `model_resolution`).
+
+    All blocks of a level are evaluated at once using summed-area tables,
+    so the cost is O(number of pixels) plus O(number of blocks) per level.
+
+    Parameters
+    ----------
+    x, y : torch.Tensor
+        Coordinates of the pixels. Shape (H, W).
+    values : torch.Tensor
+        Observed values (LOS displacement, etc.). Shape (H, W).
+        NaN or Inf marks pixels to be ignored.
+    threshold : float
+        Threshold of the split criterion.
+    min_size : int, default 1
+        Blocks of this size (in pixels) are never split.
+    max_size : int, default None
+        Size of the initial blocks. Must be a power of 2.
+        If None, the smallest power of 2 covering the grid is used.
+    score : torch.Tensor, default None
+        Per-pixel score used as the split criterion instead of the variance. Shape (H, W).
+
+    Returns
+    -------
+    Downsampled
+        Representative points, weights and the index mapping.
+    """
+
+    assert values.dim() == 2, "'values' must be a 2D tensor."
+    assert x.shape == y.shape == values.shape, "shape of x, y and values must be same."
+    if score is not None:
+        assert score.shape == values.shape, "shape of score and values must be same."
+
+    H, W = values.shape
+    device = values.device
+    dtype = torch.float64
+
+    if max_size is None:
+        max_size = 1
+        while max_size < max(H, W):
+            max_size *= 2
+    assert max_size & (max_size - 1) == 0, "'max_size' must be a power of 2."
+
+
+    # ---- 1. summed-area tables ----
+    valid = torch.isfinite(values)
+    v = torch.where(valid, values, 0.0).to(dtype)
+    N  = _integral(valid.to(dtype))
+    S  = _integral(v)
+    S2 = _integral(v**2)
+    SX = _integral(torch.where(valid, x, 0.0).to(dtype))
+    SY = _integral(torch.where(valid, y, 0.0).to(dtype))
+    if score is not None:
+        SC = _integral(torch.where(valid, score, 0.0).to(dtype))
+
+
+    # ---- 2. split level by level ----
+    i0, j0 = torch.meshgrid(
+        torch.arange(0, H, max_size, device=device),
+        torch.arange(0, W, max_size, device=device),
+        indexing="ij"
+    )
+    i0, j0 = i0.flatten(), j0.flatten()
+    size = max_size
+
+    levels = []
+    while i0.numel() > 0:
+        i1 = torch.clamp(i0 + size, max=H)
+        j1 = torch.clamp(j0 + size, max=W)
+
+        n = _block_sum(N, i0, j0, i1, j1)
+        keep = n > 0
+        i0, j0, i1, j1, n = i0[keep], j0[keep], i1[keep], j1[keep], n[keep]
+
+        s = _block_sum(S, i0, j0, i1, j1)
+        if score is None:
+            mean = s / n
+            var = _block_sum(S2, i0, j0, i1, j1) / n - mean**2
+            split = var > threshold
+        else:
+            split = _block_sum(SC, i0, j0, i1, j1) > threshold
+        if size <= min_size or size == 1:
+            split = torch.zeros_like(split)
+
+        leaf = ~split
+        levels.append((
+            size, i0[leaf], j0[leaf], n[leaf], s[leaf],
+            _block_sum(SX, i0[leaf], j0[leaf], i1[leaf], j1[leaf]),
+            _block_sum(SY, i0[leaf], j0[leaf], i1[leaf], j1[leaf]),
+        ))
+
+        half = size // 2
+        i0 = torch.cat([i0[split], i0[split] + half, i0[split], i0[split] + half])
+        j0 = torch.cat([j0[split], j0[split], j0[split] + half, j0[split] + half])
+        inside = (i0 < H) & (j0 < W)
+        i0, j0 = i0[inside], j0[inside]
+        size = half
+
+
+    # ---- 3. gather leaves and paint the index mapping ----
+    ii, jj = torch.meshgrid(
+        torch.arange(H, device=device), torch.arange(W, device=device), indexing="ij"
+    )
+    labels = torch.full((H, W), -1, dtype=torch.long, device=device)
+
+    out_x, out_y, out_v, out_w, out_b = [], [], [], [], []
+    offset = 0
+    for size, i0, j0, n, s, sx, sy in levels:
+        m = i0.numel()
+        if m == 0:
+            continue
+        coarse = torch.full(
+            ((H + size - 1) // size, (W + size - 1) // size), -1, dtype=torch.long, device=device
+        )
+        coarse[i0 // size, j0 // size] = torch.arange(offset, offset + m, device=device)
+        lab = coarse[ii // size, jj // size]
+        labels = torch.where(lab >= 0, lab, labels)
+
+        out_x.append(sx / n)
+        out_y.append(sy / n)
+        out_v.append(s / n)
+        out_w.append(n)
+        out_b.append(torch.stack([i0, j0, torch.full_like(i0, size)], dim=1))
+        offset += m
+
+    labels = torch.where(valid, labels, -1)
+
+    return Downsampled(
+        x=torch.cat(out_x).to(x.dtype),
+        y=torch.cat(out_y).to(y.dtype),
+        values=torch.cat(out_v).to(values.dtype),
+        weights=torch.cat(out_w).to(values.dtype),
+        labels=labels,
+        blocks=torch.cat(out_b),
+    )
+
+
+
+def aggregate(field, labels, n:int):
+    """
+    Average a per-pixel field over the leaves of a quadtree.
+
+    This is useful to reduce other per-pixel quantities
+    (LOS unit vectors, a second interferogram with the same mask, etc.)
+    with the same index mapping.
+
+    Parameters
+    ----------
+    field : torch.Tensor
+        Per-pixel field. Shape (..., H, W).
+    labels : torch.Tensor (long)
+        Index mapping returned by `quadtree`. Shape (H, W).
+    n : int
+        Number of leaves.
+
+    Returns
+    -------
+    torch.Tensor
+        Leaf averages. Shape (..., n).
+    """
+
+    assert field.shape[-2:] == labels.shape, "last two dims of field must match labels."
+
+    lead = field.shape[:-2]
+    f = field.reshape(-1, labels.numel())
+    lab = labels.flatten()
+    used = lab >= 0
+    f, lab = f[:, used], lab[used]
+
+    total = torch.zeros((f.shape[0], n), dtype=f.dtype, device=f.device).index_add_(1, lab, f)
+    count = torch.zeros(n, dtype=f.dtype, device=f.device).index_add_(0, lab, torch.ones_like(lab, dtype=f.dtype))
+
+    return (total / count).reshape(*lead, n)
+
+
+
+def model_resolution(okada, coords:dict, params:dict, args:list, los=None,
+                     is_degree:bool=True, fault_origin:str="topleft", nu:float=0.25):
+    """
+    Per-pixel sensitivity of the forward model to the source parameters,
+    to be used as `score` of `quadtree`.
+
+    The Jacobian is computed by `OkadaWrapper.gradient` (displacements only).
+    For each parameter in `args`, the absolute sensitivity is normalised by its maximum over the grid
+    so that parameters with different units contribute equally, and the contributions are summed.
+
+    Parameters
+    ----------
+    okada : OkadaWrapper
+        Instance of `OkadaWrapper`.
+    coords : dict of torch.Tensor
+        Same as that of `OkadaWrapper.compute`. Each value has shape (H, W).
+    params : dict of torch.Tensor
+        Same as that of `OkadaWrapper.compute`.
+    args : list of str
+        Names of the parameters (keys of `params`).
+    los : torch.Tensor, default None
+        Unit vectors (east, north, up) of the line of sight. Shape (3, H, W).
+        If None, the norm of the displacement sensitivity is used.
+    is_degree, fault_origin, nu
+        Same as those of `OkadaWrapper.compute`.
+
+    Returns
+    -------
+    torch.Tensor
+        Per-pixel score. Shape (H, W).
+    """
+
+    score = torch.zeros_like(coords["x"])
+    for arg in args:
+        assert arg in params, f"Invalid arg is specified: '{arg}'."
+        gx, gy, gz = okada.gradient(
+            coords, params, arg,
+            compute_strain=False, is_degree=is_degree, fault_origin=fault_origin, nu=nu
+        )
+        if los is None:
+            g = torch.sqrt(gx**2 + gy**2 + gz**2)
+        else:
+            g = torch.abs(los[0] * gx + los[1] * gy + los[2] * gz)
+        g = torch.where(torch.isfinite(g), g, 0.0)
+        score = score + g / torch.clamp(g.max(), min=torch.finfo(g.dtype).tiny)
+
+    return score
@@ -0,0 +1,292 @@
+import torch
+from typing import NamedTuple
+from .functional import okada, param_names, infer_model
+
+
+
+
+class EnsembleResult(NamedTuple):
+    """
+    Result of `eki` or `esmda`.
+
+    Attributes
+    ----------
+    ensemble : torch.Tensor
+        Final ensemble of parameters. Shape (n_members, n_params).
+    mean : torch.Tensor
+        Ensemble mean. Shape (n_params,).
+    misfit : torch.Tensor
+        Weighted misfit sum w (d - G(mean))^2 of the ensemble mean before each update and at the end.
+        Shape (n_updates + 1,).
+    n_forward : int
+        Number of forward evaluations (ensemble members times calls).
+    """
+    ensemble: torch.Tensor
+    mean: torch.Tensor
+    misfit: torch.Tensor
+    n_forward: int
+
+
+
+
+def okada_forward(coords:dict, params:dict, names, los=None,
+                  is_degree:bool=True, fault_origin:str="topleft", nu:float=0.25):
+    """
+    Batched forward model of the displacements for an ensemble of some source parameters.
+
+    Parameters
+    ----------
+    coords : dict of torch.Tensor
+        Same as that of `OkadaWrapper.compute`.
+    params : dict of float or torch.Tensor
+        Values of the source parameters that are not in `names`.
+    names : sequence of str
+        Names of the parameters in the columns of the ensemble.
+    los : torch.Tensor, default None
+        Unit vectors (east, north, up) of the line of sight. Shape (3, *x.shape).
+    is_degree, fault_origin, nu
+        Same as those of `OkadaWrapper.compute`.
+
+    Returns
+    -------
+    callable
+        Function mapping an ensemble of shape (n_members, len(names)) to predictions of shape
+        (n_members, n_obs), with n_obs = 3 * n_stations (ordered as `torch.stack([ux, uy, uz]).flatten()`)
+        or n_stations with `los`, in one call of `OkadaTorch.functional.okada`.
+        Predictions that are not finite are set to zero.
+    """
+    names = list(names)
+    model = infer_model({**params, **{k: None for k in names}})
+    all_names = param_names(model)
+    for k in names:
+        assert k in all_names, f"'{k}' is not a parameter of the {model} model."
+    missing = [k for k in all_names if k not in params and k not in names]
+    assert len(missing) == 0, f"'params' requires {', '.join(repr(k) for k in missing)}."
+
+    x, y = coords["x"].flatten(), coords["y"].flatten()
+    z = coords["z"].flatten() if "z" in coords else None
+    dtype, device = x.dtype, x.device
+    if los is not None:
+        los = los.reshape(3, -1).to(x)
+    base = torch.tensor([0.0 if k in names else float(params[k]) for k in all_names], dtype=dtype, device=device)
+    cols = [all_names.index(k) for k in names]
+
+    def forward(ensemble):
+        theta = base.expand(len(ensemble), -1).clone()
+        theta[:, cols] = ensemble.to(theta)
+        with torch.no_grad():
+            U = okada(theta, x, y, z, model, False, is_degree, fault_origin, nu)
+        U = (U * los).sum(1) if los is not None else U.flatten(1)
+        return torch.where(torch.isfinite(U), U, 0.0)
+
+    return forward
+
+
+
+def gaspari_cohn(distance, radius:float):
+    """
+    Compactly supported correlation function of Gaspari & Cohn (1999), used as a localisation taper.
+
+    Parameters
+    ----------
+    distance : torch.Tensor
+        Distances, e.g. between patches and stations. Any shape.
+    radius : float
+        Half of the support: the taper is 1 at distance 0 and vanishes beyond 2 * radius.
+
+    Returns
+    -------
+    torch.Tensor
+        Same shape as `distance`.
+    """
+    r = torch.abs(distance) / radius
+    near = ((((-0.25 * r + 0.5) * r + 0.625) * r - 5.0 / 3.0) * r**2 + 1.0)
+    far = (((((r / 12.0 - 0.5) * r + 0.625) * r + 5.0 / 3.0) * r - 5.0) * r + 4.0 - 2.0 / (3.0 * torch.clamp(r, min=1e-12)))
+    return torch.where(r <= 1.0, near, torch.where(r < 2.0, far, 0.0))
+
+
+
+def localisation_taper(param_xy, station_xy, radius:float, n_comp:int=3):
+    """
+    Localisation tapers from horizontal distances, for parameters attached to locations
+    (e.g. slip on patches) and observations in the layout of `okada_forward` or
+    `OkadaTorch.inversion.greens`.
+
+    Parameters
+    ----------
+    param_xy : torch.Tensor
+        Locations (east, north) of the parameters, e.g. centers of the patches. Shape (n_params, 2).
+    station_xy : torch.Tensor
+        Locations (east, north) of the stations. Shape (n_stations, 2).
+    radius : float
+        Localisation radius of `gaspari_cohn` (the taper vanishes beyond 2 * radius).
+    n_comp : int, default 3
+        Number of observed components per station (1 for line-of-sight data).
+
+    Returns
+    -------
+    tuple of torch.Tensor
+        Tapers of the parameter-observation covariance (n_params, n_obs) and of the
+        observation-observation covariance (n_obs, n_obs), to be passed as `localisation`.
+    """
+    rho_pg = gaspari_cohn(torch.cdist(param_xy, station_xy), radius).repeat(1, n_comp)
+    rho_gg = gaspari_cohn(torch.cdist(station_xy, station_xy), radius).repeat(n_comp, n_comp)
+    return rho_pg, rho_gg
+
+
+
+def _bounds(lower, upper, ensemble):
+    """
+    Bounds of the parameters as tensors (infinite if None), for `torch.clamp`.
+    """
+    kw = dict(dtype=ensemble.dtype, device=ensemble.device)
+    lo = torch.as_tensor(-torch.inf if lower is None else lower, **kw)
+    hi = torch.as_tensor(torch.inf if upper is None else upper, **kw)
+    return lo.expand(ensemble.shape[-1:]), hi.expand(ensemble.shape[-1:])
+
+
+
+def _update(ensemble, predictions, data, gamma, alpha:float, localisation, perturb:bool, generator):
+    """
+    One ensemble Kalman update with observation error variances `gamma` inflated by `alpha`.
+
+    Without a taper of the observation-observation covariance, the innovations
+    (C_GG + alpha Gamma)^-1 (d + e - G_j) are solved in ensemble space (Woodbury identity),
+    so that no n_obs x n_obs matrix is formed. With it, the tapered C_GG is formed and factorised.
+    The cross-covariance C_thetaG (n_params x n_obs) is tapered before it is applied.
+    """
+    J = len(ensemble)
+    A = (ensemble - ensemble.mean(0)) / (J - 1)**0.5          # (J, n_params)
+    Y = (predictions - predictions.mean(0)) / (J - 1)**0.5    # (J, n_obs)
+    rho_pg, rho_gg = localisation if isinstance(localisation, (tuple, list)) else (localisation, None)
+
+    R = alpha * gamma                                        # (n_obs,)
+    D = data - predictions
+    if perturb:
+        noise = torch.randn(predictions.shape, generator=generator, dtype=predictions.dtype).to(predictions.device)
+        D = D + noise * torch.sqrt(R)
+
+    if rho_gg is None:
+        # (Y^T Y + R)^-1 D^T = R^-1 D^T - R^-1 Y^T (I + Y R^-1 Y^T)^-1 Y R^-1 D^T
+        RiD = D / R                                          # (J, n_obs)
+        RiY = Y / R
+        S = torch.eye(J, dtype=Y.dtype, device=Y.device) + Y @ RiY.T
+        W = RiD - torch.linalg.solve(S, Y @ RiD.T).T @ RiY  # rows: innovations of each member
+    else:
+        C_gg = (Y.T @ Y) * rho_gg.to(Y) + torch.diag(R)
+        W = torch.cholesky_solve(D.T, torch.linalg.cholesky(C_gg)).T
+
+    C = A.T @ Y                                              # (n_params, n_obs)
+    if rho_pg is not None:
+        C = C * rho_pg.to(C)
+    return ensemble + W @ C.T
+
+
+
+def esmda(forward, ensemble, data, weights=None, alphas=(4.0, 4.0, 4.0, 4.0), localisation=None,
+          lower=None, upper=None, perturb:bool=True, generator=None):
+    """
+    Ensemble smoother with multiple data assimilation (ES-MDA; Emerick & Reynolds, 2013).
+
+    At each of the `len(alphas)` steps, the whole ensemble is evaluated in one call of `forward`,
+    and every member is updated with the data perturbed with the inflated observation errors.
+    With the sum of 1/alpha equal to 1, the result approximates the posterior for linear models.
+
+    Parameters
+    ----------
+    forward : callable
+        Batched forward model, mapping (n_members, n_params) to (n_members, n_obs),
+        e.g. from `okada_forward`.
+    ensemble : torch.Tensor
+        Initial ensemble (samples of the prior). Shape (n_members, n_params).
+    data : torch.Tensor
+        Observations. Shape (n_obs,).
+    weights : torch.Tensor, default None
+        Fixed weights of the observations (1/sigma^2), e.g. per station. Shape (n_obs,). If None, all ones.
+    alphas : sequence of float, default (4.0, 4.0, 4.0, 4.0)
+        Inflation coefficients of the observation errors.
+    localisation : torch.Tensor or tuple of torch.Tensor, default None
+        Taper applied elementwise to the parameter-observation covariance (shape (n_params, n_obs)),
+        or a pair of it and the taper of the observation-observation covariance (shape (n_obs, n_obs)),
+        e.g. from `localisation_taper`. Tapering only the former is unstable when the observation errors
+        are small compared with the spread of the predictions; the pair is then recommended.
+    lower, upper : float or torch.Tensor, default None
+        Bounds of the parameters (broadcast to (n_params,)). Members are clamped after each update.
+    perturb : bool, default True
+        Perturb the data of each member with the observation errors (stochastic update).
+    generator : torch.Generator, default None
+        Random number generator (on CPU) for the perturbations.
+
+    Returns
+    -------
+    EnsembleResult
+    """
+    data = data.reshape(-1)
+    gamma = torch.ones_like(data) if weights is None else 1.0 / weights.reshape(-1).to(data)
+    w = 1.0 / gamma
+    lo, hi = _bounds(lower, upper, ensemble)
+
+    misfit = []
+    n_forward = 0
+    for alpha in alphas:
+        # members and their mean in one batched call
+        out = forward(torch.cat([ensemble, ensemble.mean(0, keepdim=True)]))
+        n_forward += len(ensemble) + 1
+        r = data - out[-1]
+        misfit.append((w * r) @ r)
+        ensemble = _update(ensemble, out[:-1], data, gamma, float(alpha), localisation, perturb, generator)
+        ensemble = torch.clamp(ensemble, lo, hi)
+
+    mean = ensemble.mean(0)
+    r = data - forward(mean[None])[0]
+    misfit.append((w * r) @ r)
+    return EnsembleResult(ensemble=ensemble, mean=mean, misfit=torch.stack(misfit), n_forward=n_forward + 1)
+
+
+
+def eki(forward, ensemble, data, weights=None, n_iter:int=10, localisation=None,
+        lower=None, upper=None, perturb:bool=True, generator=None, tol:float=None):
+    """
+    Ensemble Kalman inversion (Iglesias et al., 2013): repeated updates without inflation
+    (alpha = 1), which minimise the misfit within the span of the initial ensemble.
+
+    Parameters
+    ----------
+    forward, ensemble, data, weights, localisation, lower, upper, perturb, generator
+        Same as those of `esmda`.
+    n_iter : int, default 10
+        Maximum number of updates.
+    tol : float, default None
+        If given, stop when the weighted misfit of the ensemble mean is below `tol`
+        (e.g. the number of observations, for the discrepancy principle).
+
+    Each update costs one batched call of `forward` on the members and their mean
+    (n_members + 1 evaluations).
+
+    Returns
+    -------
+    EnsembleResult
+    """
+    data = data.reshape(-1)
+    gamma = torch.ones_like(data) if weights is None else 1.0 / weights.reshape(-1).to(data)
+    w = 1.0 / gamma
+    lo, hi = _bounds(lower, upper, ensemble)
+
+    misfit = []
+    n_forward = 0
+    for i in range(n_iter + 1):
+        if i < n_iter:
+            # members and their mean in one batched call; the mean prediction gives the misfit
+            out = forward(torch.cat([ensemble, ensemble.mean(0, keepdim=True)]))
+            n_forward += len(ensemble) + 1
+        else:
+            out = forward(ensemble.mean(0, keepdim=True))
+            n_forward += 1
+        r = data - out[-1]
+        misfit.append((w * r) @ r)
+        if i == n_iter or (tol is not None and float(misfit[-1]) < tol):
+            break
+        ensemble = _update(ensemble, out[:-1], data, gamma, 1.0, localisation, perturb, generator)
+        ensemble = torch.clamp(ensemble, lo, hi)
+
+    return EnsembleResult(ensemble=ensemble, mean=ensemble.mean(0), misfit=torch.stack(misfit), n_forward=n_forward)
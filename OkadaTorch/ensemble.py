@@ -0,0 +1,249 @@
+import torch
+from typing import NamedTuple
+from .functional import okada, param_names, POINT_PARAMS, RECTANGLE_PARAMS
+
+
+
+
+class EnsembleStats(NamedTuple):
+    """
+    Summary of an output field over an ensemble of samples.
+
+    Attributes
+    ----------
+    mean : torch.Tensor
+        Mean of each element of the field.
+    std : torch.Tensor
+        Standard deviation (unbiased) of each element.
+    quantiles : torch.Tensor
+        Estimated quantiles of each element. Shape (n_quantiles, *field shape).
+    count : torch.Tensor
+        Number of finite samples of each element.
+    """
+    mean: torch.Tensor
+    std: torch.Tensor
+    quantiles: torch.Tensor
+    count: torch.Tensor
+
+
+
+
+class EnsembleAccumulator:
+    """
+    Running mean, variance and quantile sketch of a field, updated chunk by chunk of samples.
+
+    Mean and variance are merged exactly chunk by chunk (Chan et al., 1979).
+    Quantiles are estimated from a histogram of `n_bins` bins per element. The bins span `value_range`
+    if it is given; otherwise the first `warmup` samples are buffered, and their range extended by `margin`
+    on both sides sets the bins. Later values outside the bins fall into the edge bins, whose outer edges
+    follow the running minimum and maximum. The error of a quantile is then within one bin width inside the range.
+    Non-finite values are ignored element-wise.
+
+    The state takes 7 fields of the dtype of the values (count, mean, M2, bin range and running extrema)
+    and `n_bins` int32 counts per element, e.g. 568 bytes per element for float64 and 128 bins.
+    Without `value_range`, up to `warmup` + n_chunk samples per element are buffered until the bins are set
+    (2 KiB per element for float64 and the default `warmup`), which usually dominates; give `value_range`,
+    or lower `warmup` and `n_bins`, to bound the memory.
+
+    Parameters
+    ----------
+    quantiles : tuple of float, default (0.05, 0.5, 0.95)
+        Probabilities of the quantiles to be estimated.
+    n_bins : int, default 128
+        Number of bins of the histogram of each element.
+    warmup : int, default 256
+        Number of samples buffered to set the range of the bins. Ignored if `value_range` is given.
+    margin : float, default 0.5
+        Extension of the range of the warm-up samples, relative to that range.
+    value_range : tuple, default None
+        (lo, hi) range of the bins, as floats or tensors broadcastable to the field shape.
+        If given, no samples are buffered.
+    """
+    def __init__(self, quantiles=(0.05, 0.5, 0.95), n_bins:int=128, warmup:int=256, margin:float=0.5,
+                 value_range:tuple=None):
+        assert value_range is None or len(value_range) == 2, "'value_range' must be a tuple (lo, hi)."
+        self.probs = tuple(float(q) for q in quantiles)
+        self.n_bins = n_bins
+        self.warmup = warmup
+        self.margin = margin
+        self.value_range = value_range
+        self.count = None
+        self.hist = None
+        self._buffer = []
+
+
+    def update(self, values):
+        """
+        Add a chunk of samples.
+
+        Parameters
+        ----------
+        values : torch.Tensor
+            Shape (n_chunk, *field shape).
+        """
+        finite = torch.isfinite(values)
+        v = torch.where(finite, values, 0.0)
+        n_c = finite.sum(0).to(v.dtype)
+        mean_c = v.sum(0) / torch.clamp(n_c, min=1.0)
+        M2_c = torch.where(finite, (v - mean_c)**2, 0.0).sum(0)
+
+        if self.count is None:
+            self.count, self.mean, self.M2 = n_c, mean_c, M2_c
+            self.n_samples = 0
+        else:
+            n = self.count + n_c
+            delta = mean_c - self.mean
+            ratio = n_c / torch.clamp(n, min=1.0)
+            self.mean = self.mean + delta * ratio
+            self.M2 = self.M2 + M2_c + delta**2 * self.count * ratio
+            self.count = n
+        self.n_samples += len(values)
+
+        if self.hist is None and self.value_range is not None:
+            kw = dict(dtype=values.dtype, device=values.device)
+            lo, hi = [torch.broadcast_to(torch.as_tensor(r, **kw), values.shape[1:]) for r in self.value_range]
+            assert (hi > lo).all(), "'value_range' must satisfy lo < hi."
+            self._set_bins(lo, hi)
+        if self.hist is None:
+            self._buffer.append(values)
+            if self.n_samples >= self.warmup:
+                self._init_bins()
+        else:
+            self._histogram(values)
+
+
+    def _init_bins(self):
+        """
+        Set the bins from the buffered samples, and count them.
+        """
+        values = torch.cat(self._buffer)
+        self._buffer = []
+        finite = torch.isfinite(values)
+        lo = torch.where(finite, values, torch.inf).amin(0)
+        hi = torch.where(finite, values, -torch.inf).amax(0)
+        lo, hi = torch.where(torch.isfinite(lo), lo, 0.0), torch.where(torch.isfinite(hi), hi, 0.0)
+        span = torch.clamp(hi - lo, min=torch.finfo(values.dtype).eps * (1.0 + hi.abs()))
+        self._set_bins(lo - self.margin * span, hi + self.margin * span)
+        self._histogram(values)
+
+
+    def _set_bins(self, lo, hi):
+        """
+        Allocate the histogram over [lo, hi] of each element.
+        """
+        self.lo, self.hi = lo.clone(), hi.clone()
+        self.vmin, self.vmax = self.lo.clone(), self.hi.clone()
+        self.hist = torch.zeros((self.n_bins,) + lo.shape, dtype=torch.int32, device=lo.device)
+
+
+    def _histogram(self, values):
+        """
+        Count the values in the bins of each element and update the running extrema.
+        """
+        finite = torch.isfinite(values)
+        v = torch.where(finite, values, 0.0)
+        self.vmin = torch.minimum(self.vmin, torch.where(finite, v, torch.inf).amin(0))
+        self.vmax = torch.maximum(self.vmax, torch.where(finite, v, -torch.inf).amax(0))
+        idx = ((v - self.lo) / (self.hi - self.lo) * self.n_bins).floor()
+        idx = torch.clamp(idx, 0, self.n_bins - 1).to(torch.long)
+        self.hist.scatter_add_(0, idx, finite.to(torch.int32))
+
+
+    def result(self):
+        """
+        Current summary.
+
+        Returns
+        -------
+        EnsembleStats
+        """
+        assert self.count is not None, "no samples have been added."
+        if self.hist is None:
+            self._init_bins()
+        var = self.M2 / torch.clamp(self.count - 1.0, min=1.0)
+
+        # edges of the bins (the outer edges of the edge bins follow the running extrema)
+        t = torch.linspace(0.0, 1.0, self.n_bins + 1, dtype=self.lo.dtype, device=self.lo.device)
+        t = t.reshape((-1,) + (1,) * self.lo.dim())
+        edges = self.lo + t * (self.hi - self.lo)
+        edges[0] = torch.minimum(self.vmin, edges[1])
+        edges[-1] = torch.maximum(self.vmax, edges[-2])
+
+        cdf = torch.cumsum(self.hist, 0).to(self.count.dtype) / torch.clamp(self.count, min=1.0)
+        cdf = torch.cat([torch.zeros_like(cdf[:1]), cdf])
+        quantiles = []
+        for q in self.probs:
+            # first edge where the cdf reaches q, and linear interpolation within the bin
+            k = torch.clamp((cdf < q).sum(0, keepdim=True), 1, self.n_bins)
+            c0, c1 = cdf.gather(0, k - 1), cdf.gather(0, k)
+            e0, e1 = edges.gather(0, k - 1), edges.gather(0, k)
+            w = (q - c0) / torch.clamp(c1 - c0, min=torch.finfo(cdf.dtype).tiny)
+            quantiles.append((e0 + torch.clamp(w, 0.0, 1.0) * (e1 - e0))[0])
+
+        empty = self.count == 0
+        nan = torch.full_like(self.mean, torch.nan)
+        return EnsembleStats(
+            mean=torch.where(empty, nan, self.mean),
+            std=torch.where(empty, nan, torch.sqrt(var)),
+            quantiles=torch.stack([torch.where(empty, nan, v) for v in quantiles]),
+            count=self.count,
+        )
+
+
+
+
+def posterior_predictive(samples, coords:dict, model:str=None, quantiles=(0.05, 0.5, 0.95),
+                         chunk_size:int=None, n_bins:int=128, value_range:tuple=None, compute_strain:bool=True,
+                         is_degree:bool=True, fault_origin:str="topleft", nu:float=0.25):
+    """
+    Mean, standard deviation and quantiles of the outputs over samples of the source parameters.
+
+    The samples are evaluated `chunk_size` at a time through `OkadaTorch.functional.okada`
+    (one batched call per chunk), and each chunk is folded into an `EnsembleAccumulator`,
+    so that the outputs of all samples are never held in memory together.
+
+    Parameters
+    ----------
+    samples : torch.Tensor
+        Packed source parameters (see `OkadaTorch.functional.pack`). Shape (n_samples, n_params).
+    coords : dict of torch.Tensor
+        Same as that of `OkadaWrapper.compute`.
+    model : str, default None
+        "point" or "rectangle". If None, inferred from n_params (7 or 9).
+    quantiles : tuple of float, default (0.05, 0.5, 0.95)
+        Probabilities of the quantiles to be estimated.
+    chunk_size : int, default None
+        Number of samples evaluated in one call. Memory grows with `chunk_size` times the number of stations.
+        If None, about 16384 station-samples per call (larger chunks do not run faster on CPU;
+        on GPU, a larger value uses the device better).
+    n_bins : int, default 128
+        Number of bins of the quantile sketch of each output element.
+    value_range : tuple, default None
+        (lo, hi) range of the bins, as floats or tensors broadcastable to the output shape
+        (see `EnsembleAccumulator`). If None, set from the first 256 samples, which are buffered.
+    compute_strain, is_degree, fault_origin, nu
+        Same as those of `OkadaWrapper.compute`.
+
+    Returns
+    -------
+    EnsembleStats
+        Fields of shape (12, *x.shape), or (3, *x.shape) if `compute_strain` is False
+        (quantiles of shape (n_quantiles, 12 or 3, *x.shape)), in the order of the outputs of `compute`.
+    """
+
+    if model is None:
+        model = {len(POINT_PARAMS): "point", len(RECTANGLE_PARAMS): "rectangle"}.get(samples.shape[-1])
+        assert model is not None, "'model' cannot be inferred from the number of parameters."
+    assert samples.dim() == 2 and samples.shape[1] == len(param_names(model)), \
+        "shape of 'samples' must be (n_samples, n_params)."
+
+    x, y = coords["x"], coords["y"]
+    z = coords["z"] if "z" in coords else None
+    if chunk_size is None:
+        chunk_size = max(1, 16384 // x.numel())
+    acc = EnsembleAccumulator(quantiles, n_bins, value_range=value_range)
+    with torch.no_grad():
+        for start in range(0, len(samples), chunk_size):
+            theta = samples[start:start + chunk_size].to(dtype=x.dtype, device=x.device)
+            acc.update(okada(theta, x, y, z, model, compute_strain, is_degree, fault_origin, nu))
+    return acc.result()
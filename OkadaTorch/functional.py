@@ -0,0 +1,299 @@
+import torch
+from .okada1985 import SPOINT, SRECTF
+from .okada1992 import DC3D0, DC3D
+from .geometry import setup, rotate_vector, rotate_tensor
+
+
+POINT_PARAMS = ("x_fault", "y_fault", "depth", "strike", "dip", "rake", "slip")
+RECTANGLE_PARAMS = ("x_fault", "y_fault", "depth", "length", "width", "strike", "dip", "rake", "slip")
+
+
+
+
+def param_names(model:str):
+    """
+    Names of the source parameters, in the order of the last dimension of the packed tensor.
+
+    Parameters
+    ----------
+    model : str
+        "point" or "rectangle".
+
+    Returns
+    -------
+    tuple of str
+    """
+    if model == "point":
+        return POINT_PARAMS
+    elif model == "rectangle":
+        return RECTANGLE_PARAMS
+    else:
+        raise ValueError("'model' must be either 'point' or 'rectangle'.")
+
+
+
+def infer_model(params:dict):
+    """
+    Source model implied by the keys of `params`:
+    "rectangle" if both `"length"` and `"width"` exist, "point" otherwise.
+    """
+    if ("length" in params) and ("width" in params):
+        return "rectangle"
+    else:
+        return "point"
+
+
+
+def pack(params:dict, model:str=None, dtype=None, device=None):
+    """
+    Pack a dict of source parameters into a single tensor.
+
+    Parameters
+    ----------
+    params : dict of float or torch.Tensor
+        Source parameters (see `OkadaWrapper.compute`).
+        Values can be tensors of any broadcastable shapes (batch of sources).
+    model : str, default None
+        "point" or "rectangle". If None, inferred from the keys of `params`.
+    dtype : torch.dtype, default None
+        If None, the promoted floating type of the values.
+    device : torch.device, default None
+        Device of the packed tensor.
+
+    Returns
+    -------
+    torch.Tensor
+        Packed parameters. Shape (..., n_params), where (...) is the broadcast shape of the values
+        and the last dimension is ordered as `param_names(model)`.
+    """
+
+    if model is None:
+        model = infer_model(params)
+    names = param_names(model)
+    missing = [k for k in names if k not in params]
+    assert len(missing) == 0, f"'params' requires {', '.join(repr(k) for k in names)}."
+
+    values = [torch.as_tensor(params[k], device=device) for k in names]
+    if dtype is None:
+        dtype = torch.get_default_dtype()
+        for v in values:
+            if v.is_floating_point():
+                dtype = torch.promote_types(dtype, v.dtype)
+    values = torch.broadcast_tensors(*[v.to(dtype) for v in values])
+
+    return torch.stack(values, dim=-1)
+
+
+
+def unpack(theta, model:str):
+    """
+    Inverse of `pack`.
+
+    Parameters
+    ----------
+    theta : torch.Tensor
+        Packed parameters. Shape (..., n_params).
+    model : str
+        "point" or "rectangle".
+
+    Returns
+    -------
+    dict of torch.Tensor
+        Each value has shape (...).
+    """
+    names = param_names(model)
+    assert theta.shape[-1] == len(names), \
+        f"last dim of theta must be {len(names)} for model '{model}'."
+    return {k: theta[..., i] for i, k in enumerate(names)}
+
+
+
+def okada(theta, x, y, z=None, model:str="rectangle",
+          compute_strain:bool=True, is_degree:bool=True, fault_origin:str="topleft", nu:float=0.25,
+          compute_dtype=None, return_iret:bool=False, out=None):
+    """
+    Pure functional form of `OkadaWrapper.compute`.
+
+    The source parameters are given as a packed tensor and all other arguments are static configuration,
+    so that the function can be used with `vmap`, `torch.func` transforms, `torch.compile` and `torch.export`
+    without data-dependent Python branches.
+    Leading dimensions of `theta` are batch dimensions over sources:
+    all sources are evaluated at all stations in one call.
+
+    Parameters
+    ----------
+    theta : torch.Tensor
+        Packed source parameters (see `pack`). Shape (..., n_params).
+    x, y : torch.Tensor
+        Station coordinates (east, north). Same shape (`dim` is arbitrary).
+    z : torch.Tensor, default None
+        Station coordinate (up). If None, `SPOINT`/`SRECTF` is used,
+        otherwise `DC3D0`/`DC3D`.
+    model : str, default "rectangle"
+        "point" or "rectangle".
+    compute_strain, is_degree, fault_origin, nu, compute_dtype
+        Same as those of `OkadaWrapper.compute`.
+    return_iret : bool, default False
+        If `True`, the return code of the kernel is also returned.
+    out : torch.Tensor, default None
+        Preallocated output of the shape below, written in place (inference only).
+
+    Returns
+    -------
+    torch.Tensor
+        Shape (..., n_out, *x.shape), where (...) is the batch shape of `theta`
+        and n_out is 12 if `compute_strain` is `True` and 3 otherwise.
+        Components are ordered as the output of `OkadaWrapper.compute`.
+    torch.Tensor (int)
+        Only if `return_iret` is `True`. Return code of shape (..., *x.shape):
+        0 means normal, 1 means singular and 2 means positive z was given
+        (always 0 for `SPOINT`/`SRECTF`).
+    """
+    u, iret = _okada(theta, x, y, z, model, compute_strain, is_degree, fault_origin, nu, compute_dtype)
+    out = torch.stack(u, dim=theta.dim() - 1, out=out)
+    if return_iret:
+        return out, iret
+    return out
+
+
+
+def _okada(theta, x, y, z, model, compute_strain, is_degree, fault_origin, nu, compute_dtype=None):
+    """
+    Same as `okada`, but returns a list of tensors of shape (..., *x.shape)
+    and the return code (IRET) of the same shape.
+    """
+
+    assert x.shape == y.shape, "shepe of x and y must be same."
+    if z is not None:
+        assert x.shape == z.shape, "shepe of x, y and z must be same."
+
+    # parameters broadcast against the station dimensions
+    batch_shape = theta.shape[:-1]
+    p = {k: v.reshape(batch_shape + (1,) * x.dim()) for k, v in unpack(theta, model).items()}
+    x_fault, y_fault = p["x_fault"], p["y_fault"]
+    strike, dip, rake, slip = p["strike"], p["dip"], p["rake"], p["slip"]
+
+
+    # ---- 1. setup ----
+    ss, cs, sd, cd, u_strike, u_dip = setup(strike, dip, rake, slip, is_degree)
+    xx, yy = _rotate_stations(x, y, x_fault, y_fault, ss, cs)
+
+    # station coordinates relative to the source are formed in the input precision,
+    # and only the kernels run in `compute_dtype`
+    if compute_dtype is not None:
+        xx, yy = xx.to(compute_dtype), yy.to(compute_dtype)
+        z = z.to(compute_dtype) if z is not None else None
+        p = {k: v.to(compute_dtype) for k, v in p.items()}
+        ss, cs, sd, cd, u_strike, u_dip = [
+            v.to(compute_dtype) for v in [ss, cs, sd, cd, u_strike, u_dip]
+        ]
+
+    # ---- 2. model switch ----
+    out, iret = _kernel(xx, yy, z, p, sd, cd, u_strike, u_dip, model, compute_strain, is_degree, fault_origin, nu)
+
+    # ---- 3. inversely rotate coordinate ----
+    return _back_rotate(out, ss, cs, z is not None, compute_strain, nu), iret
+
+
+
+def _rotate_stations(x, y, x_fault, y_fault, ss, cs):
+    """
+    Station coordinates in the fault system (x-axis parallel to strike), relative to the source.
+    """
+    xx =  (x - x_fault) * ss + (y - y_fault) * cs
+    yy = -(x - x_fault) * cs + (y - y_fault) * ss
+    return xx, yy
+
+
+
+def _kernel(xx, yy, z, p, sd, cd, u_strike, u_dip, model, compute_strain, is_degree, fault_origin, nu):
+    """
+    Call `SPOINT`, `SRECTF`, `DC3D0` or `DC3D` on stations in the fault system.
+    Return the outputs in the order of the kernel and IRET.
+    """
+
+    depth, dip = p["depth"], p["dip"]
+    alpha_1985 = 1 - 2.0 * nu         # MYU/(LAMBDA+MYU), equal to 1/2 if Poisson medium
+    alpha_1992 = 1 / (2.0 * (1 - nu)) # (LAMBDA+MYU)/(LAMBDA+2*MYU), equal to 2/3 if Poisson medium
+
+    if model == "rectangle":
+        # recangular fault
+        length, width = p["length"], p["width"]
+
+        if fault_origin not in ["topleft", "center"]:
+            raise ValueError("'fault_origin' must be either 'topleft' or 'center'.")
+
+        if z is not None:
+            # DC3D
+            if fault_origin == "topleft":
+                out, iret = DC3D(
+                    alpha_1992, xx, yy, z, depth, dip, 0.0, length, -width, 0.0,
+                    u_strike, u_dip, 0.0, compute_strain, is_degree
+                )
+            else:
+                out, iret = DC3D(
+                    alpha_1992, xx, yy, z, depth, dip, -length/2, +length/2, -width/2, +width/2,
+                    u_strike, u_dip, 0.0, compute_strain, is_degree
+                )
+        else:
+            # SRECTF
+            if fault_origin == "topleft":
+                yy = yy + width * cd
+                dep = depth + width * sd
+            else:
+                xx = xx + length / 2
+                yy = yy + width * cd / 2
+                dep = depth + width * sd / 2
+            out = SRECTF(
+                alpha_1985, xx, yy, dep, length, width, sd, cd,
+                u_strike, u_dip, 0.0, compute_strain
+            )
+            iret = torch.zeros(xx.shape, dtype=torch.int, device=xx.device)
+
+    else:
+        # point source
+        if z is not None:
+            # DC3D0
+            out, iret = DC3D0(
+                alpha_1992, xx, yy, z, depth, dip,
+                u_strike, u_dip, 0.0, 0.0, compute_strain, is_degree
+            )
+        else:
+            # SPOINT
+            out = SPOINT(
+                alpha_1985, xx, yy, depth, sd, cd,
+                u_strike, u_dip, 0.0, compute_strain
+            )
+            iret = torch.zeros(xx.shape, dtype=torch.int, device=xx.device)
+
+    return out, iret
+
+
+
+def _back_rotate(out, ss, cs, has_z, compute_strain, nu):
+    """
+    Rotate the outputs of a kernel back to the east-north-up system,
+    in the order [ux, uy, uz, uxx, uyx, uzx, uxy, uyy, uzy, uxz, uyz, uzz].
+    """
+    if compute_strain:
+        if has_z:
+            ux, uy, uz, uxx, uyx, uzx, uxy, uyy, uzy, uxz, uyz, uzz = out
+        else:
+            ux, uy, uz, uxx, uxy, uyx, uyy, uzx, uzy = out
+            # derived from surface boundary condition (Okada 1985; eq.42)
+            uxz = -uzx
+            uyz = -uzy
+            uzz = -(uxx + uyy) * nu / (1 - nu)
+        ux, uy, uz = rotate_vector(
+            ux, uy, uz, ss, cs
+        )
+        uxx, uyx, uzx, uxy, uyy, uzy, uxz, uyz, uzz = rotate_tensor(
+            uxx, uyx, uzx, uxy, uyy, uzy, uxz, uyz, uzz, ss, cs
+        )
+        return [ux, uy, uz, uxx, uyx, uzx, uxy, uyy, uzy, uxz, uyz, uzz]
+    else:
+        ux, uy, uz = out
+        ux, uy, uz = rotate_vector(
+            ux, uy, uz, ss, cs
+        )
+        return [ux, uy, uz]
@@ -1,7 +1,9 @@
 import torch
+from .utils import _eps
+from .profiling import profiled
 
-EPS = 1.0e-6
 
+@profiled("setup")
 def setup(strike, dip, rake, slip, is_degree):
     """
     Calculate sine and cosine of angle variables.
@@ -24,15 +26,17 @@ def setup(strike, dip, rake, slip, is_degree):
 
 
     # if dip≈±90° then set sd=sign(sd) and cd=0.
-    if torch.abs(cd) < EPS:
-        sd = torch.sign(sd)
-        cd = 0.0
+    # (selected elementwise, so that dip can be a batched tensor)
+    mask = torch.abs(cd) < _eps(cd)
+    sd = torch.where(mask, torch.sign(sd), sd)
+    cd = torch.where(mask, 0.0, cd)
 
 
     return [ss, cs, sd, cd, u_strike, u_dip]
 
 
 
+@profiled("rotate_vector")
 def rotate_vector(ux, uy, uz, s, c):
     """
     Rotate displacement vector 
@@ -60,6 +64,7 @@ def rotate_vector(ux, uy, uz, s, c):
 
 
 
+@profiled("rotate_tensor")
 def rotate_tensor(uxx, uyx, uzx, uxy, uyy, uzy, uxz, uyz, uzz, s, c):
     """
     Rotate displacement gradient tensor
@@ -0,0 +1,576 @@
+import math
+import torch
+from typing import NamedTuple
+from .functional import okada, param_names, infer_model
+from .mesh import FaultMesh
+
+
+
+
+class Sweep(NamedTuple):
+    """
+    Result of `sweep` over the regularisation weight.
+
+    Attributes
+    ----------
+    lams : torch.Tensor
+        Regularisation weights. Shape (K,).
+    residual_norm : torch.Tensor
+        Weighted residual norm ||W^(1/2) (G m - d)|| of each solution. Shape (K,).
+    model_norm : torch.Tensor
+        Roughness ||L m|| of each solution. Shape (K,).
+    abic : torch.Tensor
+        Akaike's Bayesian Information Criterion of each weight (up to a constant). Shape (K,).
+    best_lcurve : int
+        Index of the corner of the L-curve (maximum curvature in log-log scale).
+    best_abic : int
+        Index of the minimum of ABIC.
+    """
+    lams: torch.Tensor
+    residual_norm: torch.Tensor
+    model_norm: torch.Tensor
+    abic: torch.Tensor
+    best_lcurve: int
+    best_abic: int
+
+
+
+
+def greens(coords:dict, patches:dict, rakes=(0.0, 90.0), los=None, batch_size:int=256,
+           compute_strain:bool=False, is_degree:bool=True, fault_origin:str="topleft", nu:float=0.25):
+    """
+    Green's matrix of a set of patches: responses at the stations to unit slip on each patch.
+
+    The responses are evaluated in batches of patches through `OkadaTorch.functional.okada`
+    (`DC3D`/`DC3D0` if `"z"` is in `coords`, `SRECTF`/`SPOINT` otherwise).
+    Responses that are not finite (stations on a patch edge) are set to zero.
+
+    Parameters
+    ----------
+    coords : dict of torch.Tensor
+        Same as that of `OkadaWrapper.compute`.
+    patches : dict of torch.Tensor or FaultMesh
+        Source parameters of the patches except `"rake"` and `"slip"`. Each has shape (n_patch,).
+        For a `FaultMesh`, its `origin` and `is_degree` override `fault_origin` and `is_degree`.
+    rakes : tuple of float, default (0.0, 90.0)
+        Rake of each slip component (strike-slip and dip-slip by default).
+    los : torch.Tensor, default None
+        Unit vectors (east, north, up) of the line of sight. Shape (3, *x.shape).
+        If None, the 3 components of the displacement are the observations.
+    batch_size : int, default 256
+        Number of columns evaluated in one call.
+    compute_strain : bool, default False
+        If True, the 9 displacement derivatives are included in the observations (not with `los`).
+    is_degree, fault_origin, nu
+        Same as those of `OkadaWrapper.compute`.
+
+    Returns
+    -------
+    torch.Tensor
+        Shape (n_obs, len(rakes) * n_patch), where n_obs is the number of stations with `los`
+        and 3 (or 12 with `compute_strain`) times that otherwise
+        (ordered as `torch.stack([ux, uy, uz, ...]).flatten()`).
+        Column `c * n_patch + j` is the response to unit slip with `rakes[c]` on patch `j`.
+    """
+
+    if isinstance(patches, FaultMesh):
+        patches, fault_origin, is_degree = patches.params(), patches.origin, patches.is_degree
+
+    model = infer_model(patches)
+    names = param_names(model)
+    missing = [k for k in names if k not in patches and k not in ("rake", "slip")]
+    assert len(missing) == 0, f"'patches' requires {', '.join(repr(k) for k in missing)}."
+
+    x, y = coords["x"].flatten(), coords["y"].flatten()
+    z = coords["z"].flatten() if "z" in coords else None
+    dtype, device = x.dtype, x.device
+    if los is not None:
+        assert not compute_strain, "'los' cannot be combined with 'compute_strain'."
+        los = los.reshape(3, -1).to(x)
+
+    n_patch = len(next(iter(patches.values())))
+    theta = torch.stack([
+        torch.ones(n_patch, dtype=dtype, device=device) if k in ("rake", "slip")
+        else torch.as_tensor(patches[k], dtype=dtype, device=device).flatten().expand(n_patch)
+        for k in names
+    ], dim=1)
+    theta = theta.repeat(len(rakes), 1)
+    theta[:, names.index("rake")] = torch.as_tensor(rakes, dtype=dtype, device=device).repeat_interleave(n_patch)
+
+    columns = []
+    with torch.no_grad():
+        for start in range(0, len(theta), batch_size):
+            U = okada(theta[start:start + batch_size], x, y, z, model, compute_strain, is_degree, fault_origin, nu)
+            U = (U * los).sum(1) if los is not None else U.flatten(1)
+            columns.append(torch.where(torch.isfinite(U), U, 0.0))
+    return torch.cat(columns).T.contiguous()
+
+
+
+class GreensMatrix:
+    """
+    Green's matrix of a 1D station set that accepts station additions and deletions.
+
+    Rows are kept per component in a buffer with spare capacity, so that the kernels are evaluated
+    only for added stations (`greens` on the new stations), and deletions compact the remaining rows
+    in place without evaluating anything again.
+
+    Parameters
+    ----------
+    coords : dict of torch.Tensor
+        Coordinates of the stations (1D).
+    patches, rakes, los, batch_size, compute_strain, is_degree, fault_origin, nu
+        Same as those of `greens`. `los` has shape (3, n_stations).
+    capacity : int, default None
+        Initial number of stations the buffer can hold. If None, the number of stations.
+        The buffer grows by doubling when needed.
+    """
+    def __init__(self, coords:dict, patches, rakes=(0.0, 90.0), los=None, batch_size:int=256,
+                 compute_strain:bool=False, is_degree:bool=True, fault_origin:str="topleft", nu:float=0.25,
+                 capacity:int=None):
+
+        self.patches = patches
+        self._options = dict(
+            rakes=rakes, batch_size=batch_size, compute_strain=compute_strain,
+            is_degree=is_degree, fault_origin=fault_origin, nu=nu,
+        )
+        self.use_los = los is not None
+        self.n_comp = 1 if self.use_los else (12 if compute_strain else 3)
+        self.coords = {k: v for k, v in coords.items()}
+        self.los = los
+        assert coords["x"].dim() == 1, "stations of 'GreensMatrix' must be 1D."
+
+        G = greens(coords, patches, los=los, **self._options)
+        n = coords["x"].shape[0]
+        self.n_stations = n
+        self.n_model = G.shape[1]
+        capacity = n if capacity is None else max(capacity, n)
+        self._rows = torch.empty((self.n_comp, capacity, self.n_model), dtype=G.dtype, device=G.device)
+        self._rows[:, :n] = G.reshape(self.n_comp, n, self.n_model)
+
+
+    @property
+    def rows(self):
+        """
+        Rows of each component. Shape (n_comp, n_stations, n_model) (a view of the buffer).
+        """
+        return self._rows[:, :self.n_stations]
+
+
+    @property
+    def matrix(self):
+        """
+        Green's matrix in the layout of `greens`. Shape (n_comp * n_stations, n_model).
+        """
+        return self.rows.reshape(-1, self.n_model)
+
+
+    def add_stations(self, coords:dict, los=None):
+        """
+        Append stations, evaluating the kernels for them only.
+
+        Parameters
+        ----------
+        coords : dict of torch.Tensor
+            Coordinates of the new stations (1D), with the same keys as the current stations.
+        los : torch.Tensor, default None
+            Line of sight of the new stations (shape (3, k)); required if the matrix was built with `los`.
+
+        Returns
+        -------
+        GreensMatrix
+            The instance itself.
+        """
+        assert set(coords) == set(self.coords), "'coords' must have the same keys as the current stations."
+        assert (los is not None) == self.use_los, "'los' is required if and only if the matrix was built with 'los'."
+        G = greens(coords, self.patches, los=los, **self._options).to(self._rows)
+        k = coords["x"].shape[0]
+        n = self.n_stations
+
+        if n + k > self._rows.shape[1]:
+            rows = torch.empty(
+                (self.n_comp, max(2 * self._rows.shape[1], n + k), self.n_model),
+                dtype=self._rows.dtype, device=self._rows.device
+            )
+            rows[:, :n] = self._rows[:, :n]
+            self._rows = rows
+        self._rows[:, n:n + k] = G.reshape(self.n_comp, k, self.n_model)
+        self.n_stations = n + k
+
+        self.coords = {key: torch.cat([self.coords[key], coords[key].to(self.coords[key])]) for key in self.coords}
+        if self.use_los:
+            self.los = torch.cat([self.los, los.to(self.los)], dim=1)
+        return self
+
+
+    def remove_stations(self, index):
+        """
+        Remove stations and compact the remaining rows in place.
+
+        Parameters
+        ----------
+        index : torch.Tensor
+            Boolean mask of the stations to be removed (shape (n_stations,)), or their integer indices.
+
+        Returns
+        -------
+        GreensMatrix
+            The instance itself.
+        """
+        index = torch.as_tensor(index, device=self._rows.device)
+        remove = index if index.dtype == torch.bool else \
+            torch.zeros(self.n_stations, dtype=torch.bool, device=index.device).index_fill_(0, index.flatten(), True)
+        keep = torch.nonzero(~remove).squeeze(1)
+        n = len(keep)
+
+        self._rows[:, :n] = self._rows[:, keep]
+        self.n_stations = n
+        self.coords = {key: v[keep.to(v.device)] for key, v in self.coords.items()}
+        if self.use_los:
+            self.los = self.los[:, keep.to(self.los.device)]
+        return self
+
+
+
+def laplacian(n_strike:int, n_dip:int, n_comp:int=1, spacing=(1.0, 1.0), boundary:str="free"):
+    """
+    Finite-difference Laplacian on a grid of patches, as a sparse matrix.
+
+    Patches are ordered with the strike index varying fastest (`j = i_dip * n_strike + i_strike`),
+    and the operator is block-diagonal over `n_comp` slip components
+    (matching the columns of `greens`).
+
+    Parameters
+    ----------
+    n_strike, n_dip : int
+        Number of patches along strike and along dip.
+    n_comp : int, default 1
+        Number of slip components.
+    spacing : tuple of float, default (1.0, 1.0)
+        Patch size along strike and along dip (the stencil is scaled by 1/spacing**2).
+    boundary : str, default "free"
+        If "free", neighbours outside the grid are omitted (zero normal derivative).
+        If "zero", slip outside the grid is taken as zero (slip tapers to zero at the edges).
+
+    Returns
+    -------
+    torch.Tensor
+        Sparse COO tensor of shape (n_comp * n, n_comp * n), where n = n_strike * n_dip.
+    """
+
+    if boundary not in ["free", "zero"]:
+        raise ValueError("'boundary' must be either 'free' or 'zero'.")
+
+    n = n_strike * n_dip
+    i_s, i_d = torch.meshgrid(torch.arange(n_strike), torch.arange(n_dip), indexing="xy")
+    i_s, i_d = i_s.flatten(), i_d.flatten()
+    j = i_d * n_strike + i_s
+
+    rows, cols, vals = [], [], []
+    diag = torch.zeros(n, dtype=torch.float64)
+    for ds, dd, h in [(1, 0, spacing[0]), (-1, 0, spacing[0]), (0, 1, spacing[1]), (0, -1, spacing[1])]:
+        inside = (i_s + ds >= 0) & (i_s + ds < n_strike) & (i_d + dd >= 0) & (i_d + dd < n_dip)
+        rows.append(j[inside])
+        cols.append(((i_d + dd) * n_strike + i_s + ds)[inside])
+        vals.append(torch.full((int(inside.sum()),), 1.0 / h**2, dtype=torch.float64))
+        diag -= (inside if boundary == "free" else torch.ones_like(inside)).to(torch.float64) / h**2
+    rows.append(j)
+    cols.append(j)
+    vals.append(diag)
+
+    rows, cols, vals = torch.cat(rows), torch.cat(cols), torch.cat(vals)
+    offset = (torch.arange(n_comp) * n).repeat_interleave(len(rows))
+    indices = torch.stack([rows.repeat(n_comp) + offset, cols.repeat(n_comp) + offset])
+    return torch.sparse_coo_tensor(
+        indices, vals.repeat(n_comp), (n_comp * n, n_comp * n), dtype=torch.get_default_dtype(), check_invariants=True
+    ).coalesce()
+
+
+
+
+def _normal(G, d, L, lam, weights):
+    """
+    Normal matrix G^T W G + lam^2 L^T L and right-hand side G^T W d.
+    """
+    w = torch.ones_like(d) if weights is None else weights.to(d)
+    H = G.T @ (w[:, None] * G)
+    if L is not None and lam != 0.0:
+        L = L.to_dense() if L.is_sparse else L
+        H = H + lam**2 * (L.T @ L).to(H)
+    return H, G.T @ (w * d)
+
+
+
+def solve(G, d, L=None, lam:float=0.0, weights=None, lower=None, upper=None,
+          rho:float=None, max_iter:int=1000, tol:float=1e-6):
+    """
+    Regularised least-squares slip:
+    minimise ||W^(1/2) (G m - d)||^2 + lam^2 ||L m||^2, optionally subject to lower <= m <= upper.
+
+    Without bounds, the normal equations are solved by a Cholesky factorisation.
+    With bounds (e.g. `lower=0.0` for non-negative slip), ADMM is used:
+    the matrix (G^T W G + lam^2 L^T L + rho I) is factorised once and reused at every iteration,
+    and the bounds are imposed by projection.
+
+    Parameters
+    ----------
+    G : torch.Tensor
+        Green's matrix. Shape (n_obs, n_model).
+    d : torch.Tensor
+        Observations. Shape (n_obs,).
+    L : torch.Tensor, default None
+        Regularisation operator (dense or sparse), e.g. from `laplacian`. Shape (n_reg, n_model).
+    lam : float, default 0.0
+        Regularisation weight.
+    weights : torch.Tensor, default None
+        Weights of the observations (e.g. 1/sigma^2). Shape (n_obs,).
+    lower, upper : float or torch.Tensor, default None
+        Bounds of the model. None means unbounded.
+    rho : float, default None
+        ADMM penalty. If None, the mean of the diagonal of the normal matrix.
+    max_iter : int, default 1000
+        Maximum number of ADMM iterations.
+    tol : float, default 1e-6
+        ADMM stops when the primal and dual residuals are below `tol` relative to the model norm.
+
+    Returns
+    -------
+    torch.Tensor
+        Model (slip on each patch and component). Shape (n_model,).
+    """
+
+    H, b = _normal(G, d, L, lam, weights)
+
+    if lower is None and upper is None:
+        C = torch.linalg.cholesky(H)
+        return torch.cholesky_solve(b[:, None], C)[:, 0]
+
+    if rho is None:
+        rho = float(torch.diagonal(H).mean())
+    C = torch.linalg.cholesky(H + rho * torch.eye(len(H), dtype=H.dtype, device=H.device))
+    lo = -torch.inf if lower is None else lower
+    hi = torch.inf if upper is None else upper
+
+    z = torch.clamp(torch.cholesky_solve(b[:, None], C)[:, 0], lo, hi)
+    u = torch.zeros_like(z)
+    for _ in range(max_iter):
+        x = torch.cholesky_solve((b + rho * (z - u))[:, None], C)[:, 0]
+        z_old = z
+        z = torch.clamp(x + u, lo, hi)
+        u = u + x - z
+        scale = max(float(torch.linalg.norm(z)), 1.0)
+        if float(torch.linalg.norm(x - z)) < tol * scale and float(torch.linalg.norm(z - z_old)) < tol * scale:
+            break
+    return z
+
+
+
+def sweep(G, d, L, lams, weights=None, delta:float=1e-10):
+    """
+    Solutions and selection criteria for many regularisation weights from one factorisation.
+
+    With L^T L + delta I = R^T R (Cholesky) and the eigendecomposition
+    R^-T G^T W G R^-1 = V diag(s) V^T, computed once,
+    the solution for any weight is m = R^-1 V (s + lam^2)^-1 V^T R^-T G^T W d,
+    which costs O(n_model^2) per weight.
+    Both the corner of the L-curve and the minimum of ABIC
+    (Yabuki & Matsu'ura, 1992) are reported.
+
+    Parameters
+    ----------
+    G, d, L, weights
+        Same as those of `solve` (`L` is required).
+    lams : torch.Tensor
+        Regularisation weights to be evaluated (1D, increasing).
+    delta : float, default 1e-10
+        Relative shift making L^T L positive definite (a Laplacian with free edges is singular).
+
+    Returns
+    -------
+    Sweep
+    """
+
+    H, b = _normal(G, d, None, 0.0, weights)
+    w = torch.ones_like(d) if weights is None else weights.to(d)
+    Ld = (L.to_dense() if L.is_sparse else L).to(H)
+    LL = Ld.T @ Ld
+    M = len(H)
+    N = len(d)
+    P = int(torch.linalg.matrix_rank(LL))
+
+    R = torch.linalg.cholesky(LL + delta * float(torch.diagonal(LL).mean()) * torch.eye(M, dtype=H.dtype, device=H.device))
+    A = torch.linalg.solve_triangular(R, torch.linalg.solve_triangular(R, H, upper=False, left=True).T, upper=False, left=True)
+    s, V = torch.linalg.eigh((A + A.T) / 2)
+    s = torch.clamp(s, min=0.0)
+    c = V.T @ torch.linalg.solve_triangular(R, b[:, None], upper=False)[:, 0]
+    logdet_R = 2.0 * torch.log(torch.diagonal(R)).sum()
+
+    lams = torch.as_tensor(lams, dtype=H.dtype, device=H.device)
+    res, rough, abic = [], [], []
+    dWd = (w * d) @ d
+    for lam in lams:
+        y = V @ (c / (s + lam**2))
+        m = torch.linalg.solve_triangular(R.T, y[:, None], upper=True)[:, 0]
+        r = G @ m - d
+        rr = (w * r) @ r
+        mm = torch.linalg.norm(Ld @ m)**2
+        res.append(torch.sqrt(rr))
+        rough.append(torch.sqrt(mm))
+        # ABIC = (N + P - M) log S - P log lam^2 + log det(G^T W G + lam^2 L^T L)
+        S = rr + lam**2 * mm
+        abic.append((N + P - M) * torch.log(S) - P * torch.log(lam**2) + logdet_R + torch.log(s + lam**2).sum())
+    res, rough, abic = torch.stack(res), torch.stack(rough), torch.stack(abic)
+
+    # corner of the L-curve: maximum curvature of (log residual, log roughness) along log lam
+    t = torch.log(lams)
+    u, v = torch.log(res), torch.log(torch.clamp(rough, min=torch.finfo(rough.dtype).tiny))
+    if len(lams) >= 3:
+        du, dv = torch.gradient(u, spacing=(t,))[0], torch.gradient(v, spacing=(t,))[0]
+        ddu, ddv = torch.gradient(du, spacing=(t,))[0], torch.gradient(dv, spacing=(t,))[0]
+        kappa = (du * ddv - ddu * dv) / torch.clamp(du**2 + dv**2, min=torch.finfo(u.dtype).tiny)**1.5
+        best_lcurve = int(torch.argmax(kappa[1:-1])) + 1
+    else:
+        best_lcurve = 0
+
+    return Sweep(
+        lams=lams, residual_norm=res, model_norm=rough, abic=abic,
+        best_lcurve=best_lcurve, best_abic=int(torch.argmin(abic)),
+    )
+
+
+
+
+def _operator(G):
+    """
+    Pair of callables (v -> G v, v -> G^T v) from a matrix or from such a pair.
+    """
+    if isinstance(G, torch.Tensor):
+        return (lambda v: G @ v), (lambda v: G.T @ v)
+    return G
+
+
+
+def lsqr(G, d, L=None, lam:float=0.0, weights=None, max_iter:int=1000, tol:float=1e-8):
+    """
+    Matrix-free regularised least squares by LSQR (Paige & Saunders, 1982).
+
+    Solves the same problem as `solve` (without bounds) using only products with G and G^T,
+    for meshes too large to form or factorise the normal matrix.
+
+    Parameters
+    ----------
+    G : torch.Tensor or tuple of callable
+        Green's matrix, or a pair `(matvec, rmatvec)` computing `G @ v` and `G.T @ v`.
+    d, L, lam, weights
+        Same as those of `solve`. `L` may be sparse.
+    max_iter : int, default 1000
+        Maximum number of iterations.
+    tol : float, default 1e-8
+        Stop when the estimated norm of the normal-equation residual is below `tol` relative to ||A^T b||.
+
+    Returns
+    -------
+    torch.Tensor
+        Model. Shape (n_model,).
+    int
+        Number of iterations.
+    """
+
+    mv, rmv = _operator(G)
+    sw = torch.ones_like(d) if weights is None else torch.sqrt(weights.to(d))
+    use_L = L is not None and lam != 0.0
+    if use_L:
+        L = L.to(dtype=d.dtype, device=d.device)
+
+    # augmented system A = [W^(1/2) G; lam L], b = [W^(1/2) d; 0]
+    def A(v):
+        Av = sw * mv(v)
+        return torch.cat([Av, lam * (L @ v)]) if use_L else Av
+    def AT(u):
+        ATu = rmv(sw * u[:len(d)])
+        return ATu + lam * (L.T @ u[len(d):]) if use_L else ATu
+
+    b = sw * d
+    if use_L:
+        b = torch.cat([b, torch.zeros(L.shape[0], dtype=d.dtype, device=d.device)])
+
+    beta = torch.linalg.norm(b)
+    u = b / beta
+    v = AT(u)
+    alpha = torch.linalg.norm(v)
+    v = v / alpha
+    w = v.clone()
+    x = torch.zeros_like(v)
+    phi_bar, rho_bar = beta, alpha
+    norm_ATb = float(alpha * beta)
+
+    for it in range(1, max_iter + 1):
+        u = A(v) - alpha * u
+        beta = torch.linalg.norm(u)
+        u = u / beta
+        v = AT(u) - beta * v
+        alpha = torch.linalg.norm(v)
+        v = v / alpha
+
+        rho = torch.sqrt(rho_bar**2 + beta**2)
+        c, s = rho_bar / rho, beta / rho
+        theta = s * alpha
+        rho_bar = -c * alpha
+        phi = c * phi_bar
+        phi_bar = s * phi_bar
+
+        x = x + (phi / rho) * w
+        w = v - (theta / rho) * w
+
+        # ||A^T r|| = phi_bar * alpha * |c|
+        if float(phi_bar * alpha * torch.abs(c)) < tol * norm_ATb:
+            break
+
+    return x, it
+
+
+
+def cg(G, d, L=None, lam:float=0.0, weights=None, x0=None, max_iter:int=1000, tol:float=1e-8):
+    """
+    Matrix-free regularised least squares by conjugate gradients on the normal equations (CGLS).
+
+    Same problem and arguments as `lsqr`, with an optional starting model `x0`
+    (e.g. the solution for a neighbouring `lam`).
+
+    Returns
+    -------
+    torch.Tensor
+        Model. Shape (n_model,).
+    int
+        Number of iterations.
+    """
+
+    mv, rmv = _operator(G)
+    w = torch.ones_like(d) if weights is None else weights.to(d)
+    use_L = L is not None and lam != 0.0
+    if use_L:
+        L = L.to(dtype=d.dtype, device=d.device)
+
+    def N(v):
+        Nv = rmv(w * mv(v))
+        return Nv + lam**2 * (L.T @ (L @ v)) if use_L else Nv
+
+    b = rmv(w * d)
+    x = torch.zeros_like(b) if x0 is None else x0.clone()
+    r = b - N(x) if x0 is not None else b.clone()
+    p = r.clone()
+    rr = r @ r
+    norm_b = float(torch.linalg.norm(b))
+
+    for it in range(1, max_iter + 1):
+        Np = N(p)
+        a = rr / (p @ Np)
+        x = x + a * p
+        r = r - a * Np
+        rr_new = r @ r
+        if math.sqrt(float(rr_new)) < tol * norm_b:
+            break
+        p = r + (rr_new / rr) * p
+        rr = rr_new
+
+    return x, it
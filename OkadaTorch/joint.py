@@ -0,0 +1,251 @@
+import torch
+from typing import NamedTuple
+from .functional import okada, param_names, infer_model
+
+
+
+
+class JointResult(NamedTuple):
+    """
+    Result of `JointInversion.fit`.
+
+    Attributes
+    ----------
+    params : list of dict of torch.Tensor
+        Source parameters of each event.
+    vector : torch.Tensor
+        Free parameters. Shape (n_free,).
+    misfit : torch.Tensor
+        Weighted sum of squared residuals of each event. Shape (n_events,).
+    n_iter : int
+        Number of iterations.
+    """
+    params: list
+    vector: torch.Tensor
+    misfit: torch.Tensor
+    n_iter: int
+
+
+
+
+def _groups(spec, n_events:int):
+    """
+    Groups of event indices from `True` (all events) or a sequence of groups.
+    """
+    if spec is True:
+        return [tuple(range(n_events))]
+    return [tuple(g) for g in spec]
+
+
+
+
+class JointInversion:
+    """
+    Joint forward model and misfit of several events (e.g. foreshock, mainshock and aftershocks)
+    observed at a shared station set.
+
+    The source parameters of all events are mapped from a single vector of free parameters:
+    a parameter tied between events is one entry of the vector, and a fixed parameter is not in it.
+    All events are evaluated in one batched call of `OkadaTorch.functional.okada` over the shared stations,
+    and each event is compared with its own data through its own mask, so that the misfit of all events
+    is one differentiable function of the vector (a single combined gradient).
+
+    Parameters
+    ----------
+    coords : dict of torch.Tensor
+        Same as that of `OkadaWrapper.compute`, shared by all events.
+    events : list of dict of float
+        Initial source parameters of each event (all of the same model, without batch dimensions).
+    data : torch.Tensor
+        Observed displacements of each event. Shape (n_events, 3, *x.shape),
+        or (n_events, *x.shape) if `los` is given. Values where the mask is False are ignored (may be NaN).
+    masks : torch.Tensor, default None
+        Observed stations of each event. Bool, of shape (n_events, *x.shape) (all components of a station)
+        or the shape of `data`. If None, all stations.
+    weights : torch.Tensor, default None
+        Weights of the data (e.g. 1/sigma^2). Same shape as `data`. If None, all ones.
+    tied : dict, default None
+        Parameters shared between events: name -> `True` (all events) or a sequence of groups of event indices,
+        e.g. `{"strike": True, "dip": [(0, 1)]}`.
+    fixed : dict, default None
+        Parameters held at their initial values: name -> `True` (all events) or a sequence of event indices,
+        e.g. `{"length": True, "width": True}`.
+    los : torch.Tensor, default None
+        Unit vectors (east, north, up) of the line of sight. Shape (3, *x.shape).
+    is_degree, fault_origin, nu
+        Same as those of `OkadaWrapper.compute`.
+
+    Attributes
+    ----------
+    vector : torch.Tensor
+        Initial free parameters. Shape (n_free,).
+    names : list of tuple
+        (parameter name, event indices) of each entry of the vector.
+    """
+    def __init__(self, coords:dict, events, data, masks=None, weights=None, tied:dict=None, fixed:dict=None,
+                 los=None, is_degree:bool=True, fault_origin:str="topleft", nu:float=0.25):
+
+        self.model = infer_model(events[0])
+        all_names = param_names(self.model)
+        for p in events:
+            assert infer_model(p) == self.model, "all events must be of the same model."
+            missing = [k for k in all_names if k not in p]
+            assert len(missing) == 0, f"each event requires {', '.join(repr(k) for k in missing)}."
+        tied, fixed = tied or {}, fixed or {}
+        for k in list(tied) + list(fixed):
+            assert k in all_names, f"'{k}' is not a parameter of the {self.model} model."
+
+        x, y = coords["x"], coords["y"]
+        z = coords["z"] if "z" in coords else None
+        dtype, device = x.dtype, x.device
+        self.x, self.y = x.flatten(), y.flatten()
+        self.z = z.flatten() if z is not None else None
+        self.los = los.reshape(3, -1).to(x) if los is not None else None
+        self.options = dict(is_degree=is_degree, fault_origin=fault_origin, nu=nu)
+        n_events, n_stations = len(events), self.x.numel()
+        self.n_events = n_events
+
+        # data, weights and masks as (n_events, n_obs)
+        self.data = data.reshape(n_events, -1).to(x)
+        n_obs = self.data.shape[1]
+        assert n_obs == (n_stations if los is not None else 3 * n_stations), \
+            "shape of 'data' must be (n_events, 3, *x.shape), or (n_events, *x.shape) if 'los' is given."
+        w = torch.ones_like(self.data) if weights is None else weights.reshape(n_events, -1).to(x)
+        if masks is not None:
+            m = masks.reshape(n_events, -1).to(device)
+            if m.shape[1] != n_obs:
+                m = m.repeat(1, n_obs // m.shape[1])
+            w = torch.where(m, w, 0.0)
+        self.weights = w
+        self.data = torch.where(w > 0, self.data, 0.0)
+
+        # index of each (event, parameter) in the free vector (-1 if fixed)
+        self.base = torch.tensor([[float(p[k]) for k in all_names] for p in events], dtype=dtype, device=device)
+        index = torch.full((n_events, len(all_names)), -1, dtype=torch.long)
+        names = []
+        for j, k in enumerate(all_names):
+            held = set(range(n_events)) if fixed.get(k) is True else set(fixed.get(k, ()))
+            groups = _groups(tied[k], n_events) if k in tied else []
+            for g in groups:
+                g = tuple(e for e in g if e not in held)
+                if len(g) > 0:
+                    index[list(g), j] = len(names)
+                    names.append((k, g))
+            for e in range(n_events):
+                if e not in held and index[e, j] < 0:
+                    index[e, j] = len(names)
+                    names.append((k, (e,)))
+        self.index = index.to(device)
+        self.names = names
+        self.vector = torch.stack([self.base[g[0], all_names.index(k)] for k, g in names]) if len(names) > 0 \
+            else torch.zeros(0, dtype=dtype, device=device)
+
+
+    def theta(self, vector):
+        """
+        Packed source parameters of all events. Shape (n_events, n_params).
+        """
+        free = self.index >= 0
+        return torch.where(free, vector[self.index.clamp(min=0)], self.base)
+
+
+    def params(self, vector):
+        """
+        Source parameters of each event, as a list of dicts.
+        """
+        theta = self.theta(vector)
+        return [{k: theta[e, j] for j, k in enumerate(param_names(self.model))} for e in range(self.n_events)]
+
+
+    def forward(self, vector):
+        """
+        Predictions of all events in one batched call. Shape (n_events, n_obs).
+        """
+        U = okada(self.theta(vector), self.x, self.y, self.z, self.model, False, **self.options)
+        return (U * self.los).sum(1) if self.los is not None else U.flatten(1)
+
+
+    def residual(self, vector):
+        """
+        Weighted residuals sqrt(w) (G(vector) - d) of all events, zero where masked. Shape (n_events, n_obs).
+        """
+        r = self.forward(vector) - self.data
+        return torch.where(self.weights > 0, r, 0.0) * torch.sqrt(self.weights)
+
+
+    def misfit(self, vector):
+        """
+        Weighted sum of squared residuals of each event. Shape (n_events,).
+        """
+        return (self.residual(vector)**2).sum(1)
+
+
+    def loss(self, vector):
+        """
+        Combined misfit of all events (differentiable with respect to `vector`).
+        """
+        return self.misfit(vector).sum()
+
+
+    def fit(self, vector=None, bounds:dict=None, max_iter:int=50, damping:float=1e-3, tol:float=1e-10):
+        """
+        Levenberg-Marquardt fit of the free parameters to the data of all events.
+
+        The Jacobian of the residuals of all events is computed by forward-mode differentiation
+        (`torch.func.jacfwd`) of the batched forward model, and the step is scaled by the diagonal
+        of J^T J (Marquardt), so that parameters of different units are balanced.
+
+        Parameters
+        ----------
+        vector : torch.Tensor, default None
+            Starting free parameters. If None, the initial values of the events.
+        bounds : dict of tuple of float, default None
+            (lower, upper) of parameters by name. Iterates are clamped into them.
+        max_iter : int, default 50
+            Maximum number of iterations.
+        damping : float, default 1e-3
+            Initial damping of the steps.
+        tol : float, default 1e-10
+            Stop when the relative decrease of the misfit is below `tol`.
+
+        Returns
+        -------
+        JointResult
+        """
+        v = (self.vector if vector is None else vector).detach().clone()
+        lo = torch.tensor([float((bounds or {}).get(k, (-torch.inf, torch.inf))[0]) for k, _ in self.names], dtype=v.dtype, device=v.device)
+        hi = torch.tensor([float((bounds or {}).get(k, (-torch.inf, torch.inf))[1]) for k, _ in self.names], dtype=v.dtype, device=v.device)
+        v = torch.clamp(v, lo, hi)
+
+        residual = lambda u: self.residual(u).flatten()
+        r = residual(v).detach()
+        cost = float(r @ r)
+        lam = damping
+        n_iter = 0
+        for n_iter in range(1, max_iter + 1):
+            J = torch.func.jacfwd(residual)(v)                      # (n_obs, n_free)
+            J = torch.where(torch.isfinite(J), J, 0.0)
+            A, g = J.T @ J, J.T @ r
+            diag = torch.clamp(torch.diagonal(A), min=torch.finfo(v.dtype).tiny)
+            improved = False
+            while lam < 1e10:
+                step = torch.linalg.solve(A + lam * torch.diag(diag), -g)
+                v_new = torch.clamp(v + step, lo, hi)
+                with torch.no_grad():
+                    r_new = residual(v_new)
+                cost_new = float(r_new @ r_new)
+                if cost_new < cost:
+                    improved = True
+                    break
+                lam *= 10.0
+            if not improved:
+                break
+            decrease = (cost - cost_new) / max(cost, torch.finfo(v.dtype).tiny)
+            v, r, cost = v_new, r_new, cost_new
+            lam = max(lam / 10.0, 1e-12)
+            if decrease < tol:
+                break
+
+        with torch.no_grad():
+            misfit = self.misfit(v)
+        return JointResult(params=self.params(v), vector=v, misfit=misfit, n_iter=n_iter)
@@ -0,0 +1,96 @@
+import torch
+from .inversion import greens
+
+
+
+
+class KinematicForward:
+    """
+    Station time series of a fault with fixed geometry and time-dependent slip.
+
+    The responses of the stations to unit strike- and dip-slip on each patch are computed once
+    (`OkadaTorch.inversion.greens`), and the outputs at all epochs are then a single contraction
+    with the slip history, instead of one call of `compute` per epoch.
+
+    Parameters
+    ----------
+    coords : dict of torch.Tensor
+        Same as that of `OkadaWrapper.compute`.
+    patches : dict of torch.Tensor or FaultMesh
+        Geometry of the patches (see `OkadaTorch.inversion.greens`). Each has shape (n_patches,).
+    los : torch.Tensor, default None
+        Unit vectors (east, north, up) of the line of sight. Shape (3, *x.shape).
+    compute_strain : bool, default False
+        If True, the 9 displacement derivatives are also computed (not with `los`).
+    batch_size : int, default 256
+        Number of patches evaluated in one call while building the responses.
+    is_degree, fault_origin, nu
+        Same as those of `OkadaWrapper.compute`.
+    """
+    def __init__(self, coords:dict, patches, los=None, compute_strain:bool=False, batch_size:int=256,
+                 is_degree:bool=True, fault_origin:str="topleft", nu:float=0.25):
+
+        G = greens(coords, patches, (0.0, 90.0), los, batch_size, compute_strain, is_degree, fault_origin, nu)
+        self.station_shape = coords["x"].shape
+        self.n_comp = 1 if los is not None else (12 if compute_strain else 3)
+        self.n_patches = G.shape[1] // 2
+        # (n_obs, n_patches, 2) -> (2 * n_patches, n_obs), rows ordered as slip.flatten(1)
+        self.G = G.reshape(G.shape[0], 2, self.n_patches).permute(2, 1, 0).reshape(2 * self.n_patches, -1).contiguous()
+
+
+    def _shape(self, n_epochs:int):
+        return (n_epochs,) + (() if self.n_comp == 1 else (self.n_comp,)) + tuple(self.station_shape)
+
+
+    def __call__(self, slip, chunk_size:int=None, out=None):
+        """
+        Outputs at the stations for each epoch.
+
+        Parameters
+        ----------
+        slip : torch.Tensor
+            Strike-slip and dip-slip components of each patch at each epoch. Shape (n_epochs, n_patches, 2).
+        chunk_size : int, default None
+            Number of epochs contracted at once. If None, all epochs.
+        out : torch.Tensor or numpy.ndarray, default None
+            Destination of shape (n_epochs, n_comp, *x.shape) (without n_comp with `los`),
+            e.g. a `numpy.memmap` for outputs larger than memory. Filled chunk by chunk.
+
+        Returns
+        -------
+        torch.Tensor or numpy.ndarray
+            Shape (n_epochs, n_comp, *x.shape), or (n_epochs, *x.shape) with `los`. `out` if given.
+        """
+        assert slip.dim() == 3 and slip.shape[1:] == (self.n_patches, 2), \
+            "shape of 'slip' must be (n_epochs, n_patches, 2)."
+        n_epochs = slip.shape[0]
+        if out is None and chunk_size is None:
+            return (slip.reshape(n_epochs, -1).to(self.G) @ self.G).reshape(self._shape(n_epochs))
+
+        if out is None:
+            out = torch.empty(self._shape(n_epochs), dtype=self.G.dtype, device=self.G.device)
+        assert tuple(out.shape) == self._shape(n_epochs), f"shape of 'out' must be {self._shape(n_epochs)}."
+        for start, U in self.stream(slip, chunk_size or n_epochs):
+            if isinstance(out, torch.Tensor):
+                out[start:start + len(U)] = U
+            else:
+                out[start:start + len(U)] = U.cpu().numpy()
+        return out
+
+
+    def stream(self, slip, chunk_size:int):
+        """
+        Iterate over chunks of epochs without holding the whole output.
+
+        Yields
+        ------
+        int
+            Index of the first epoch of the chunk.
+        torch.Tensor
+            Outputs of the chunk. Shape (chunk, n_comp, *x.shape), or (chunk, *x.shape) with `los`.
+        """
+        assert slip.dim() == 3 and slip.shape[1:] == (self.n_patches, 2), \
+            "shape of 'slip' must be (n_epochs, n_patches, 2)."
+        for start in range(0, slip.shape[0], chunk_size):
+            s = slip[start:start + chunk_size]
+            yield start, (s.reshape(len(s), -1).to(self.G) @ self.G).reshape(self._shape(len(s)))
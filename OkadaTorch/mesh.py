@@ -0,0 +1,322 @@
+import math
+import torch
+from .functional import RECTANGLE_PARAMS
+
+
+# geometric parameters of a patch, in the order of the packed tensor
+MESH_PARAMS = ("x_fault", "y_fault", "depth", "length", "width", "strike", "dip")
+
+
+
+
+class FaultMesh:
+    """
+    Rectangular patches of a fault, stored as contiguous tensors of shape (n_patches,).
+
+    Patches of a gridded mesh (`shape` is not None) are ordered with the strike index varying fastest,
+    i.e. patch `i_dip * n_strike + i_strike`, the same as `OkadaTorch.inversion.laplacian`.
+
+    Parameters
+    ----------
+    x_fault, y_fault, depth, length, width, strike, dip : torch.Tensor
+        Geometry of each patch (see `OkadaWrapper.compute`). Broadcast to a common shape (n_patches,).
+    origin : str, default "topleft"
+        `fault_origin` to which `x_fault`, `y_fault` and `depth` refer ("topleft" or "center").
+    is_degree : bool, default True
+        If True, `strike` and `dip` are in degrees, otherwise in radians.
+    shape : tuple of int, default None
+        (n_dip, n_strike) if the patches form a grid, otherwise None.
+    """
+    def __init__(self, x_fault, y_fault, depth, length, width, strike, dip,
+                 origin:str="topleft", is_degree:bool=True, shape=None):
+
+        if origin not in ["topleft", "center"]:
+            raise ValueError("'origin' must be either 'topleft' or 'center'.")
+
+        values = torch.broadcast_tensors(*[
+            torch.as_tensor(v) for v in [x_fault, y_fault, depth, length, width, strike, dip]
+        ])
+        dtype = values[0].dtype
+        for v in values[1:]:
+            dtype = torch.promote_types(dtype, v.dtype)
+        dtype = dtype if dtype.is_floating_point else torch.get_default_dtype()
+        for k, v in zip(MESH_PARAMS, values):
+            assert v.dim() == 1, "geometry of the patches must be 1D tensors."
+            setattr(self, k, v.to(dtype).contiguous())
+
+        if shape is not None:
+            shape = tuple(int(n) for n in shape)
+            assert math.prod(shape) == len(self), "'shape' must be (n_dip, n_strike) with n_dip * n_strike = n_patches."
+        self.origin = origin
+        self.is_degree = is_degree
+        self.shape = shape
+
+
+    def __len__(self):
+        return self.x_fault.shape[0]
+
+
+    def __repr__(self):
+        return f"FaultMesh(n_patches={len(self)}, shape={self.shape}, origin='{self.origin}')"
+
+
+    @property
+    def dtype(self):
+        return self.x_fault.dtype
+
+
+    @property
+    def device(self):
+        return self.x_fault.device
+
+
+    def _replace(self, **kwargs):
+        values = {k: getattr(self, k) for k in MESH_PARAMS}
+        values.update(origin=self.origin, is_degree=self.is_degree, shape=self.shape)
+        values.update(kwargs)
+        return FaultMesh(**values)
+
+
+    def to(self, dtype=None, device=None):
+        """
+        Copy of the mesh with the tensors converted to `dtype` and moved to `device`.
+        """
+        return self._replace(**{k: getattr(self, k).to(dtype=dtype, device=device) for k in MESH_PARAMS})
+
+
+    def to_origin(self, origin:str):
+        """
+        Copy of the mesh whose `x_fault`, `y_fault` and `depth` refer to `origin` ("topleft" or "center").
+
+        The center is reached from the top left corner by half the length along strike
+        and half the width down dip (the fault dips to the right of the strike direction).
+        """
+
+        if origin not in ["topleft", "center"]:
+            raise ValueError("'origin' must be either 'topleft' or 'center'.")
+        if origin == self.origin:
+            return self
+
+        strike, dip = (torch.deg2rad(self.strike), torch.deg2rad(self.dip)) if self.is_degree else (self.strike, self.dip)
+        ss, cs, sd, cd = torch.sin(strike), torch.cos(strike), torch.sin(dip), torch.cos(dip)
+        sign = 1.0 if origin == "center" else -1.0
+        half_l, half_w = sign * self.length / 2, sign * self.width / 2
+        return self._replace(
+            x_fault=self.x_fault + half_l * ss + half_w * cd * cs,
+            y_fault=self.y_fault + half_l * cs - half_w * cd * ss,
+            depth=self.depth + half_w * sd,
+            origin=origin,
+        )
+
+
+    def params(self, rake=None, slip=None):
+        """
+        Dict of batched source parameters in the format of `OkadaWrapper.compute` and `functional.pack`.
+        `rake` and `slip` (float or tensor broadcast to (n_patches,)) are included if given.
+        """
+        params = {k: getattr(self, k) for k in MESH_PARAMS}
+        if rake is not None:
+            params["rake"] = torch.as_tensor(rake, dtype=self.dtype, device=self.device).expand(len(self))
+        if slip is not None:
+            params["slip"] = torch.as_tensor(slip, dtype=self.dtype, device=self.device).expand(len(self))
+        return params
+
+
+    def pack(self, rake, slip):
+        """
+        Packed parameters of the patches for `OkadaTorch.functional.okada`
+        (to be called with `fault_origin=mesh.origin` and `is_degree=mesh.is_degree`).
+
+        Parameters
+        ----------
+        rake, slip : float or torch.Tensor
+            Broadcast to (..., n_patches), so that leading dimensions are further batch dimensions.
+
+        Returns
+        -------
+        torch.Tensor
+            Shape (..., n_patches, 9).
+        """
+        rake = torch.as_tensor(rake, dtype=self.dtype, device=self.device)
+        slip = torch.as_tensor(slip, dtype=self.dtype, device=self.device)
+        batch_shape = torch.broadcast_shapes(rake.shape, slip.shape, (len(self),))
+        values = {k: getattr(self, k).expand(batch_shape) for k in MESH_PARAMS}
+        values["rake"], values["slip"] = rake.expand(batch_shape), slip.expand(batch_shape)
+        return torch.stack([values[k] for k in RECTANGLE_PARAMS], dim=-1)
+
+
+    def laplacian(self, n_comp:int=1, boundary:str="free"):
+        """
+        `OkadaTorch.inversion.laplacian` on the grid of the mesh,
+        with the mean patch length and width as spacing.
+        """
+        from .inversion import laplacian
+        assert self.shape is not None, "the patches of the mesh do not form a grid."
+        n_dip, n_strike = self.shape
+        spacing = (float(self.length.mean()), float(self.width.mean()))
+        return laplacian(n_strike, n_dip, n_comp, spacing, boundary)
+
+
+
+
+def cat(meshes):
+    """
+    Concatenate meshes (converted to the origin of the first one). The result has no grid `shape`.
+    """
+    origin = meshes[0].origin
+    meshes = [m.to_origin(origin) for m in meshes]
+    assert all(m.is_degree == meshes[0].is_degree for m in meshes), "'is_degree' of the meshes must be same."
+    return FaultMesh(
+        *[torch.cat([getattr(m, k) for m in meshes]) for k in MESH_PARAMS],
+        origin=origin, is_degree=meshes[0].is_degree,
+    )
+
+
+
+def _rows(x, y, depth, strike, dips, widths, lengths, n_strike:int, is_degree:bool, dtype, device):
+    """
+    Top-left corners of a grid of patches hanging from the top edge (x, y, depth) of a planar trace,
+    with per-row dip and width (listric profile). Return (n_dip, n_strike) tensors.
+    """
+    to_rad = math.pi / 180.0 if is_degree else 1.0
+    ss, cs = math.sin(strike * to_rad), math.cos(strike * to_rad)
+    dips = torch.as_tensor(dips, dtype=dtype, device=device).flatten()
+    widths = torch.as_tensor(widths, dtype=dtype, device=device).flatten().expand(len(dips))
+    sd, cd = torch.sin(dips * to_rad), torch.cos(dips * to_rad)
+
+    # down-dip offsets of the top edge of each row
+    horizontal = torch.cat([torch.zeros(1, dtype=dtype, device=device), torch.cumsum(widths * cd, 0)[:-1]])
+    vertical = torch.cat([torch.zeros(1, dtype=dtype, device=device), torch.cumsum(widths * sd, 0)[:-1]])
+    along = torch.cat([torch.zeros(1, dtype=dtype, device=device), torch.cumsum(lengths, 0)[:-1]])
+
+    X = x + along[None, :] * ss + horizontal[:, None] * cs
+    Y = y + along[None, :] * cs - horizontal[:, None] * ss
+    D = (depth + vertical)[:, None].expand(-1, n_strike)
+    shape = (len(dips), n_strike)
+    return (
+        X, Y, D, lengths[None, :].expand(shape), widths[:, None].expand(shape),
+        torch.full(shape, strike, dtype=dtype, device=device), dips[:, None].expand(shape),
+    )
+
+
+
+def planar(x:float, y:float, depth:float, strike:float, dip:float, length:float, width:float,
+           n_strike:int, n_dip:int, origin:str="topleft", is_degree:bool=True, dtype=None, device=None):
+    """
+    Uniform tiling of a planar rectangular fault into n_strike * n_dip patches.
+
+    Parameters
+    ----------
+    x, y, depth : float
+        Top left corner of the whole fault.
+    strike, dip, length, width : float
+        Geometry of the whole fault.
+    n_strike, n_dip : int
+        Number of patches along strike and along dip.
+    origin : str, default "topleft"
+        `fault_origin` of the patches of the returned mesh.
+    is_degree : bool, default True
+        If True, `strike` and `dip` are in degrees.
+    dtype, device
+        Of the tensors. If None, the default dtype and device.
+
+    Returns
+    -------
+    FaultMesh
+    """
+    return listric(x, y, depth, strike, [dip] * n_dip, width / n_dip, length, n_strike,
+                   origin=origin, is_degree=is_degree, dtype=dtype, device=device)
+
+
+
+def listric(x:float, y:float, depth:float, strike:float, dips, widths, length:float, n_strike:int,
+            origin:str="topleft", is_degree:bool=True, dtype=None, device=None):
+    """
+    Fault whose dip changes with depth: rows of patches with their own dip and width,
+    each row hanging from the bottom edge of the one above.
+
+    Parameters
+    ----------
+    x, y, depth : float
+        Top left corner of the whole fault.
+    strike : float
+        Strike of the fault.
+    dips : sequence of float or torch.Tensor
+        Dip of each row, from the top (e.g. decreasing with depth for a listric fault).
+    widths : float or sequence of float
+        Width of each row (a float for all rows).
+    length : float
+        Length of the fault along strike.
+    n_strike : int
+        Number of patches along strike.
+    origin, is_degree, dtype, device
+        Same as those of `planar`.
+
+    Returns
+    -------
+    FaultMesh
+    """
+    dtype = dtype if dtype is not None else torch.get_default_dtype()
+    lengths = torch.full((n_strike,), length / n_strike, dtype=dtype, device=device)
+    values = _rows(x, y, depth, strike, dips, widths, lengths, n_strike, is_degree, dtype, device)
+    mesh = FaultMesh(*[v.flatten() for v in values], origin="topleft", is_degree=is_degree, shape=values[0].shape)
+    return mesh.to_origin(origin)
+
+
+
+def segmented(trace_x, trace_y, depth:float, dip, width:float, n_dip:int, patch_length:float,
+              origin:str="topleft", is_degree:bool=True, dtype=None, device=None):
+    """
+    Fault following a polyline surface trace: one planar segment between consecutive vertices,
+    each divided into patches of about `patch_length` along strike.
+
+    The fault dips to the right of the direction of the trace.
+    The segments share the rows along dip, so that the mesh is a grid of
+    n_dip * (total number of patches along strike), continuous across the segment junctions
+    (e.g. for `FaultMesh.laplacian`).
+
+    Parameters
+    ----------
+    trace_x, trace_y : sequence of float
+        Vertices of the top edge of the fault (at least 2).
+    depth : float
+        Depth of the top edge.
+    dip : float or sequence of float
+        Dip of the fault, or of each segment.
+    width : float
+        Width of the fault along dip.
+    n_dip : int
+        Number of patches along dip.
+    patch_length : float
+        Target length of the patches along strike.
+    origin, is_degree, dtype, device
+        Same as those of `planar`.
+
+    Returns
+    -------
+    FaultMesh
+    """
+    dtype = dtype if dtype is not None else torch.get_default_dtype()
+    trace_x, trace_y = [float(v) for v in trace_x], [float(v) for v in trace_y]
+    assert len(trace_x) == len(trace_y) >= 2, "the trace requires at least 2 vertices."
+    n_segments = len(trace_x) - 1
+    dips = [float(d) for d in dip] if hasattr(dip, "__len__") else [float(dip)] * n_segments
+    assert len(dips) == n_segments, "'dip' must be a float or one value per segment."
+
+    blocks = []
+    for i in range(n_segments):
+        dx, dy = trace_x[i + 1] - trace_x[i], trace_y[i + 1] - trace_y[i]
+        seg_length = math.hypot(dx, dy)
+        strike = math.atan2(dx, dy)
+        strike = math.degrees(strike) % 360.0 if is_degree else strike % (2 * math.pi)
+        n_strike = max(1, round(seg_length / patch_length))
+        lengths = torch.full((n_strike,), seg_length / n_strike, dtype=dtype, device=device)
+        blocks.append(_rows(
+            trace_x[i], trace_y[i], depth, strike, [dips[i]] * n_dip, width / n_dip,
+            lengths, n_strike, is_degree, dtype, device
+        ))
+
+    # join the segments along strike, row by row
+    values = [torch.cat([b[k] for b in blocks], dim=1) for k in range(len(MESH_PARAMS))]
+    mesh = FaultMesh(*[v.flatten() for v in values], origin="topleft", is_degree=is_degree, shape=values[0].shape)
+    return mesh.to_origin(origin)
@@ -1,9 +1,11 @@
 import torch
-from .utils import _SRECTG
+from .utils import _SRECTG, _nonzero, _accumulate, _filled
+from .profiling import profiled
 
 PI2 = 2.0 * torch.pi
 
 
+@profiled("SPOINT")
 def SPOINT(ALP, X, Y, D, SD, CD, DISL1, DISL2, DISL3, compute_strain=True):
     """
     Surface displacement, strain, tilt due to buried point source 
@@ -48,11 +50,11 @@ def SPOINT(ALP, X, Y, D, SD, CD, DISL1, DISL2, DISL3, compute_strain=True):
     PyTorch implementation by M.Someya in 2025.
     """
 
-    # Initialization
+    # Initialization (Python zeros; turned into tensors by the first contribution)
     if compute_strain:
-        U1, U2, U3, U11, U12, U21, U22, U31, U32 = [torch.zeros_like(X) for _ in range(9)]
+        U1, U2, U3, U11, U12, U21, U22, U31, U32 = [0.0] * 9
     else:
-        U1, U2, U3 = [torch.zeros_like(X) for _ in range(3)]
+        U1, U2, U3 = [0.0] * 3
 
 
     P = Y * CD + D * SD
@@ -64,7 +66,7 @@ def SPOINT(ALP, X, Y, D, SD, CD, DISL1, DISL2, DISL3, compute_strain=True):
     R2 = X2 + Y2 + D2
     R = torch.sqrt(R2)
     R3 = R**3
-    R5 = R**5
+    R5 = R3 * R2
     QR = 3.0 * Q / R5
     RD = R + D
     R12 = 1.0 / (R * RD**2)
@@ -79,7 +81,7 @@ def SPOINT(ALP, X, Y, D, SD, CD, DISL1, DISL2, DISL3, compute_strain=True):
 
 
     if compute_strain:
-        R4 = R**4
+        R4 = R2**2
         S = P * SD + Q * CD
         XR  = 5.0 * X2 / R2
         YR  = 5.0 * Y2 / R2
@@ -99,7 +101,7 @@ def SPOINT(ALP, X, Y, D, SD, CD, DISL1, DISL2, DISL3, compute_strain=True):
 
 
     # STRIKE-SLIP CONTRIBUTION
-    if DISL1 != 0.0:
+    if _nonzero(DISL1):
         UN = DISL1 / PI2
         QRX = QR * X
         U1 = U1 - UN * (QRX * X + A1 * SD)
@@ -117,7 +119,7 @@ def SPOINT(ALP, X, Y, D, SD, CD, DISL1, DISL2, DISL3, compute_strain=True):
 
 
     # DIP-SLIP CONTRIBUTION
-    if DISL2 != 0.0:
+    if _nonzero(DISL2):
         UN = DISL2 / PI2
         SDCD = SD * CD
         QRP = QR * P
@@ -136,7 +138,7 @@ def SPOINT(ALP, X, Y, D, SD, CD, DISL1, DISL2, DISL3, compute_strain=True):
 
 
     # TENSILE-FAULT CONTRIBUTION
-    if DISL3 != 0.0:
+    if _nonzero(DISL3):
         UN = DISL3 / PI2
         SDSD = SD**2
         QRQ = QR * Q
@@ -155,13 +157,14 @@ def SPOINT(ALP, X, Y, D, SD, CD, DISL1, DISL2, DISL3, compute_strain=True):
 
 
     if compute_strain:
-        return [U1, U2, U3, U11, U12, U21, U22, U31, U32]
+        return _filled([U1, U2, U3, U11, U12, U21, U22, U31, U32], X)
     else:
-        return [U1, U2, U3]
+        return _filled([U1, U2, U3], X)
 
 
 
 
+@profiled("SRECTF")
 def SRECTF(ALP, X, Y, DEP, AL, AW, SD, CD, DISL1, DISL2, DISL3, compute_strain=True):
     """
     Surface displacements, strains and tilts due to rectangular fault in a half-space.
@@ -211,8 +214,7 @@ def SRECTF(ALP, X, Y, DEP, AL, AW, SD, CD, DISL1, DISL2, DISL3, compute_strain=T
         
     # Initialization
     N_variable = 9 if compute_strain else 3
-    U = [torch.zeros_like(X) for _ in range(N_variable)]
-    DU = [torch.zeros_like(X) for _ in range(N_variable)]
+    U = [None] * N_variable
 
 
     P = Y * CD + DEP * SD
@@ -229,8 +231,7 @@ def SRECTF(ALP, X, Y, DEP, AL, AW, SD, CD, DISL1, DISL2, DISL3, compute_strain=T
                 ALP, XI, ET, Q, SD, CD, DISL1, DISL2, DISL3, compute_strain
             )
 
-            for I in range(N_variable):
-                U[I] = U[I] + SIGN * DU[I]
+            _accumulate(U, DU, SIGN)
 
 
     return U
@@ -1,12 +1,14 @@
 import torch
-from .utils import _UA0, _UB0, _UC0, _UA, _UB, _UC, COMMON0, COMMON1, COMMON2
+from .utils import _UA0, _UB0, _UC0, _UA, _UB, _UC, DCCON0, DCCON1, DCCON2
+from .utils import _eps, _accumulate
+from .profiling import profiled
 
 PI2 = 2.0 * torch.pi
-EPS = 1.0e-6
 
 
 
 
+@profiled("DC3D0")
 def DC3D0(ALPHA, X, Y, Z, DEPTH, DIP, POT1, POT2, POT3, POT4, 
           compute_strain=True, is_degree=True):
     """
@@ -70,10 +72,6 @@ def DC3D0(ALPHA, X, Y, Z, DEPTH, DIP, POT1, POT2, POT3, POT4,
 
     # Initialization
     N_variable = 12 if compute_strain else 3
-    U = [torch.zeros_like(X) for _ in range(N_variable)]
-    DUA = [torch.zeros_like(X) for _ in range(N_variable)]
-    DUB = [torch.zeros_like(X) for _ in range(N_variable)]
-    DUC = [torch.zeros_like(X) for _ in range(N_variable)]
     IRET = torch.zeros_like(X, dtype=torch.int)
 
     IRET = torch.where(
@@ -82,14 +80,12 @@ def DC3D0(ALPHA, X, Y, Z, DEPTH, DIP, POT1, POT2, POT3, POT4,
         IRET
     )
     
-    C0 = COMMON0()
-    C0.DCCON0(ALPHA, DIP, is_degree)
+    C0 = DCCON0(ALPHA, DIP, is_degree)
 
 
     # REAL-SOURCE CONTRIBUTION
     DD = DEPTH + Z
-    C1 = COMMON1()
-    C1.DCCON1(X, Y, DD, C0)
+    C1 = DCCON1(X, Y, DD, C0)
 
 
     # IN CASE OF SINGULAR (R=0)
@@ -101,18 +97,14 @@ def DC3D0(ALPHA, X, Y, Z, DEPTH, DIP, POT1, POT2, POT3, POT4,
     
     DUA = _UA0(X, Y, DD, POT1, POT2, POT3, POT4, C0, C1, compute_strain)
     if compute_strain:
-        for I in range(9):
-            U[I] = U[I] - DUA[I]
-        for I in range(3):
-            U[I+9] = U[I+9] + DUA[I+9]
+        U = [-DUA[I] for I in range(9)] + DUA[9:]
     else:
-        for I in range(3):
-            U[I] = U[I] - DUA[I]
+        U = [-DUA[I] for I in range(3)]
 
 
     # IMAGE-SOURCE CONTRIBUTION
     DD = DEPTH - Z
-    C1.DCCON1(X, Y, DD, C0)
+    C1 = DCCON1(X, Y, DD, C0)
 
     DUA = _UA0(X, Y, DD, POT1, POT2, POT3, POT4, C0, C1, compute_strain)
     DUB = _UB0(X, Y, DD, Z, POT1, POT2, POT3, POT4, C0, C1, compute_strain)
@@ -130,6 +122,7 @@ def DC3D0(ALPHA, X, Y, Z, DEPTH, DIP, POT1, POT2, POT3, POT4,
 
 
 
+@profiled("DC3D")
 def DC3D(ALPHA, X, Y, Z, DEPTH, DIP, AL1, AL2, AW1, AW2, DISL1, DISL2, DISL3, 
          compute_strain=True, is_degree=True):
     """
@@ -194,16 +187,14 @@ def DC3D(ALPHA, X, Y, Z, DEPTH, DIP, AL1, AL2, AW1, AW2, DISL1, DISL2, DISL3,
 
     # Initialization
     N_variable = 12 if compute_strain else 3
-    U = [torch.zeros_like(X) for _ in range(N_variable)]
-    DU = [torch.zeros_like(X) for _ in range(N_variable)]
-    DUA = [torch.zeros_like(X) for _ in range(N_variable)]
-    DUB = [torch.zeros_like(X) for _ in range(N_variable)]
-    DUC = [torch.zeros_like(X) for _ in range(N_variable)]
-    XI = [torch.zeros_like(X) for _ in range(2)]
-    ET = [torch.zeros_like(X) for _ in range(2)]
-    KXI = [torch.zeros_like(X, dtype=torch.int) for _ in range(2)]
-    KET = [torch.zeros_like(X, dtype=torch.int) for _ in range(2)]
+    U = [None] * N_variable
+    DU = [None] * N_variable
+    XI = [None] * 2
+    ET = [None] * 2
+    KXI = [None] * 2
+    KET = [None] * 2
     IRET = torch.zeros_like(X, dtype=torch.int)
+    eps = _eps(X)
 
     IRET = torch.where(
         Z > 0.0, 
@@ -211,18 +202,17 @@ def DC3D(ALPHA, X, Y, Z, DEPTH, DIP, AL1, AL2, AW1, AW2, DISL1, DISL2, DISL3,
         IRET
     )
 
-    C0 = COMMON0()
-    C0.DCCON0(ALPHA, DIP, is_degree)
+    C0 = DCCON0(ALPHA, DIP, is_degree)
     SD, CD = C0.SD, C0.CD 
 
 
     XI[0] = torch.where(
-        torch.abs(X - AL1) < EPS,
+        torch.abs(X - AL1) < eps,
         0.0,
         X - AL1
     )
     XI[1] = torch.where(
-        torch.abs(X - AL2) < EPS,
+        torch.abs(X - AL2) < eps,
         0.0,
         X - AL2
     )
@@ -232,17 +222,17 @@ def DC3D(ALPHA, X, Y, Z, DEPTH, DIP, AL1, AL2, AW1, AW2, DISL1, DISL2, DISL3,
     D = DEPTH + Z
     P = Y * CD + D * SD
     Q = torch.where(
-        torch.abs(Y * SD - D * CD) < EPS,
+        torch.abs(Y * SD - D * CD) < eps,
         0.0,
         Y * SD - D * CD
     )
     ET[0] = torch.where(
-        torch.abs(P - AW1) < EPS,
+        torch.abs(P - AW1) < eps,
         0.0,
         P - AW1
     )
     ET[1] = torch.where(
-        torch.abs(P - AW2) < EPS,
+        torch.abs(P - AW2) < eps,
         0.0,
         P - AW2
     )
@@ -267,31 +257,29 @@ def DC3D(ALPHA, X, Y, Z, DEPTH, DIP, AL1, AL2, AW1, AW2, DISL1, DISL2, DISL3,
     R22 = torch.sqrt(XI[1]**2 + ET[1]**2 + Q**2)
 
     KXI[0] = torch.where(
-        torch.logical_and(XI[0] < 0.0, R21 + XI[1] < EPS),
+        torch.logical_and(XI[0] < 0.0, R21 + XI[1] < eps),
         1,
         0
     )
     KXI[1] = torch.where(
-        torch.logical_and(XI[0] < 0.0, R22 + XI[1] < EPS),
+        torch.logical_and(XI[0] < 0.0, R22 + XI[1] < eps),
         1,
         0
     )
     KET[0] = torch.where(
-        torch.logical_and(ET[0] < 0.0, R12 + ET[1] < EPS),
+        torch.logical_and(ET[0] < 0.0, R12 + ET[1] < eps),
         1,
         0
     )
     KET[1] = torch.where(
-        torch.logical_and(ET[0] < 0.0, R22 + ET[1] < EPS),
+        torch.logical_and(ET[0] < 0.0, R22 + ET[1] < eps),
         1,
         0
     )
     
-    C2 = COMMON2()
-
     for K in range(2):
         for J in range(2):
-            C2.DCCON2(XI[J], ET[K], Q, SD, CD, KXI[K], KET[J])
+            C2 = DCCON2(XI[J], ET[K], Q, SD, CD, KXI[K], KET[J])
             DUA = _UA(XI[J], ET[K], Q, DISL1, DISL2, DISL3, C0, C2, compute_strain)
 
             if compute_strain:
@@ -309,11 +297,7 @@ def DC3D(ALPHA, X, Y, Z, DEPTH, DIP, AL1, AL2, AW1, AW2, DISL1, DISL2, DISL3,
                 DU[2] = -DUA[1] * SD - DUA[2] * CD
 
 
-            for I in range(N_variable):
-                if (J + K == 1):
-                    U[I] = U[I] - DU[I]
-                else:
-                    U[I] = U[I] + DU[I]
+            _accumulate(U, DU, -1.0 if (J + K == 1) else 1.0)
 
 
 
@@ -321,17 +305,17 @@ def DC3D(ALPHA, X, Y, Z, DEPTH, DIP, AL1, AL2, AW1, AW2, DISL1, DISL2, DISL3,
     D = DEPTH - Z
     P = Y * CD + D * SD
     Q = torch.where(
-        torch.abs(Y * SD - D * CD) < EPS,
+        torch.abs(Y * SD - D * CD) < eps,
         0.0,
         Y * SD - D * CD
     )
     ET[0] = torch.where(
-        torch.abs(P - AW1) < EPS,
+        torch.abs(P - AW1) < eps,
         0.0,
         P - AW1
     )
     ET[1] = torch.where(
-        torch.abs(P - AW2) < EPS,
+        torch.abs(P - AW2) < eps,
         0.0,
         P - AW2
     )
@@ -356,22 +340,22 @@ def DC3D(ALPHA, X, Y, Z, DEPTH, DIP, AL1, AL2, AW1, AW2, DISL1, DISL2, DISL3,
     R22 = torch.sqrt(XI[1]**2 + ET[1]**2 + Q**2)
     
     KXI[0] = torch.where(
-        torch.logical_and(XI[0] < 0.0, R21 + XI[1] < EPS),
+        torch.logical_and(XI[0] < 0.0, R21 + XI[1] < eps),
         1,
         0
     )
     KXI[1] = torch.where(
-        torch.logical_and(XI[0] < 0.0, R22 + XI[1] < EPS),
+        torch.logical_and(XI[0] < 0.0, R22 + XI[1] < eps),
         1,
         0
     )
     KET[0] = torch.where(
-        torch.logical_and(ET[0] < 0.0, R12 + ET[1] < EPS),
+        torch.logical_and(ET[0] < 0.0, R12 + ET[1] < eps),
         1,
         0
     )
     KET[1] = torch.where(
-        torch.logical_and(ET[0] < 0.0, R22 + ET[1] < EPS),
+        torch.logical_and(ET[0] < 0.0, R22 + ET[1] < eps),
         1,
         0
     )
@@ -380,7 +364,7 @@ def DC3D(ALPHA, X, Y, Z, DEPTH, DIP, AL1, AL2, AW1, AW2, DISL1, DISL2, DISL3,
 
     for K in range(2):
         for J in range(2):
-            C2.DCCON2(XI[J], ET[K], Q, SD, CD, KXI[K], KET[J])
+            C2 = DCCON2(XI[J], ET[K], Q, SD, CD, KXI[K], KET[J])
             DUA = _UA(XI[J], ET[K], Q, DISL1, DISL2, DISL3, C0, C2, compute_strain)
             DUB = _UB(XI[J], ET[K], Q, DISL1, DISL2, DISL3, C0, C2, compute_strain)
             DUC = _UC(XI[J], ET[K], Q, Z, DISL1, DISL2, DISL3, C0, C2, compute_strain)
@@ -400,11 +384,7 @@ def DC3D(ALPHA, X, Y, Z, DEPTH, DIP, AL1, AL2, AW1, AW2, DISL1, DISL2, DISL3,
                 DU[2] = (DUA[1] + DUB[1] - Z * DUC[1]) * SD + (DUA[2] + DUB[2] - Z * DUC[2]) * CD
 
 
-            for I in range(N_variable):
-                if (J + K == 1):
-                    U[I] = U[I] - DU[I]
-                else:
-                    U[I] = U[I] + DU[I]
+            _accumulate(U, DU, -1.0 if (J + K == 1) else 1.0)
                     
 
 
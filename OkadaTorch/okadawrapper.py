@@ -1,8 +1,58 @@
+import contextlib
 import torch
+from typing import NamedTuple
 from torch.func import jacfwd, vmap
-from .okada1985 import SPOINT, SRECTF
-from .okada1992 import DC3D0, DC3D
-from .geometry import setup, rotate_vector, rotate_tensor
+from .functional import _okada, pack, infer_model
+from .aot import KernelCache
+from .incremental import IncrementalEvaluator
+from .syncfree import sync_guard
+from .profiling import profiled
+from . import profiling
+
+
+
+
+class Status(NamedTuple):
+    """
+    Validity of the output of `OkadaWrapper.compute` at each station.
+
+    Attributes
+    ----------
+    iret : torch.Tensor (int)
+        Return code of the kernel. 0 means normal, 1 means singular
+        (on a fault edge, or at a point source) and 2 means positive z was given.
+        Always 0 for `SPOINT`/`SRECTF`.
+    nonfinite : torch.Tensor (bool)
+        `True` where any output component is NaN or Inf.
+    """
+    iret: torch.Tensor
+    nonfinite: torch.Tensor
+
+
+
+def _untracked(tensors):
+    """
+    Check that no tensor requires grad and no `torch.func` transform is active,
+    i.e. that results may be cached or computed outside autograd.
+    """
+    if torch.is_grad_enabled() and any(t.requires_grad for t in tensors):
+        return False
+    if any(torch._C._functorch.is_functorch_wrapped_tensor(t) for t in tensors):
+        return False
+    return True
+
+
+
+def _partition(z):
+    """
+    Indices of the surface (z == 0) and subsurface stations in flattened `z`,
+    and the permutation that puts their concatenation back in order.
+    """
+    surface = (z == 0.0)
+    idx_s = torch.nonzero(surface).squeeze(1)
+    idx_b = torch.nonzero(~surface).squeeze(1)
+    inv = torch.argsort(torch.cat([idx_s, idx_b]))
+    return idx_s, idx_b, inv
 
 
 
@@ -11,12 +61,202 @@ class OkadaWrapper:
     """
     Convenient wrapper class to use functions 
     `SPOINT`, `SRECTF`, `DC3D0` and `DC3D`.
+
+    Parameters
+    ----------
+    cache_dir : str, default None
+        Directory of precompiled kernels written by `OkadaTorch.aot.build`.
+    use_aot : bool, default False
+        If `True`, `compute` uses the precompiled variant in `cache_dir` matching its arguments
+        instead of the eager kernels whenever possible (see `compute`).
+        Off by default: the precompiled kernels are not faster than the eager ones in the
+        benchmarks so far (docs/AOT.md); benchmark on the target machine before enabling it.
+    sync_free : bool, default False
+        If `True`, `compute` never synchronises the host and the device:
+        options that need one (`surface_dispatch`, `invalid="drop"` and `invalid="raise"`)
+        raise ValueError, and on CUDA any synchronisation inside `compute` is an error
+        (`torch.cuda.set_sync_debug_mode("error")`).
+        Kernel launches can then be queued asynchronously (e.g. across CUDA streams).
+    device : torch.device or str, default None
+        Device on which coordinates and parameters are placed. 
+        If None, the device of `coords` is used as given.
+    dtype : torch.dtype, default None
+        Floating type to which coordinates and parameters are converted.
+        If None, the dtype of `coords` is used as given.
+    compute_strain, is_degree, fault_origin, nu
+        Defaults of the same arguments of `compute`, `gradient` and `hessian`,
+        used when they are omitted (None) there.
+    incremental : bool, default False
+        If `True`, `compute` on the stations bound by `bind` recomputes only the stages
+        depending on the parameters changed since the previous call
+        (see `OkadaTorch.incremental.IncrementalEvaluator`).
+        Parameter values are read on the host, so this cannot be combined with `sync_free`.
     """
-    def __init__(self):
-        pass
+    def __init__(self, cache_dir:str=None, sync_free:bool=False, device=None, dtype=None,
+                 compute_strain:bool=True, is_degree:bool=True, fault_origin:str="topleft", nu:float=0.25,
+                 incremental:bool=False, use_aot:bool=False):
+        if use_aot and cache_dir is None:
+            raise ValueError("'use_aot' requires 'cache_dir'.")
+        if fault_origin not in ["topleft", "center"]:
+            raise ValueError("'fault_origin' must be either 'topleft' or 'center'.")
+        if incremental and sync_free:
+            raise ValueError("'incremental' reads parameter values on the host and cannot be used with sync_free=True.")
+
+        self.kernels = KernelCache(cache_dir) if use_aot else None
+        self.sync_free = sync_free
+        self.device = torch.device(device) if device is not None else None
+        self.dtype = dtype
+        self.compute_strain = compute_strain
+        self.is_degree = is_degree
+        self.fault_origin = fault_origin
+        self.nu = nu
+        self.stations = None
+        self._partition = None
+        self._workspace = {}
+        self.incremental = IncrementalEvaluator() if incremental else None
+
+
+
+    def bind(self, coords:dict):
+        """
+        Bind a station set to the instance.
+
+        Coordinates are converted once to contiguous tensors on the configured device and dtype,
+        and the terms that do not depend on the source (the partition into surface and subsurface
+        stations used by `surface_dispatch`) are computed once.
+        Later calls of `compute`, `gradient` and `hessian` with `coords=None` use the bound stations
+        and do no conversion work on them.
+
+        Parameters
+        ----------
+        coords : dict of torch.Tensor, or None
+            Same as that of `compute`. Values may also be floats, lists or numpy arrays.
+            If None, the bound stations are released.
+
+        Returns
+        -------
+        OkadaWrapper
+            The instance itself.
+        """
+        if self.incremental is not None:
+            self.incremental.reset()
+        if coords is None:
+            self.stations = None
+            self._partition = None
+            return self
+
+        assert ("x" in coords) and ("y" in coords), "'coords' requires 'x' and 'y'."
+        self.stations = self._normalize(coords)
+        x = self.stations["x"]
+        assert x.shape == self.stations["y"].shape, "shepe of x and y must be same."
+        if "z" in self.stations:
+            assert x.shape == self.stations["z"].shape, "shepe of x, y and z must be same."
+            self._partition = _partition(self.stations["z"].flatten())
+        else:
+            self._partition = None
+        return self
+
+
+
+    def add_stations(self, coords:dict):
+        """
+        Append stations to the bound (1D) station set.
+
+        With `incremental=True`, the cached rotation and Green's functions are extended by evaluating
+        the kernels for the new stations only, instead of being discarded.
+
+        Parameters
+        ----------
+        coords : dict of torch.Tensor
+            Coordinates of the new stations (1D), with the same keys as the bound stations.
+
+        Returns
+        -------
+        OkadaWrapper
+            The instance itself.
+        """
+        assert self.stations is not None, "no stations are bound; use 'bind' first."
+        new = self._normalize(coords)
+        assert set(new) == set(self.stations), "'coords' must have the same keys as the bound stations."
+        assert self.stations["x"].dim() == 1 and all(v.dim() == 1 for v in new.values()), \
+            "stations can only be added to a 1D station set."
 
-    def compute(self, coords:dict, params:dict, 
-                compute_strain:bool=True, is_degree:bool=True, fault_origin:str="topleft", nu:float=0.25):
+        if self.incremental is not None:
+            self.incremental.add_stations(new["x"], new["y"], new.get("z"))
+        self.stations = {k: torch.cat([self.stations[k], new[k]]) for k in self.stations}
+        self._partition = _partition(self.stations["z"]) if "z" in self.stations else None
+        return self
+
+
+
+    def remove_stations(self, index):
+        """
+        Remove stations from the bound (1D) station set, e.g. failed stations or masked pixels.
+
+        With `incremental=True`, the cached rotation and Green's functions of the remaining stations
+        are compacted in place, and nothing is evaluated again.
+
+        Parameters
+        ----------
+        index : torch.Tensor
+            Boolean mask of the stations to be removed (same shape as the bound stations),
+            or their integer indices.
+
+        Returns
+        -------
+        OkadaWrapper
+            The instance itself.
+        """
+        assert self.stations is not None, "no stations are bound; use 'bind' first."
+        n = self.stations["x"].shape[0]
+        assert self.stations["x"].dim() == 1, "stations can only be removed from a 1D station set."
+        index = torch.as_tensor(index, device=self.stations["x"].device)
+        remove = index if index.dtype == torch.bool else \
+            torch.zeros(n, dtype=torch.bool, device=index.device).index_fill_(0, index.flatten(), True)
+        keep = torch.nonzero(~remove).squeeze(1)
+
+        if self.incremental is not None:
+            self.incremental.remove_stations(keep)
+        self.stations = {k: v[keep] for k, v in self.stations.items()}
+        self._partition = _partition(self.stations["z"]) if "z" in self.stations else None
+        return self
+
+
+
+    def _normalize(self, coords:dict):
+        """
+        Convert the station coordinates to contiguous tensors on the configured device and dtype.
+        Tensors already in place are returned as they are.
+        """
+        return {
+            k: torch.as_tensor(coords[k], dtype=self.dtype, device=self.device).contiguous()
+            for k in ["x", "y", "z"] if k in coords
+        }
+
+
+
+    def _resolve(self, coords:dict, compute_strain:bool, is_degree:bool, fault_origin:str, nu:float):
+        """
+        Fill `coords` and the flags left as None with the bound stations and the defaults of the instance.
+        """
+        if coords is None:
+            assert self.stations is not None, "'coords' is required unless stations are bound by 'bind'."
+            coords = self.stations
+        elif coords is not self.stations:
+            coords = self._normalize(coords)
+        return (
+            coords,
+            self.compute_strain if compute_strain is None else compute_strain,
+            self.is_degree if is_degree is None else is_degree,
+            self.fault_origin if fault_origin is None else fault_origin,
+            self.nu if nu is None else nu,
+        )
+
+    @profiled("compute")
+    def compute(self, coords:dict=None, params:dict=None, 
+                compute_strain:bool=None, is_degree:bool=None, fault_origin:str=None, nu:float=None, 
+                surface_dispatch:bool=False, compute_dtype=None, 
+                return_status:bool=False, invalid:str=None, out=None):
         """
         Perform forward computations; given the source parameters, 
         the displacements and/or their spatial derivatives 
@@ -33,6 +273,7 @@ class OkadaWrapper:
             `"x"` and `"y"` are required keys, 
             and `"z"` is optional (all other keys are ignored).
             Each value must be torch.Tensor of the same shape (`dim` is arbitrary).
+            If None, the stations bound by `bind` are used.
 
         params : dict of torch.Tensor
             `"x_fault"`, `"y_fault"`, `"depth"`, `"strike"`, `"dip"`, `"rake"`
@@ -40,14 +281,16 @@ class OkadaWrapper:
             are optional (all other keys are ignored).
             Each value must be torch.Tensor with dim=0 (scaler tensor).
 
-        compute_strain : bool, default True
+        compute_strain : bool, default None
             Option to calculate the spatial derivative of the displacement.
+            If None (as for `is_degree`, `fault_origin` and `nu`), 
+            the default given to the constructor is used (True).
 
-        is_degree : bool, default True
+        is_degree : bool, default None
             Flag if `"strike"`, `"dip"` and `"rake"`
             are in degree or not (= in radian). 
         
-        fault_origin : str, default "topleft"
+        fault_origin : str, default None
             In the case of a rectangular fault,
             this flag specifies which point the fault location parameter refers to 
             (ignored for a point source).
@@ -57,9 +300,48 @@ class OkadaWrapper:
             represent the coordinates of the rectangle's center.
             Other strings cannot be specified.            
 
-        nu : float, default 0.25
-            Poisson's ratio.
-
+        nu : float, default None
+            Poisson's ratio (0.25 by default).
+
+        surface_dispatch : bool, default False
+            Option for a station network containing both surface (z = 0)
+            and subsurface stations (ignored if `"z"` is not in `coords`).
+            If `True`, surface stations are sent to the cheaper `SPOINT`/`SRECTF`
+            and the others to `DC3D0`/`DC3D`, and both are scattered back in order.
+            This mode cannot be used inside `vmap` (e.g. `gradient` with respect to coordinates).
+
+        compute_dtype : torch.dtype, default None
+            Data type of the kernel arithmetic (e.g. `torch.float32` for a fast mode).
+            If None, the dtype of `coords` is used.
+            Station coordinates relative to the source are formed in the dtype of `coords`,
+            and singularity thresholds and the accumulation of the corner terms
+            are adapted to `compute_dtype` (see docs/Precision.md).
+            The outputs are returned in `compute_dtype`.
+
+        return_status : bool, default False
+            If `True`, `Status` (return code IRET and NaN/Inf mask at each station) 
+            is also returned. IRET is the mask the kernels already compute, 
+            so this costs no extra pass over the stations.
+
+        invalid : str, default None
+            Policy for invalid stations (IRET != 0 or any NaN/Inf output).
+            If None, outputs are returned as computed.
+            If "zero", outputs at invalid stations are set to zero (as the original FORTRAN code does). 
+            If "drop", invalid stations are removed and each output is flattened to 1D. 
+            If "raise", ValueError is raised if any station is invalid. 
+            "zero" involves no host-device synchronisation, 
+            while "drop" and "raise" synchronise once (the number of valid stations is data-dependent).
+
+        out : torch.Tensor, default None
+            Preallocated output of shape (12 or 3, *coords["x"].shape) and of the dtype of the result,
+            e.g. from `workspace`. If given, the outputs are written into it 
+            and the returned tensors are views of it (inference only; cannot be used with "drop").
+
+        If the instance was created with `use_aot=True`, the precompiled kernel is used
+        for inference on at least 2 stations with a single source
+        (no tensor requires grad and no `torch.func` transform is active) 
+        without `return_status` and `invalid`;
+        otherwise the eager kernels are used.
 
         Returns
         -------
@@ -70,114 +352,217 @@ class OkadaWrapper:
             If `False`, return is a list of 3 tensors (displacements only):
             [ux, uy, uz]
             The shape of each tensor is same as that of `coords["x"]` etc.
+
+        Status
+            Only if `return_status` is `True`. 
+            Each tensor has the same shape as `coords["x"]` (before "drop").
         """
 
+        coords, compute_strain, is_degree, fault_origin, nu = self._resolve(
+            coords, compute_strain, is_degree, fault_origin, nu
+        )
         assert ("x" in coords) and ("y" in coords), "'coords' requires 'x' and 'y'."
+        assert params is not None, "'params' is required."
         assert ("x_fault" in params) and ("y_fault" in params) and ("depth" in params) and \
             ("strike" in params) and ("dip" in params) and ("rake" in params) and ("slip" in params), \
             "'params' requires 'x_fault', 'y_fault', 'depth', 'strike', 'dip', 'rake' and 'slip'."
 
+        if invalid not in [None, "zero", "drop", "raise"]:
+            raise ValueError("'invalid' must be one of None, 'zero', 'drop' or 'raise'.")
+
+        if out is not None and invalid == "drop":
+            raise ValueError("'out' cannot be used with invalid='drop'.")
+
+        # the partition of bound stations is computed once by `bind`
+        partition = self._partition if coords is self.stations else None
+        if self.sync_free and ((surface_dispatch and partition is None) or invalid in ["drop", "raise"]):
+            raise ValueError(
+                "'surface_dispatch' (on stations not bound by 'bind'), invalid='drop' and invalid='raise' "
+                "synchronise the host and the device and cannot be used with sync_free=True."
+            )
+
+        with sync_guard(coords["x"].device) if self.sync_free else contextlib.nullcontext():
+            if surface_dispatch and ("z" in coords):
+                u, iret = self._compute_mixed(
+                    coords, params, compute_strain, is_degree, fault_origin, nu, compute_dtype, partition
+                )
+            else:
+                u, iret = self._evaluate(
+                    coords, params, compute_strain, is_degree, fault_origin, nu, compute_dtype, 
+                    use_cache=(not return_status) and (invalid is None)
+                )
+            result = self._apply_status(u, iret, return_status, invalid)
+
+            if out is not None:
+                u = result[0] if return_status else result
+                torch.stack(u, out=out)
+                result = (list(out), result[1]) if return_status else list(out)
+            return result
+
+
+
+    def workspace(self, shape, dtype=None, device=None):
+        """
+        Persistent buffer to be passed as `out` to `compute`.
+
+        One buffer is kept per (shape, dtype, device) and returned again by later calls,
+        so that repeated computations on stations of the same shape (tiles, time steps,
+        iterations of an inversion) do not allocate their outputs again.
+        The contents are overwritten by each `compute(..., out=...)`; copy them to keep them.
+
+        Parameters
+        ----------
+        shape : tuple of int
+            Shape of the buffer, e.g. `(12,) + coords["x"].shape`.
+        dtype : torch.dtype, default None
+            If None, the default dtype.
+        device : torch.device or str, default None
+            If None, the default device.
+
+        Returns
+        -------
+        torch.Tensor
+        """
+        dtype = torch.get_default_dtype() if dtype is None else dtype
+        device = torch.device("cpu") if device is None else torch.device(device)
+        key = (tuple(shape), dtype, device)
+        if key not in self._workspace:
+            self._workspace[key] = torch.empty(key[0], dtype=dtype, device=device)
+        return self._workspace[key]
+
+
+
+    def clear_workspace(self):
+        """
+        Release the buffers kept by `workspace`.
+        """
+        self._workspace.clear()
+
+
+
+    def _evaluate(self, coords:dict, params:dict, 
+                  compute_strain:bool, is_degree:bool, fault_origin:str, nu:float, compute_dtype=None, 
+                  use_cache:bool=False):
+        """
+        Pack the parameters and evaluate the kernel. Return the outputs and IRET
+        (None if a precompiled kernel was used).
+        """
+
         x, y = coords["x"], coords["y"]
+        z = coords["z"] if "z" in coords else None
         assert x.shape == y.shape, "shepe of x and y must be same."
-        x_fault, y_fault, depth = params["x_fault"], params["y_fault"], params["depth"]
-        strike, dip, rake = params["strike"], params["dip"], params["rake"]
-        slip = params["slip"]
-
-
-        # ---- 1. setup ----
-        ss, cs, sd, cd, u_strike, u_dip = setup(strike, dip, rake, slip, is_degree)
-        xx =  (x - x_fault) * ss + (y - y_fault) * cs
-        yy = -(x - x_fault) * cs + (y - y_fault) * ss 
-
-
-        alpha_1985 = 1 - 2.0 * nu         # MYU/(LAMBDA+MYU), equal to 1/2 if Poisson medium
-        alpha_1992 = 1 / (2.0 * (1 - nu)) # (LAMBDA+MYU)/(LAMBDA+2*MYU), equal to 2/3 if Poisson medium
-
-        # ---- 2. model switch ----
-        if ("length" in params) and ("width" in params):
-            # recangular fault 
-            length, width = params["length"], params["width"]
-
-            if "z" in coords:
-                # DC3D
-                z = coords["z"]
-                assert x.shape == y.shape == z.shape, "shepe of x, y and z must be same."
-                if fault_origin == "topleft":
-                    out, _ = DC3D(
-                        alpha_1992, xx, yy, z, depth, dip, 0.0, length, -width, 0.0, 
-                        u_strike, u_dip, 0.0, compute_strain, is_degree
-                    )
-                elif fault_origin == "center":
-                    out, _ = DC3D(
-                        alpha_1992, xx, yy, z, depth, dip, -length/2, +length/2, -width/2, +width/2, 
-                        u_strike, u_dip, 0.0, compute_strain, is_degree
-                    )
-                else:
-                    raise ValueError("'fault_origin' must be either 'topleft' or 'center'.")
-            else:
-                # SRECTF
-                if fault_origin == "topleft":
-                    yy = yy + width * cd
-                    dep = depth + width * sd
-                    out = SRECTF(
-                        alpha_1985, xx, yy, dep, length, width, sd, cd, 
-                        u_strike, u_dip, 0.0, compute_strain
-                    )
-                elif fault_origin == "center":
-                    xx = xx + length / 2
-                    yy = yy + width * cd / 2
-                    dep = depth + width * sd / 2
-                    out = SRECTF(
-                        alpha_1985, xx, yy, dep, length, width, sd, cd, 
-                        u_strike, u_dip, 0.0, compute_strain
-                    )
+        if z is not None:
+            assert x.shape == y.shape == z.shape, "shepe of x, y and z must be same."
 
-        else:
-            # point source
-            if "z" in coords:
-                # DC3D0
-                z = coords["z"]
-                assert x.shape == y.shape == z.shape, "shepe of x, y and z must be same."
-                out, _ = DC3D0(
-                    alpha_1992, xx, yy, z, depth, dip, 
-                    u_strike, u_dip, 0.0, 0.0, compute_strain, is_degree
+        model = infer_model(params)
+        dtype = x.dtype if x.is_floating_point() else None
+        theta = pack(params, model, dtype=dtype, device=x.device)
+
+        if self.incremental is not None and coords is self.stations and compute_dtype is None \
+                and theta.dim() == 1 and _untracked([theta, x, y] + ([z] if z is not None else [])):
+            return self.incremental.evaluate(theta, x, y, z, model, compute_strain, is_degree, fault_origin, nu)
+
+        if use_cache and self.kernels is not None and compute_dtype is None:
+            out = self._compute_cached(theta, x, y, z, model, compute_strain, is_degree, fault_origin, nu)
+            if out is not None:
+                return out, None
+
+        return _okada(theta, x, y, z, model, compute_strain, is_degree, fault_origin, nu, compute_dtype)
+
+
+
+    def _apply_status(self, out, iret, return_status:bool, invalid:str):
+        """
+        Build `Status` from IRET and the outputs, and apply the policy for invalid stations.
+        """
+
+        if not return_status and invalid is None:
+            return out
+
+        nonfinite = ~torch.isfinite(out[0])
+        for u in out[1:]:
+            nonfinite = nonfinite | ~torch.isfinite(u)
+        bad = (iret != 0) | nonfinite
+
+        if invalid == "zero":
+            out = [torch.where(bad, 0.0, u) for u in out]
+        elif invalid == "drop":
+            out = [u[~bad] for u in out]
+        elif invalid == "raise":
+            n_bad = int(bad.sum())
+            if n_bad > 0:
+                raise ValueError(
+                    f"{n_bad} station(s) are invalid "
+                    f"(singular: {int((iret == 1).sum())}, positive z: {int((iret == 2).sum())}, "
+                    f"NaN/Inf: {int(nonfinite.sum())})."
                 )
-            else:
-                # SPOINT
-                out = SPOINT(
-                    alpha_1985, xx, yy, depth, sd, cd, 
-                    u_strike, u_dip, 0.0, compute_strain
-                )      
-
-    
-        # ---- 3. inversely rotate coordinate ----
-        if compute_strain:
-            if "z" in coords:
-                ux, uy, uz, uxx, uyx, uzx, uxy, uyy, uzy, uxz, uyz, uzz = out
-            else:
-                ux, uy, uz, uxx, uxy, uyx, uyy, uzx, uzy = out
-                # derived from surface boundary condition (Okada 1985; eq.42)
-                uxz = -uzx
-                uyz = -uzy
-                uzz = -(uxx + uyy) * nu / (1 - nu) 
-            ux, uy, uz = rotate_vector(
-                ux, uy, uz, ss, cs
-            )
-            uxx, uyx, uzx, uxy, uyy, uzy, uxz, uyz, uzz = rotate_tensor(
-                uxx, uyx, uzx, uxy, uyy, uzy, uxz, uyz, uzz, ss, cs
-            )
-            return [ux, uy, uz, uxx, uyx, uzx, uxy, uyy, uzy, uxz, uyz, uzz]
-        else:
-            ux, uy, uz = out 
-            ux, uy, uz = rotate_vector(
-                ux, uy, uz, ss, cs
-            )
-            return [ux, uy, uz]
-        
 
+        if return_status:
+            return out, Status(iret=iret, nonfinite=nonfinite)
+        return out
+
+
+
+    def _compute_cached(self, theta, x, y, z, model:str, 
+                        compute_strain:bool, is_degree:bool, fault_origin:str, nu:float):
+        """
+        Evaluate with a precompiled kernel. Return None if not applicable.
+        """
+
+        tensors = [theta, x, y] + ([z] if z is not None else [])
+        if theta.dim() != 1 or x.numel() < 2:
+            return None
+        if not _untracked(tensors):
+            return None
+
+        fn = self.kernels.lookup(
+            model, z is not None, compute_strain, is_degree, fault_origin, theta.dtype, theta.device
+        )
+        if fn is None:
+            return None
+
+        nu = torch.as_tensor(nu, dtype=theta.dtype, device=theta.device)
+        args = [theta, nu, x.reshape(-1), y.reshape(-1)] + ([z.reshape(-1)] if z is not None else [])
+        out = fn(*args)
+        return [u.reshape(x.shape) for u in out]
+
+
+
+    def _compute_mixed(self, coords:dict, params:dict, 
+                       compute_strain:bool, is_degree:bool, fault_origin:str, nu:float, compute_dtype=None,
+                       partition=None):
+        """
+        Partition stations by z == 0, send surface stations to `SPOINT`/`SRECTF`
+        and subsurface stations to `DC3D0`/`DC3D`, and scatter both back in order.
+        Return the outputs and IRET.
+        """
 
+        x, y, z = coords["x"], coords["y"], coords["z"]
+        assert x.shape == y.shape == z.shape, "shepe of x, y and z must be same."
+        x, y, z = x.flatten(), y.flatten(), z.flatten()
+
+        if partition is None:
+            partition = _partition(z)
+        idx_s, idx_b, inv = partition
+
+        out_s, iret_s = self._evaluate(
+            {"x": x[idx_s], "y": y[idx_s]}, 
+            params, compute_strain, is_degree, fault_origin, nu, compute_dtype
+        )
+        out_b, iret_b = self._evaluate(
+            {"x": x[idx_b], "y": y[idx_b], "z": z[idx_b]}, 
+            params, compute_strain, is_degree, fault_origin, nu, compute_dtype
+        )
+
+        out = [torch.cat([us, ub])[inv].reshape(coords["x"].shape) for us, ub in zip(out_s, out_b)]
+        iret = torch.cat([iret_s, iret_b])[inv].reshape(coords["x"].shape)
+        return out, iret
+
+
+
+    @profiled("gradient")
     def gradient(self, coords:dict, params:dict, arg:str, 
-                 compute_strain:bool=True, is_degree:bool=True, fault_origin:str="topleft", nu:float=0.25):
+                 compute_strain:bool=None, is_degree:bool=None, fault_origin:str=None, nu:float=None):
         """
         Calculate gradient with respect to specified `arg` 
         (one of coordinates or parameters) at the station, 
@@ -194,6 +579,7 @@ class OkadaWrapper:
             `"x"` and `"y"` are required keys, 
             and `"z"` is optional (all other keys are ignored).
             Each value must be torch.Tensor of the same shape (`dim` is arbitrary).
+            If None, the stations bound by `bind` are used.
 
         params : dict of torch.Tensor
             `"x_fault"`, `"y_fault"`, `"depth"`, `"strike"`, `"dip"`, `"rake"` 
@@ -205,14 +591,16 @@ class OkadaWrapper:
             Name of the variable to be differentiated. 
             This should be a key of `coords` or `params`.
 
-        compute_strain : bool, default True
+        compute_strain : bool, default None
             Option to calculate the spatial derivative of the displacement.
+            If None (as for `is_degree`, `fault_origin` and `nu`), 
+            the default given to the constructor is used (True).
 
-        is_degree : bool, default True
+        is_degree : bool, default None
             Flag if `"strike"`, `"dip"` and `"rake"` 
             are in degree or not (= in radian). 
 
-        fault_origin : str, default "topleft"
+        fault_origin : str, default None
             In the case of a rectangular fault,
             this flag specifies which point the fault location parameter refers to 
             (ignored for a point source).
@@ -222,8 +610,8 @@ class OkadaWrapper:
             represent the coordinates of the rectangle's center.
             Other strings cannot be specified.    
 
-        nu : float, default 0.25
-            Poisson's ratio.
+        nu : float, default None
+            Poisson's ratio (0.25 by default).
 
 
         Returns
@@ -233,6 +621,9 @@ class OkadaWrapper:
             but each tensor is differentiated by `arg`.
         """
 
+        coords, compute_strain, is_degree, fault_origin, nu = self._resolve(
+            coords, compute_strain, is_degree, fault_origin, nu
+        )
         assert ("x" in coords) and ("y" in coords), f"'coords' requires 'x' and 'y'."
         assert ("x_fault" in params) and ("y_fault" in params) and ("depth" in params) and \
             ("strike" in params) and ("dip" in params) and ("rake" in params) and ("slip" in params), \
@@ -294,8 +685,9 @@ class OkadaWrapper:
 
 
 
+    @profiled("hessian")
     def hessian(self, coords:dict, params:dict, arg1:str, arg2:str, 
-                compute_strain:bool=True, is_degree:bool=True, fault_origin:str="topleft", nu:float=0.25):
+                compute_strain:bool=None, is_degree:bool=None, fault_origin:str=None, nu:float=None):
         """
         Calculate hessian (2nd-order derivatives) with respect to 
         specified `arg1` and `arg2` at the station, 
@@ -308,6 +700,7 @@ class OkadaWrapper:
             `"x"` and `"y"` are required keys, 
             and `"z"` is optional (all other keys are ignored).
             Each value must be torch.Tensor of the same shape (`dim` is arbitrary).
+            If None, the stations bound by `bind` are used.
 
         params : dict of torch.Tensor
             `"x_fault"`, `"y_fault"`, `"depth"`, `"strike"`, `"dip"`, `"rake"` 
@@ -321,14 +714,16 @@ class OkadaWrapper:
             Both `arg1` and `arg2` must be variables of the same kind; 
             both must be `coords` or both must be `params`.
 
-        compute_strain : bool, default True
+        compute_strain : bool, default None
             Option to calculate the spatial derivative of the displacement.
+            If None (as for `is_degree`, `fault_origin` and `nu`), 
+            the default given to the constructor is used (True).
 
-        is_degree : bool, default True
+        is_degree : bool, default None
             Flag if `"strike"`, `"dip"` and `"rake"`
             are in degree or not (= in radian). 
 
-        fault_origin : str, default "topleft"
+        fault_origin : str, default None
             In the case of a rectangular fault,
             this flag specifies which point the fault location parameter refers to 
             (ignored for a point source).
@@ -338,8 +733,8 @@ class OkadaWrapper:
             represent the coordinates of the rectangle's center.
             Other strings cannot be specified.    
 
-        nu : float, default 0.25
-            Poisson's ratio. 
+        nu : float, default None
+            Poisson's ratio (0.25 by default).
 
 
         Returns
@@ -350,7 +745,11 @@ class OkadaWrapper:
         """
 
 
+        coords, compute_strain, is_degree, fault_origin, nu = self._resolve(
+            coords, compute_strain, is_degree, fault_origin, nu
+        )
         assert ("x" in coords) and ("y" in coords), "'coords' requires 'x' and 'y'."
+        assert params is not None, "'params' is required."
         assert ("x_fault" in params) and ("y_fault" in params) and ("depth" in params) and \
             ("strike" in params) and ("dip" in params) and ("rake" in params) and ("slip" in params), \
             "'params' requires 'x_fault', 'y_fault', 'depth', 'strike', 'dip', 'rake' and 'slip'."
@@ -439,4 +838,32 @@ class OkadaWrapper:
                 return jacfwd(jacfwd(_fn, argnums=1), argnums=0)(p1, p2)
         else:
             raise ValueError(f"combination of arg '{arg1}' and '{arg2}' is not supported.")
-        
\ No newline at end of file
+        
+
+
+    def stats(self, reset:bool=False):
+        """
+        Per-stage statistics recorded while the instrumentation is enabled
+        (`OkadaTorch.profiling.enable()` or `with OkadaTorch.profiling.profile(): ...`).
+
+        Stages are the kernels (`SPOINT`, `SRECTF`, `DC3D0`, `DC3D`), their subroutines
+        (`DCCON0/1/2`, `_UA`, `_UB`, `_UC`, etc.), the coordinate transforms 
+        (`setup`, `rotate_vector`, `rotate_tensor`) and the methods of this class 
+        (`compute`, `gradient`, `hessian`; the latter two include autograd).
+        The statistics are shared by all instances.
+
+        Parameters
+        ----------
+        reset : bool, default False
+            Clear the statistics after reading them.
+
+        Returns
+        -------
+        dict
+            For each stage name, a dict of `"calls"`, `"time"` (seconds, including nested stages),
+            `"stations"` and `"bytes"` (size of the returned tensors).
+        """
+        out = profiling.stats()
+        if reset:
+            profiling.reset()
+        return out
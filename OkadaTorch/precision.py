@@ -0,0 +1,72 @@
+import torch
+from .okadawrapper import OkadaWrapper
+
+
+COMPONENTS = ("ux", "uy", "uz", "uxx", "uyx", "uzx", "uxy", "uyy", "uzy", "uxz", "uyz", "uzz")
+
+
+
+
+def error_report(coords:dict, params:dict, compute_dtype=torch.float32,
+                 compute_strain:bool=True, is_degree:bool=True, fault_origin:str="topleft", nu:float=0.25,
+                 okada=None):
+    """
+    Error of a reduced-precision computation against the float64 result.
+
+    Both results are computed by `OkadaWrapper.compute` on the same stations,
+    the reference with float64 coordinates and parameters,
+    and the other with `compute_dtype=compute_dtype`.
+    Errors are normalised by the maximum absolute value of each component of the reference,
+    so that components with different units (displacement, strain) are comparable.
+    Stations where the reference is not finite (singular points) are excluded.
+
+    Parameters
+    ----------
+    coords : dict of torch.Tensor
+        Same as that of `OkadaWrapper.compute`.
+    params : dict of torch.Tensor
+        Same as that of `OkadaWrapper.compute`.
+    compute_dtype : torch.dtype, default torch.float32
+        Data type to be evaluated.
+    compute_strain, is_degree, fault_origin, nu
+        Same as those of `OkadaWrapper.compute`.
+    okada : OkadaWrapper, default None
+        Instance used for the forward computation. If None, a new one is created.
+
+    Returns
+    -------
+    dict
+        For each component name ("ux", "uy", ...), a dict of
+        `"max"` (maximum normalised error), `"rms"` (root mean square of the normalised error),
+        `"scale"` (maximum absolute value of the reference) and
+        `"n_nonfinite"` (number of stations where only the reduced-precision result is not finite).
+    """
+
+    if okada is None:
+        okada = OkadaWrapper()
+
+    coords64 = {k: v.to(torch.float64) for k, v in coords.items()}
+    params64 = {k: torch.as_tensor(v, dtype=torch.float64) for k, v in params.items()}
+
+    with torch.no_grad():
+        ref = okada.compute(coords64, params64, compute_strain, is_degree, fault_origin, nu)
+        out = okada.compute(
+            coords64, params64, compute_strain, is_degree, fault_origin, nu, compute_dtype=compute_dtype
+        )
+
+    report = {}
+    for name, r, u in zip(COMPONENTS, ref, out):
+        valid = torch.isfinite(r)
+        u = u.to(torch.float64)
+        scale = torch.where(valid, r.abs(), 0.0).max()
+        err = torch.where(valid, (u - r).abs(), 0.0) / torch.clamp(scale, min=torch.finfo(r.dtype).tiny)
+        bad = valid & ~torch.isfinite(u)
+        err = torch.where(bad, 0.0, err)
+        report[name] = {
+            "max": err.max().item(),
+            "rms": torch.sqrt((err**2).sum() / valid.sum()).item(),
+            "scale": scale.item(),
+            "n_nonfinite": int(bad.sum()),
+        }
+
+    return report
@@ -0,0 +1,190 @@
+import json
+import time
+import functools
+import contextlib
+import torch
+
+
+_ENABLED = False
+_SYNCHRONIZE = False
+_STATS = {}
+_EVENTS = []
+_T0 = time.perf_counter()
+
+
+
+
+def _nbytes(obj):
+    """
+    Total size of the tensors in (nested) lists and tuples.
+    """
+    if isinstance(obj, torch.Tensor):
+        return obj.numel() * obj.element_size()
+    if isinstance(obj, (list, tuple)):
+        return sum(_nbytes(v) for v in obj)
+    if hasattr(obj, "_fields"):
+        return sum(_nbytes(getattr(obj, f)) for f in obj._fields)
+    return 0
+
+
+
+def _numel(args):
+    """
+    Number of stations: size of the first tensor argument.
+    """
+    for a in args:
+        if isinstance(a, torch.Tensor):
+            return a.numel()
+        if isinstance(a, dict) and "x" in a:
+            return a["x"].numel()
+    return 0
+
+
+
+def _sync():
+    if _SYNCHRONIZE and torch.cuda.is_available():
+        torch.cuda.synchronize()
+
+
+
+def profiled(name:str):
+    """
+    Decorator marking a stage of the computation.
+
+    When profiling is enabled, each call is wrapped in `torch.profiler.record_function(name)`
+    and its wall time, number of stations and bytes of the returned tensors are recorded.
+    When disabled, the original function is called directly (one flag check).
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _ENABLED:
+                return fn(*args, **kwargs)
+
+            with torch.profiler.record_function(name):
+                _sync()
+                t0 = time.perf_counter()
+                out = fn(*args, **kwargs)
+                _sync()
+                t1 = time.perf_counter()
+
+            s = _STATS.setdefault(name, {"calls": 0, "time": 0.0, "stations": 0, "bytes": 0})
+            s["calls"] += 1
+            s["time"] += t1 - t0
+            s["stations"] += _numel(args)
+            s["bytes"] += _nbytes(out)
+            _EVENTS.append((name, t0, t1))
+            return out
+        return wrapper
+    return decorator
+
+
+
+
+def enable(synchronize:bool=False):
+    """
+    Enable the instrumentation.
+
+    Parameters
+    ----------
+    synchronize : bool, default False
+        If `True`, CUDA is synchronised before and after each stage,
+        so that the recorded times are those of the kernels rather than of their launches.
+        This serialises the computation; use only while profiling.
+    """
+    global _ENABLED, _SYNCHRONIZE
+    _ENABLED = True
+    _SYNCHRONIZE = synchronize
+
+
+
+def disable():
+    """
+    Disable the instrumentation. Recorded statistics are kept.
+    """
+    global _ENABLED, _SYNCHRONIZE
+    _ENABLED = False
+    _SYNCHRONIZE = False
+
+
+
+def is_enabled():
+    return _ENABLED
+
+
+
+def reset():
+    """
+    Clear the recorded statistics and events.
+    """
+    global _T0
+    _STATS.clear()
+    _EVENTS.clear()
+    _T0 = time.perf_counter()
+
+
+
+@contextlib.contextmanager
+def profile(synchronize:bool=False, reset_stats:bool=True):
+    """
+    Context manager enabling the instrumentation inside the block.
+
+    Parameters
+    ----------
+    synchronize : bool, default False
+        Same as that of `enable`.
+    reset_stats : bool, default True
+        Clear the statistics on entry.
+    """
+    if reset_stats:
+        reset()
+    was_enabled, was_sync = _ENABLED, _SYNCHRONIZE
+    enable(synchronize)
+    try:
+        yield
+    finally:
+        if was_enabled:
+            enable(was_sync)
+        else:
+            disable()
+
+
+
+
+def stats():
+    """
+    Recorded statistics per stage.
+
+    Returns
+    -------
+    dict
+        For each stage name, a dict of
+        `"calls"` (number of calls), `"time"` (total wall time in seconds, including nested stages),
+        `"stations"` (total number of stations processed) and
+        `"bytes"` (total size of the returned tensors).
+    """
+    return {k: dict(v) for k, v in _STATS.items()}
+
+
+
+def export_json(path:str):
+    """
+    Write `stats()` to a JSON file.
+    """
+    with open(path, "w") as f:
+        json.dump(stats(), f, indent=1)
+
+
+
+def export_chrome_trace(path:str):
+    """
+    Write the recorded stages as a Chrome trace (open with chrome://tracing or Perfetto).
+    Nested stages are shown nested.
+    """
+    events = [
+        {"name": name, "ph": "X", "pid": 0, "tid": 0,
+         "ts": (t0 - _T0) * 1e6, "dur": (t1 - t0) * 1e6}
+        for name, t0, t1 in _EVENTS
+    ]
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
@@ -0,0 +1,212 @@
+import math
+import torch
+from typing import NamedTuple
+from .functional import okada, param_names, infer_model
+
+
+
+
+class SearchResult(NamedTuple):
+    """
+    Best models found by `grid_search`, sorted by misfit.
+
+    Attributes
+    ----------
+    params : dict of torch.Tensor
+        Values of all source parameters (including the optimal `"slip"`). Each has shape (k,).
+    misfit : torch.Tensor
+        Weighted sum of squared residuals. Shape (k,).
+    n_evaluated : int
+        Number of models evaluated (over all refinement levels).
+    """
+    params: dict
+    misfit: torch.Tensor
+    n_evaluated: int
+
+
+
+
+def _misfit(G, d, w, positive_slip:bool):
+    """
+    Optimal slip and misfit of each predicted response for unit slip.
+
+    The prediction is linear in slip, so the slip minimising sum w (d - s g)^2 is
+    s = (g.Wd) / (g.Wg), and the misfit is d.Wd - 2 s g.Wd + s^2 g.Wg.
+
+    Parameters
+    ----------
+    G : torch.Tensor
+        Predictions for unit slip. Shape (B, m).
+    d, w : torch.Tensor
+        Data and weights. Shape (m,).
+    """
+    G = torch.where(torch.isfinite(G), G, 0.0)
+    gWd = G @ (w * d)
+    gWg = (G * G) @ w
+    dWd = (w * d) @ d
+    s = gWd / torch.clamp(gWg, min=torch.finfo(G.dtype).tiny)
+    if positive_slip:
+        s = torch.clamp(s, min=0.0)
+    misfit = dWd - 2.0 * s * gWd + s**2 * gWg
+    return s, torch.where(torch.isfinite(misfit), misfit, torch.inf)
+
+
+
+def _merge(best, new, k:int):
+    """
+    Keep the k rows of smallest misfit among `best` and `new`,
+    each a tuple (misfit (m,), values (m, n_params)).
+    """
+    if best is not None:
+        new = (torch.cat([best[0], new[0]]), torch.cat([best[1], new[1]]))
+    idx = torch.topk(new[0], min(k, len(new[0])), largest=False).indices
+    return new[0][idx], new[1][idx]
+
+
+
+
+def grid_search(data, coords:dict, params:dict, grid:dict, los=None, weights=None,
+                n_best:int=10, batch_size:int=256, n_random:int=None, refine:int=0,
+                positive_slip:bool=True, is_degree:bool=True, fault_origin:str="topleft", nu:float=0.25,
+                generator=None):
+    """
+    Grid (or random) search over source parameters with the optimal slip solved analytically.
+
+    Candidate models are evaluated in batches through `OkadaTorch.functional.okada`
+    (one call per batch of `batch_size` sources over all stations).
+    The displacement is linear in slip, so at each node the slip minimising the misfit
+    is obtained in closed form and `"slip"` is not searched.
+    Only the `n_best` best models are kept while streaming through the batches,
+    so the full misfit cube is never held in memory.
+    With `refine > 0`, the neighbourhoods of the best models are searched again
+    with half the spacing at each level (coarse-to-fine), and the rest of the space is pruned.
+
+    Parameters
+    ----------
+    data : torch.Tensor
+        Observed displacements. Shape (3, *x.shape) for the (east, north, up) components,
+        or (*x.shape) if `los` is given.
+    coords : dict of torch.Tensor
+        Same as that of `OkadaWrapper.compute`.
+    params : dict of float or torch.Tensor
+        Values of the source parameters that are not searched (`"slip"` is not required).
+    grid : dict of torch.Tensor
+        Candidate values (1D) of the searched parameters, e.g. `{"strike": ..., "dip": ..., "depth": ...}`.
+        Keys must be names of source parameters other than `"slip"`.
+    los : torch.Tensor, default None
+        Unit vectors (east, north, up) of the line of sight. Shape (3, *x.shape).
+    weights : torch.Tensor, default None
+        Weights of the data (e.g. 1/sigma^2). Same shape as `data`. If None, all ones.
+    n_best : int, default 10
+        Number of best models to be returned.
+    batch_size : int, default 256
+        Number of models evaluated in one call. Memory grows with `batch_size` times the number of stations.
+    n_random : int, default None
+        If given, `n_random` models are drawn uniformly within the range of each entry of `grid`
+        instead of evaluating the full grid.
+    refine : int, default 0
+        Number of coarse-to-fine refinement levels.
+    positive_slip : bool, default True
+        Constrain the optimal slip to be non-negative (otherwise a negative slip flips the rake by 180°).
+    is_degree, fault_origin, nu
+        Same as those of `OkadaWrapper.compute`.
+    generator : torch.Generator, default None
+        Random number generator (on CPU) used with `n_random`.
+
+    Returns
+    -------
+    SearchResult
+    """
+
+    names = list(grid)
+    model = infer_model({**params, **grid})
+    all_names = param_names(model)
+    assert "slip" not in grid, "'slip' is solved analytically and cannot be searched."
+    for k in names:
+        assert k in all_names, f"'{k}' is not a parameter of the {model} model."
+    missing = [k for k in all_names if k not in params and k not in grid and k != "slip"]
+    assert len(missing) == 0, f"'params' or 'grid' requires {', '.join(repr(k) for k in missing)}."
+
+    x, y = coords["x"], coords["y"]
+    z = coords["z"] if "z" in coords else None
+    dtype, device = x.dtype, x.device
+    x, y = x.flatten(), y.flatten()
+    z = z.flatten() if z is not None else None
+
+    if los is not None:
+        los = los.reshape(3, -1)
+    d = data.reshape(-1)
+    w = torch.ones_like(d) if weights is None else weights.reshape(-1).to(d)
+    assert d.numel() == (x.numel() if los is not None else 3 * x.numel()), \
+        "shape of 'data' must be (3, *x.shape), or (*x.shape) if 'los' is given."
+
+    # template of packed parameters (slip = 1) and columns of the searched parameters
+    base = torch.tensor(
+        [1.0 if k == "slip" else float(params[k]) if k not in grid else 0.0 for k in all_names],
+        dtype=dtype, device=device
+    )
+    cols = [all_names.index(k) for k in names]
+    values = [torch.as_tensor(grid[k], dtype=dtype, device=device).flatten() for k in names]
+    lo = torch.stack([v.min() for v in values])
+    hi = torch.stack([v.max() for v in values])
+
+
+    def evaluate(P, best):
+        # P: (B, n_searched) values of the searched parameters
+        theta = base.expand(len(P), -1).clone()
+        theta[:, cols] = P
+        with torch.no_grad():
+            G = okada(theta, x, y, z, model, False, is_degree, fault_origin, nu)   # (B, 3, n)
+        G = (G * los).sum(1) if los is not None else G.reshape(len(P), -1)
+        s, misfit = _misfit(G, d, w, positive_slip)
+        theta[:, all_names.index("slip")] = s
+        return _merge(best, (misfit, theta), n_best)
+
+
+    # ---- 1. coarse pass ----
+    best = None
+    n_evaluated = 0
+    if n_random is None:
+        sizes = [len(v) for v in values]
+        total = math.prod(sizes)
+        for start in range(0, total, batch_size):
+            flat = torch.arange(start, min(start + batch_size, total), device=device)
+            P = []
+            for v, n in zip(reversed(values), reversed(sizes)):
+                P.append(v[flat % n])
+                flat = flat // n
+            best = evaluate(torch.stack(P[::-1], dim=1), best)
+        n_evaluated += total
+        step = torch.stack([
+            (v.max() - v.min()) / (len(v) - 1) if len(v) > 1 else torch.zeros((), dtype=dtype, device=device)
+            for v in values
+        ])
+    else:
+        for start in range(0, n_random, batch_size):
+            m = min(batch_size, n_random - start)
+            U = torch.rand((m, len(names)), generator=generator, dtype=dtype).to(device)
+            best = evaluate(lo + U * (hi - lo), best)
+        n_evaluated += n_random
+        step = (hi - lo) / max(n_random ** (1.0 / len(names)) - 1.0, 1.0)
+
+
+    # ---- 2. coarse-to-fine refinement around the best models ----
+    offsets = torch.cartesian_prod(*[torch.tensor([-1.0, 0.0, 1.0], dtype=dtype, device=device)] * len(names))
+    offsets = offsets.reshape(-1, len(names))
+    offsets = offsets[(offsets != 0.0).any(dim=1) & (offsets[:, step == 0.0] == 0.0).all(dim=1)]  # skip the centres
+    for _ in range(refine):
+        step = step / 2
+        centres = best[1][:, cols]
+        P = (centres[:, None, :] + offsets[None, :, :] * step).reshape(-1, len(names))
+        P = P[((P >= lo) & (P <= hi)).all(dim=1)]
+        P = torch.unique(P, dim=0)
+        for start in range(0, len(P), batch_size):
+            best = evaluate(P[start:start + batch_size], best)
+        n_evaluated += len(P)
+
+    misfit, theta = best
+    return SearchResult(
+        params={k: theta[:, i] for i, k in enumerate(all_names)},
+        misfit=misfit,
+        n_evaluated=n_evaluated,
+    )
@@ -0,0 +1,166 @@
+import torch
+from .inversion import greens
+
+
+
+
+class StreamingInversion:
+    """
+    Regularised least-squares slip updated as observations arrive.
+
+    The problem of `OkadaTorch.inversion.solve` (without bounds) is kept as the triangular factor R
+    of the normal equations, R^T R = G^T W G + lam^2 L^T L, together with z = R^-T G^T W d.
+    k new observation rows A (weighted) and data b update both by a QR factorisation of
+    the stacked [[R, z], [A, b]] of shape (n_model + 1 + k, n_model + 1), so that each update costs
+    O(n_model^2 (n_model + k)) regardless of the number of rows received so far,
+    and the solution is a triangular solve.
+
+    Rows of the Green's matrix are computed only for the stations added (`add_stations`) and kept,
+    so that a new epoch of data at the known stations (`add_epoch`) requires no kernel evaluation.
+    With `forget < 1`, older rows are down-weighted by `forget` at every epoch (recursive least squares).
+
+    Parameters
+    ----------
+    patches : dict of torch.Tensor or FaultMesh
+        Geometry of the patches (see `OkadaTorch.inversion.greens`).
+    L : torch.Tensor, default None
+        Regularisation operator (dense or sparse), e.g. from `OkadaTorch.inversion.laplacian`.
+    lam : float, default 0.0
+        Regularisation weight.
+    damping : float, default 1e-6
+        Weight of an additional identity regularisation, so that the factor is never singular
+        before enough observations have arrived.
+    forget : float, default 1.0
+        Forgetting factor (0 < forget <= 1) applied to the accumulated rows at each `add_epoch`.
+    rakes : tuple of float, default (0.0, 90.0)
+        Rake of each slip component.
+    batch_size, is_degree, fault_origin, nu
+        Same as those of `OkadaTorch.inversion.greens`.
+    dtype, device
+        Of the factorisation. If None, the default dtype and device.
+    """
+    def __init__(self, patches, L=None, lam:float=0.0, damping:float=1e-6, forget:float=1.0,
+                 rakes=(0.0, 90.0), batch_size:int=256, is_degree:bool=True, fault_origin:str="topleft", nu:float=0.25,
+                 dtype=None, device=None):
+
+        assert 0.0 < forget <= 1.0, "'forget' must be in (0, 1]."
+        self.patches = patches
+        self.rakes = rakes
+        self.forget = forget
+        self._options = dict(batch_size=batch_size, is_degree=is_degree, fault_origin=fault_origin, nu=nu)
+        self.dtype = dtype if dtype is not None else torch.get_default_dtype()
+        self.device = device
+
+        n_patch = len(patches) if not isinstance(patches, dict) else len(next(iter(patches.values())))
+        self.n_model = len(rakes) * n_patch
+
+        # prior rows [lam L; damping I] with zero data
+        rows = [damping * torch.eye(self.n_model, dtype=self.dtype, device=device)]
+        if L is not None and lam != 0.0:
+            rows.append(lam * (L.to_dense() if L.is_sparse else L).to(dtype=self.dtype, device=device))
+        self._prior = torch.cat(rows)
+        self.reset()
+
+
+    def reset(self):
+        """
+        Discard all observations and stations (keeping the regularisation).
+        """
+        A = torch.cat([self._prior, torch.zeros((1, self.n_model), dtype=self.dtype, device=self.device)])
+        zeros = torch.zeros((len(A), 1), dtype=self.dtype, device=self.device)
+        self._Rz = torch.linalg.qr(torch.cat([A, zeros], dim=1), mode="r")[1][:self.n_model + 1]
+        self.stations = []          # (Green's rows, weights) of each added block of stations
+        self.n_rows = 0
+
+
+    def add_rows(self, G, d, weights=None):
+        """
+        Update with k observation rows.
+
+        Parameters
+        ----------
+        G : torch.Tensor
+            Rows of the Green's matrix. Shape (k, n_model).
+        d : torch.Tensor
+            Observations. Shape (k,).
+        weights : torch.Tensor, default None
+            Weights of the observations (e.g. 1/sigma^2). Shape (k,).
+        """
+        sw = torch.ones_like(d) if weights is None else torch.sqrt(weights.to(d))
+        A = torch.cat([sw[:, None] * G, (sw * d)[:, None]], dim=1).to(self._Rz)
+        self._Rz = torch.linalg.qr(torch.cat([self._Rz, A]), mode="r")[1][:self.n_model + 1]
+        self.n_rows += len(d)
+
+
+    def add_stations(self, coords:dict, data, los=None, weights=None):
+        """
+        Compute the Green's rows of new stations only, keep them, and update with their data.
+
+        Parameters
+        ----------
+        coords : dict of torch.Tensor
+            Coordinates of the new stations (same as that of `OkadaWrapper.compute`).
+        data : torch.Tensor
+            Observations at the new stations. Shape (3, *x.shape), or (*x.shape) with `los`.
+        los : torch.Tensor, default None
+            Unit vectors (east, north, up) of the line of sight. Shape (3, *x.shape).
+        weights : torch.Tensor, default None
+            Weights of the observations. Same shape as `data`.
+
+        Returns
+        -------
+        int
+            Index of the block of stations (order of the rows expected by `add_epoch`).
+        """
+        G = greens(coords, self.patches, self.rakes, los, **self._options).to(self._Rz)
+        d = data.reshape(-1).to(self._Rz)
+        assert len(d) == len(G), "shape of 'data' must be (3, *x.shape), or (*x.shape) if 'los' is given."
+        w = None if weights is None else weights.reshape(-1).to(d)
+        self.stations.append((G, w))
+        self.add_rows(G, d, w)
+        return len(self.stations) - 1
+
+
+    def add_epoch(self, data):
+        """
+        Update with a new epoch of data at all the stations added so far.
+
+        The accumulated rows are first scaled by `forget`, and the kept Green's rows are reused.
+
+        Parameters
+        ----------
+        data : list of torch.Tensor
+            Observations of each block of stations, in the order of `add_stations`.
+        """
+        assert len(data) == len(self.stations), "'data' requires one tensor per block of stations."
+        if self.forget < 1.0:
+            # the prior rows are not forgotten: scale, then restore them
+            self._Rz = self._Rz * self.forget**0.5
+            A = torch.cat([self._prior, torch.zeros((len(self._prior), 1), dtype=self.dtype, device=self.device)], dim=1)
+            self._Rz = torch.linalg.qr(torch.cat([self._Rz, (1.0 - self.forget)**0.5 * A]), mode="r")[1][:self.n_model + 1]
+        G = torch.cat([g for g, _ in self.stations])
+        d = torch.cat([v.reshape(-1).to(G) for v in data])
+        w = None if all(w is None for _, w in self.stations) else \
+            torch.cat([torch.ones(len(g), dtype=G.dtype, device=G.device) if w is None else w for g, w in self.stations])
+        self.add_rows(G, d, w)
+
+
+    def solve(self):
+        """
+        Current solution.
+
+        Returns
+        -------
+        torch.Tensor
+            Model. Shape (n_model,).
+        """
+        R, z = self._Rz[:self.n_model, :self.n_model], self._Rz[:self.n_model, self.n_model]
+        return torch.linalg.solve_triangular(R, z[:, None], upper=True)[:, 0]
+
+
+    @property
+    def misfit(self):
+        """
+        Current value of the (weighted, regularised) objective at the solution.
+        """
+        return self._Rz[self.n_model, self.n_model]**2
@@ -0,0 +1,314 @@
+import itertools
+import torch
+from typing import NamedTuple
+from .functional import okada, param_names, infer_model
+
+
+
+
+class Certificate(NamedTuple):
+    """
+    Errors of a surrogate on held-out samples of the training box.
+
+    Attributes
+    ----------
+    max_error : float
+        Maximum absolute error over all samples and outputs.
+    rms_error : float
+        Root mean square error over all samples and outputs.
+    max_relative : float
+        Maximum over the samples of ||prediction - exact|| / ||exact||.
+    q95_relative : float
+        95th percentile over the samples of the same relative error.
+    n_test : int
+        Number of held-out samples.
+    """
+    max_error: float
+    rms_error: float
+    max_relative: float
+    q95_relative: float
+    n_test: int
+
+
+
+
+def _chebyshev(u, degree:int):
+    """
+    Chebyshev polynomials T_0..T_degree of u in [-1, 1]. Shape (..., d, degree + 1).
+    """
+    T = [torch.ones_like(u), u]
+    for _ in range(2, degree + 1):
+        T.append(2.0 * u * T[-1] - T[-2])
+    return torch.stack(T[:degree + 1], dim=-1)
+
+
+
+def _multi_indices(d:int, degree:int):
+    """
+    Multi-indices of total degree <= `degree` in `d` dimensions. Shape (n_terms, d).
+    """
+    return torch.tensor(
+        [m for m in itertools.product(range(degree + 1), repeat=d) if sum(m) <= degree],
+        dtype=torch.long
+    )
+
+
+
+
+class Surrogate:
+    """
+    Emulator of the outputs at a fixed station set over a box of source parameters,
+    fitted by `fit_surrogate`.
+
+    The outputs are compressed by PCA, and the PCA coefficients are given by a Chebyshev expansion
+    of total degree or by a small MLP of the parameters scaled to [-1, 1].
+    Evaluation is differentiable with respect to the parameters.
+    Parameters outside the training box are evaluated with the exact kernels instead.
+
+    Attributes
+    ----------
+    names : list of str
+        Names of the emulated parameters (columns of `theta`).
+    lower, upper : torch.Tensor
+        Training box. Shape (n_names,).
+    certificate : Certificate
+        Errors on held-out samples.
+    """
+    def __init__(self, names, lower, upper, mean, basis, method:str, coef, exact, output_shape, los:bool=False):
+        self.names = list(names)
+        self.lower, self.upper = lower, upper
+        self.mean, self.basis = mean, basis
+        self.method = method
+        self.coef = coef
+        self.exact = exact
+        self.output_shape = output_shape
+        self.los = los
+        self.certificate = None
+        self.counts = {"surrogate": 0, "exact": 0}
+
+
+    def _scale(self, theta):
+        return 2.0 * (theta - self.lower) / (self.upper - self.lower) - 1.0
+
+
+    def _emulate(self, theta):
+        u = self._scale(theta)
+        if self.method == "chebyshev":
+            index, weights = self.coef
+            T = _chebyshev(u, int(index.max()))                     # (B, d, degree + 1)
+            phi = T.gather(-1, index.T.expand(len(u), -1, -1)).prod(1)     # (B, n_terms)
+            c = phi @ weights
+        else:
+            c = self.coef(u)
+        return self.mean + c @ self.basis
+
+
+    def __call__(self, theta, fallback:bool=True):
+        """
+        Outputs for a batch of parameters.
+
+        Parameters
+        ----------
+        theta : torch.Tensor
+            Values of the emulated parameters. Shape (B, n_names) or (n_names,).
+        fallback : bool, default True
+            If True, rows outside the training box are evaluated with the exact kernels.
+
+        Returns
+        -------
+        torch.Tensor
+            Shape (B, n_obs), or (n_obs,) for a single row.
+        """
+        single = theta.dim() == 1
+        theta = theta.reshape(-1, len(self.names)).to(self.mean)
+        out = self._emulate(theta)
+        n_exact = 0
+        if fallback:
+            outside = ((theta < self.lower) | (theta > self.upper)).any(dim=1)
+            if bool(outside.any()):
+                idx = torch.nonzero(outside).squeeze(1)
+                out = out.index_put((idx,), self.exact(theta[idx]))
+                n_exact = len(idx)
+        self.counts["exact"] += n_exact
+        self.counts["surrogate"] += len(theta) - n_exact
+        return out[0] if single else out
+
+
+    def compute(self, params:dict, fallback:bool=True):
+        """
+        Drop-in for `OkadaWrapper.compute` on the training stations with the fixed parameters
+        of the training: a list of tensors of shape (*x.shape) (one source) or (B, *x.shape).
+
+        Parameters
+        ----------
+        params : dict of float or torch.Tensor
+            Values of the emulated parameters (other keys are ignored).
+
+        Returns
+        -------
+        list of torch.Tensor, or torch.Tensor of line-of-sight displacements if fitted with `los`.
+        """
+        values = [torch.as_tensor(params[k], dtype=self.mean.dtype, device=self.mean.device) for k in self.names]
+        values = torch.broadcast_tensors(*values)
+        theta = torch.stack(values, dim=-1)
+        out = self(theta, fallback)
+        out = out.reshape(theta.shape[:-1] + self.output_shape)
+        if self.los:
+            return out
+        return list(out.unbind(dim=theta.dim() - 1))
+
+
+
+
+def fit_surrogate(coords:dict, params:dict, box:dict, n_train:int=2000, n_test:int=500,
+                  method:str="chebyshev", degree:int=4, hidden:int=64, max_iter:int=3000,
+                  n_components:int=None, tol:float=1e-10, compute_strain:bool=False, los=None,
+                  batch_size:int=256, is_degree:bool=True, fault_origin:str="topleft", nu:float=0.25,
+                  generator=None):
+    """
+    Fit a surrogate of the outputs at fixed stations over a box of source parameters,
+    and certify it on held-out samples.
+
+    Training and test samples are drawn uniformly in the box and evaluated in batches through
+    `OkadaTorch.functional.okada`. The outputs are compressed by PCA (`n_components`, or the number
+    of components explaining all but `tol` of the variance), and the PCA coefficients are fitted by
+    - "chebyshev": least squares on Chebyshev polynomials of total degree <= `degree`, or
+    - "mlp": a 2-layer MLP with `hidden` units (tanh), trained by full-batch L-BFGS.
+
+    Parameters
+    ----------
+    coords : dict of torch.Tensor
+        Same as that of `OkadaWrapper.compute`.
+    params : dict of float
+        Values of the source parameters that are not emulated.
+    box : dict of tuple of float
+        (lower, upper) of each emulated parameter.
+    n_train, n_test : int, default 2000, 500
+        Number of training and held-out samples.
+    method : str, default "chebyshev"
+        "chebyshev" or "mlp".
+    degree : int, default 4
+        Total degree of the Chebyshev expansion.
+    hidden, max_iter
+        Width and number of L-BFGS iterations of the MLP.
+    n_components : int, default None
+        Number of PCA components. If None, chosen by `tol`.
+    tol : float, default 1e-10
+        Fraction of the variance left out by the PCA when `n_components` is None.
+    compute_strain : bool, default False
+        Emulate the 9 displacement derivatives as well (not with `los`).
+    los : torch.Tensor, default None
+        Unit vectors (east, north, up) of the line of sight. Shape (3, *x.shape).
+    batch_size : int, default 256
+        Number of samples evaluated in one call.
+    is_degree, fault_origin, nu
+        Same as those of `OkadaWrapper.compute`.
+    generator : torch.Generator, default None
+        Random number generator (on CPU) of the samples and of the MLP initialisation.
+
+    Returns
+    -------
+    Surrogate
+    """
+
+    if method not in ["chebyshev", "mlp"]:
+        raise ValueError("'method' must be either 'chebyshev' or 'mlp'.")
+    assert not (compute_strain and los is not None), "'los' cannot be combined with 'compute_strain'."
+
+    names = list(box)
+    model = infer_model({**params, **box})
+    all_names = param_names(model)
+    for k in names:
+        assert k in all_names, f"'{k}' is not a parameter of the {model} model."
+    missing = [k for k in all_names if k not in params and k not in box]
+    assert len(missing) == 0, f"'params' or 'box' requires {', '.join(repr(k) for k in missing)}."
+
+    x, y = coords["x"], coords["y"]
+    z = coords["z"] if "z" in coords else None
+    dtype, device = x.dtype, x.device
+    xf, yf = x.flatten(), y.flatten()
+    zf = z.flatten() if z is not None else None
+    if los is not None:
+        los = los.reshape(3, -1).to(x)
+    output_shape = tuple(x.shape) if los is not None else ((12 if compute_strain else 3),) + tuple(x.shape)
+
+    base = torch.tensor([0.0 if k in box else float(params[k]) for k in all_names], dtype=dtype, device=device)
+    cols = [all_names.index(k) for k in names]
+    lower = torch.tensor([float(box[k][0]) for k in names], dtype=dtype, device=device)
+    upper = torch.tensor([float(box[k][1]) for k in names], dtype=dtype, device=device)
+
+    def exact(theta):
+        # differentiable exact outputs (the fallback of the surrogate)
+        full = base.expand(len(theta), -1).clone()
+        full[:, cols] = theta
+        U = okada(full, xf, yf, zf, model, compute_strain, is_degree, fault_origin, nu)
+        return (U * los).sum(1) if los is not None else U.flatten(1)
+
+    def sample(n):
+        U = torch.rand((n, len(names)), generator=generator, dtype=dtype).to(device)
+        theta = lower + U * (upper - lower)
+        with torch.no_grad():
+            Y = torch.cat([exact(theta[i:i + batch_size]) for i in range(0, n, batch_size)])
+        return theta, Y
+
+    theta, Y = sample(n_train)
+    assert bool(torch.isfinite(Y).all()), "outputs are not finite in the box (a station lies on a fault edge)."
+
+    # ---- PCA of the outputs ----
+    mean = Y.mean(0)
+    _, S, Vh = torch.linalg.svd(Y - mean, full_matrices=False)
+    if n_components is None:
+        energy = torch.cumsum(S**2, 0) / torch.clamp((S**2).sum(), min=torch.finfo(dtype).tiny)
+        n_components = int((energy < 1.0 - tol).sum()) + 1
+    basis = Vh[:n_components]                                 # (k, n_obs)
+    C = (Y - mean) @ basis.T                                  # (n_train, k)
+    u = 2.0 * (theta - lower) / (upper - lower) - 1.0
+
+    # ---- regression of the PCA coefficients ----
+    if method == "chebyshev":
+        index = _multi_indices(len(names), degree).to(device)
+        assert len(index) <= n_train, f"'n_train' must be at least the number of terms ({len(index)})."
+        T = _chebyshev(u, degree)
+        phi = T.gather(-1, index.T.expand(len(u), -1, -1)).prod(1)
+        weights = torch.linalg.lstsq(phi, C).solution
+        coef = (index, weights)
+    else:
+        scale = C.std().clamp(min=torch.finfo(dtype).tiny)     # one scale, so that components keep their variance
+        with torch.random.fork_rng(devices=[]):
+            if generator is not None:
+                torch.manual_seed(int(torch.randint(0, 2**31 - 1, (1,), generator=generator)))
+            net = torch.nn.Sequential(
+                torch.nn.Linear(len(names), hidden), torch.nn.Tanh(),
+                torch.nn.Linear(hidden, hidden), torch.nn.Tanh(),
+                torch.nn.Linear(hidden, n_components),
+            ).to(dtype=dtype, device=device)
+        optimizer = torch.optim.LBFGS(
+            net.parameters(), lr=1.0, max_iter=max_iter, history_size=50, line_search_fn="strong_wolfe",
+            tolerance_grad=1e-12, tolerance_change=1e-15,
+        )
+        target = C / scale
+        def closure():
+            optimizer.zero_grad()
+            loss = ((net(u) - target)**2).mean()
+            loss.backward()
+            return loss
+        optimizer.step(closure)
+        net.requires_grad_(False)
+        coef = lambda v: net(v) * scale
+
+    surrogate = Surrogate(names, lower, upper, mean, basis, method, coef, exact, output_shape, los is not None)
+
+    # ---- certification on held-out samples ----
+    theta_test, Y_test = sample(n_test)
+    with torch.no_grad():
+        E = surrogate(theta_test, fallback=False) - Y_test
+    relative = torch.linalg.norm(E, dim=1) / torch.clamp(torch.linalg.norm(Y_test, dim=1), min=torch.finfo(dtype).tiny)
+    surrogate.certificate = Certificate(
+        max_error=float(E.abs().max()),
+        rms_error=float(torch.sqrt((E**2).mean())),
+        max_relative=float(relative.max()),
+        q95_relative=float(torch.quantile(relative, 0.95)),
+        n_test=n_test,
+    )
+    surrogate.counts = {"surrogate": 0, "exact": 0}
+    return surrogate
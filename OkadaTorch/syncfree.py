@@ -0,0 +1,75 @@
+import contextlib
+import torch
+
+
+
+
+def _to_meta(obj):
+    """
+    Move all tensors in (nested) dicts, lists and tuples to the meta device.
+    """
+    if isinstance(obj, torch.Tensor):
+        return obj.to("meta")
+    if isinstance(obj, dict):
+        return {k: _to_meta(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_to_meta(v) for v in obj)
+    return obj
+
+
+
+@contextlib.contextmanager
+def sync_guard(device):
+    """
+    Context manager that turns any host-device synchronisation on `device` into an error.
+
+    On CUDA devices, `torch.cuda.set_sync_debug_mode("error")` is set for the duration of the block
+    and restored afterwards. On other devices (where kernels run synchronously anyway), nothing is done.
+
+    Parameters
+    ----------
+    device : torch.device or str
+        Device on which the computation runs.
+    """
+    device = torch.device(device)
+    if device.type != "cuda":
+        yield
+        return
+    old = torch.cuda.get_sync_debug_mode()
+    torch.cuda.set_sync_debug_mode("error")
+    try:
+        yield
+    finally:
+        torch.cuda.set_sync_debug_mode(old)
+
+
+
+def check_sync_free(fn, *args, **kwargs):
+    """
+    Assert that `fn(*args, **kwargs)` never reads tensor values on the host.
+
+    All tensors in the arguments are moved to the meta device, which carries shapes and dtypes but no data.
+    Any host read (`Tensor.__bool__`, `.item()`, `.tolist()`, data-dependent shapes such as `nonzero`, ...)
+    fails there, so a successful call proves that the code path is free of host-device synchronisation
+    and independent of data values. Unlike `sync_guard`, this works without a GPU.
+
+    Parameters
+    ----------
+    fn : callable
+        Function to be checked, e.g. `OkadaWrapper().compute`.
+    *args, **kwargs
+        Arguments of `fn`. Tensors (also inside dicts, lists and tuples) are moved to the meta device.
+
+    Returns
+    -------
+    Output of `fn` on the meta device.
+
+    Raises
+    ------
+    AssertionError
+        If `fn` reads tensor values.
+    """
+    try:
+        return fn(*_to_meta(args), **_to_meta(kwargs))
+    except (RuntimeError, NotImplementedError) as e:
+        raise AssertionError(f"{getattr(fn, '__qualname__', fn)} is not sync-free: {e}") from e
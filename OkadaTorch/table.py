@@ -0,0 +1,440 @@
+import warnings
+import torch
+from typing import NamedTuple
+from .okada1992 import DC3D
+from .functional import _rotate_stations, _back_rotate
+from .geometry import setup
+from .okadawrapper import _untracked
+
+
+TABLE_PARAMS = ("depth", "length", "width", "dip")
+
+
+
+
+class TableError(NamedTuple):
+    """
+    Interpolation errors of a `ResponseTable` for unit strike- and dip-slip,
+    measured at random points of random cells of the grid (points evaluated exactly are excluded).
+
+    Attributes
+    ----------
+    max_error : torch.Tensor
+        Maximum absolute error of each component. Shape (n_comp,).
+    rms_error : torch.Tensor
+        Root mean square error of each component. Shape (n_comp,).
+    max_relative : torch.Tensor
+        `max_error` divided by the maximum absolute value of each component over the test points.
+        Shape (n_comp,).
+    n_test : int
+        Number of test points.
+    """
+    max_error: torch.Tensor
+    rms_error: torch.Tensor
+    max_relative: torch.Tensor
+    n_test: int
+
+
+
+
+def _axis(lo:float, hi:float, foci, h_min:float, growth:float):
+    """
+    Nodes on [lo, hi] whose spacing is `h_min` at the foci and grows geometrically
+    (by about `growth` per node) with the distance to the nearest focus.
+    """
+    foci = sorted({min(max(float(f), lo), hi) for f in foci})
+    if len(foci) == 0:
+        foci = [lo]
+    bounds = [lo] + foci + [hi]
+
+    def march(length):
+        # distances d_k from a focus, with d_{k+1} - d_k = h_min + (growth - 1) d_k
+        d = [0.0]
+        while d[-1] < length:
+            d.append(d[-1] + h_min + (growth - 1.0) * d[-1])
+        return d
+
+    nodes = [lo]
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        if b - a <= 0.5 * h_min:
+            # too short for a node of its own: move the last node onto the focus
+            if b in foci and len(nodes) > 1:
+                nodes[-1] = b
+            elif b in foci:
+                nodes.append(b)
+            continue
+        left, right = a in foci, b in foci
+        if left and right:
+            d = march(0.5 * (b - a))
+            pts = [a + v for v in d if v < 0.5 * (b - a)] + [b - v for v in reversed(d) if v < 0.5 * (b - a)]
+        elif left:
+            pts = [a + v for v in march(b - a) if v < b - a] + [b]
+        else:
+            pts = [a] + [b - v for v in reversed(march(b - a)) if v < b - a]
+        for p in pts:
+            if p - nodes[-1] >= 0.5 * (h_min + (growth - 1.0) * min(abs(p - f) for f in foci)):
+                nodes.append(p)
+            elif p in foci:
+                nodes[-1] = p
+    if nodes[-1] < hi:
+        nodes.append(hi)
+    return nodes
+
+
+
+def _stencil(nodes, q):
+    """
+    First node index and weights of the cubic Lagrange interpolation of `q` on the 4 nodes around it.
+    Return indices (N,), weights (N, 4) and the half-width of the stencil seen from `q` (N,).
+    An axis of a single node gives weights of shape (N, 1).
+    """
+    n = len(nodes)
+    if n == 1:
+        return torch.zeros(len(q), dtype=torch.long, device=q.device), torch.ones_like(q)[:, None], torch.zeros_like(q)
+    i = torch.clamp(torch.searchsorted(nodes, q.detach(), right=True) - 2, 0, n - 4)
+    S = nodes.unfold(0, 4, 1)                                    # (n - 3, 4) nodes of each stencil
+    denom = torch.stack([(S[:, k, None] - S[:, [j for j in range(4) if j != k]]).prod(-1) for k in range(4)], dim=1)
+    s, inv = S.index_select(0, i), (1.0 / denom).index_select(0, i)
+    d = q[:, None] - s
+    d01, d23 = d[:, 0] * d[:, 1], d[:, 2] * d[:, 3]
+    w = torch.stack([d[:, 1] * d23, d[:, 0] * d23, d01 * d[:, 3], d01 * d[:, 2]], dim=1) * inv
+    half = torch.maximum(q.detach() - s[:, 0], s[:, 3] - q.detach())
+    return i, w, half
+
+
+
+
+class ResponseTable:
+    """
+    Tabulated responses of one rectangular fault geometry (`depth`, `length`, `width`, `dip`)
+    in the fault-local coordinates of `DC3D`, built by `tabulate`.
+
+    The table holds the responses to unit strike- and dip-slip at the nodes of a rectilinear grid,
+    so that `x_fault`, `y_fault`, `strike`, `rake` and `slip` can still be changed at lookup time.
+    Lookups use tricubic (tensor-product cubic Lagrange) interpolation, which is differentiable
+    with respect to the station coordinates and these parameters.
+    Stations outside the grid, and stations whose interpolation stencil may reach the fault plane
+    (where the responses are discontinuous or singular), are evaluated with `DC3D` instead.
+
+    Attributes
+    ----------
+    axes : tuple of torch.Tensor
+        Nodes of the grid along the fault-local x (strike), y and z (up) axes.
+    values : torch.Tensor
+        Unit responses at the nodes, in the order of the outputs of `DC3D`.
+        Shape (n_x * n_y * n_z, 2 * n_comp): strike-slip components, then dip-slip components.
+    error : TableError
+        Interpolation errors for unit slip.
+    counts : dict of int
+        Number of stations interpolated and of stations evaluated exactly.
+    """
+    def __init__(self, params:dict, axes, values, compute_strain:bool, is_degree:bool, fault_origin:str, nu:float):
+        self.params = {k: float(params[k]) for k in TABLE_PARAMS}
+        self.axes = axes
+        self.values = values
+        self.compute_strain = compute_strain
+        self.n_comp = 12 if compute_strain else 3
+        self.is_degree = is_degree
+        self.fault_origin = fault_origin
+        self.nu = nu
+        self.error = None
+        self.counts = {"table": 0, "exact": 0}
+
+        length, width = self.params["length"], self.params["width"]
+        if fault_origin == "topleft":
+            self.al, self.aw = (0.0, length), (-width, 0.0)
+        else:
+            self.al, self.aw = (-length / 2, length / 2), (-width / 2, width / 2)
+        dip = torch.tensor(self.params["dip"], dtype=torch.float64)
+        dip = torch.deg2rad(dip) if is_degree else dip
+        self.sd, self.cd = float(torch.sin(dip)), float(torch.cos(dip))
+
+
+    @property
+    def shape(self):
+        return tuple(len(a) for a in self.axes)
+
+
+    def _exact(self, xx, yy, z, disl1, disl2):
+        """
+        `DC3D` at fault-local stations, in the order of its outputs. Shape (N, n_comp).
+        """
+        depth, dip = [torch.tensor(self.params[k], dtype=xx.dtype, device=xx.device) for k in ("depth", "dip")]
+        out, _ = DC3D(
+            1 / (2.0 * (1 - self.nu)), xx, yy, z, depth, dip,
+            self.al[0], self.al[1], self.aw[0], self.aw[1], disl1, disl2, 0.0,
+            self.compute_strain, self.is_degree
+        )
+        out = torch.stack(out, dim=1)
+        return torch.where(torch.isfinite(out), out, 0.0)
+
+
+    def _distance(self, xx, yy, z):
+        """
+        Distance from fault-local stations to the fault rectangle.
+        """
+        r = z + self.params["depth"]
+        a = xx
+        b = yy * self.cd + r * self.sd
+        c = -yy * self.sd + r * self.cd
+        da = a - torch.clamp(a, self.al[0], self.al[1])
+        db = b - torch.clamp(b, self.aw[0], self.aw[1])
+        return torch.sqrt(da**2 + db**2 + c**2)
+
+
+    def _interpolate(self, xx, yy, z, values=None, source=None, chunk_size:int=8192):
+        """
+        Interpolated `values` (by default, the unit responses) at fault-local stations, of shape (N, n_channels),
+        and the mask of the stations outside the grid or whose stencil may reach the fault (N,).
+        `values` may stack the tables of several sources (n_sources * n_nodes, n_channels),
+        and `source` (N,) is then the source of each station.
+
+        Each chunk of `chunk_size` stations is a sparse (CSR) matrix of the stencil weights times `values`,
+        which reads the 64 (16 for a surface table) nodes of each station without gathering them.
+        Sparse CSR products have no usable autograd, so if a gradient is needed
+        (or a `torch.func` transform is active), the values are gathered and contracted instead.
+        """
+        values = self.values if values is None else values
+        (bx, wx, hx), (by, wy, hy), (bz, wz, hz) = [_stencil(a, q) for a, q in zip(self.axes, (xx, yy, z))]
+        n_x, n_y, n_z = self.shape
+        offset = (torch.arange(wx.shape[1], device=xx.device)[:, None, None] * (n_y * n_z)
+                  + torch.arange(wy.shape[1], device=xx.device)[None, :, None] * n_z
+                  + torch.arange(wz.shape[1], device=xx.device)[None, None, :]).flatten()
+        base = (bx * n_y + by) * n_z + bz
+        if source is not None:
+            base = base + source * (n_x * n_y * n_z)
+        K = len(offset)
+        sparse = _untracked([xx, yy, z, values])
+
+        out = []
+        for i in range(0, len(xx), chunk_size):
+            j = slice(i, i + chunk_size)
+            idx = base[j, None] + offset
+            w = (wx[j, :, None] * wy[j, None, :]).flatten(1)
+            if wz.shape[1] > 1:
+                w = (w[:, :, None] * wz[j, None, :]).flatten(1)
+            if sparse:
+                crow = torch.arange(0, idx.numel() + 1, K, device=xx.device)
+                with warnings.catch_warnings():
+                    warnings.filterwarnings("ignore", "Sparse CSR tensor support is in beta")
+                    A = torch.sparse_csr_tensor(crow, idx.flatten(), w.flatten().to(values.dtype),
+                                                size=(len(idx), len(values)), check_invariants=False)
+                out.append(A @ values)
+            else:
+                V = torch.index_select(values, 0, idx.flatten()).reshape(idx.shape + values.shape[1:])
+                out.append(torch.einsum("nk,nkc->nc", w, V))
+        out = torch.cat(out) if len(out) > 0 else values.new_zeros((0,) + values.shape[1:])
+
+        q = (xx.detach(), yy.detach(), z.detach())
+        mask = self._distance(*q) <= torch.sqrt(hx**2 + hy**2 + hz**2)
+        for a, v in zip(self.axes, q):
+            mask |= (v < a[0]) | (v > a[-1])
+        return out, mask
+
+
+    def interpolate(self, xx, yy, z, fallback:bool=True):
+        """
+        Unit responses at stations in the fault-local coordinates.
+
+        Parameters
+        ----------
+        xx, yy, z : torch.Tensor
+            Fault-local coordinates (as given to `DC3D`) of the stations. Shape (N,).
+        fallback : bool, default True
+            If True, stations outside the grid or whose stencil may reach the fault are evaluated with `DC3D`.
+            Otherwise, they are extrapolated from the nearest stencil.
+
+        Returns
+        -------
+        torch.Tensor
+            Responses to unit strike-slip and dip-slip. Shape (N, 2, n_comp).
+        """
+        out, mask = self._interpolate(xx, yy, z)
+        out = out.reshape(len(xx), 2, self.n_comp)
+        if not fallback:
+            self.counts["table"] += len(xx)
+            return out
+
+        exact = torch.nonzero(mask).squeeze(1)
+        if len(exact) > 0:
+            # both unit slips in one call
+            n = len(exact)
+            ones, zeros = torch.ones(n, dtype=xx.dtype, device=xx.device), torch.zeros(n, dtype=xx.dtype, device=xx.device)
+            e = self._exact(xx[exact].repeat(2), yy[exact].repeat(2), z[exact].repeat(2),
+                            torch.cat([ones, zeros]), torch.cat([zeros, ones]))
+            out = out.index_put((exact,), torch.stack([e[:n], e[n:]], dim=1).to(out))
+        self.counts["exact"] += len(exact)
+        self.counts["table"] += len(xx) - len(exact)
+        return out
+
+
+    def compute(self, coords:dict, params:dict, fallback:bool=True, chunk_size:int=8192):
+        """
+        Drop-in for `OkadaWrapper.compute` with the geometry of the table.
+
+        Parameters
+        ----------
+        coords : dict of torch.Tensor
+            Same as that of `OkadaWrapper.compute`. Without `"z"`, the stations are at the surface.
+        params : dict of float or torch.Tensor
+            `x_fault`, `y_fault`, `strike`, `rake` and `slip` (tensors of a common batch shape for several sources).
+            `depth`, `length`, `width` and `dip`, if given, must be those of the table.
+        fallback : bool, default True
+            See `interpolate`.
+        chunk_size : int, default 8192
+            Number of stations interpolated at once.
+
+        Returns
+        -------
+        list of torch.Tensor
+            [ux, uy, uz] or [ux, uy, uz, uxx, uyx, uzx, uxy, uyy, uzy, uxz, uyz, uzz],
+            each of shape (..., *x.shape) where (...) is the batch shape of the parameters.
+        """
+        for k in TABLE_PARAMS:
+            if k in params:
+                assert torch.allclose(torch.as_tensor(params[k], dtype=torch.float64), torch.tensor(self.params[k], dtype=torch.float64)), \
+                    f"'{k}' differs from that of the table."
+        x, y = coords["x"], coords["y"]
+        assert x.shape == y.shape, "shepe of x and y must be same."
+        z = coords["z"] if "z" in coords else torch.zeros_like(x)
+
+        values = [torch.as_tensor(params[k], dtype=x.dtype, device=x.device) for k in ("x_fault", "y_fault", "strike", "rake", "slip")]
+        values = torch.broadcast_tensors(*values)
+        batch_shape = values[0].shape
+        x_fault, y_fault, strike, rake, slip = [v.reshape(batch_shape + (1,) * x.dim()) for v in values]
+        dip = torch.tensor(self.params["dip"], dtype=x.dtype, device=x.device)
+        ss, cs, sd, cd, u_strike, u_dip = setup(strike, dip, rake, slip, self.is_degree)
+
+        xx, yy = _rotate_stations(x, y, x_fault, y_fault, ss, cs)
+        shape = xx.shape
+        xx, yy, zz = [v.expand(shape).reshape(-1).to(self.values.dtype) for v in (xx, yy, z)]
+        us, ud = [u.expand(shape).reshape(-1, 1).to(self.values.dtype) for u in (u_strike, u_dip)]
+
+        C = self.n_comp
+        n_sources, n_nodes = batch_shape.numel(), len(self.values)
+        if n_sources * n_nodes <= len(xx):
+            # combine the slip components in the table of each source before the lookups
+            # (as long as these tables are not larger than the stations)
+            ws, wd = [u.reshape(-1, 1, 1).to(self.values.dtype) for u in (u_strike, u_dip)]
+            values = (ws * self.values[:, :C] + wd * self.values[:, C:]).reshape(-1, C)
+            source = torch.arange(n_sources, device=xx.device).repeat_interleave(len(xx) // n_sources)
+            out, mask = self._interpolate(xx, yy, zz, values, source if n_sources > 1 else None, chunk_size)
+        else:
+            out, mask = self._interpolate(xx, yy, zz, None, None, chunk_size)
+            out = us * out[:, :C] + ud * out[:, C:]
+
+        if fallback:
+            exact = torch.nonzero(mask).squeeze(1)
+            if len(exact) > 0:
+                e = self._exact(xx[exact], yy[exact], zz[exact], us[exact, 0], ud[exact, 0])
+                out = out.index_put((exact,), e.to(out))
+            self.counts["exact"] += len(exact)
+            self.counts["table"] += len(xx) - len(exact)
+        else:
+            self.counts["table"] += len(xx)
+
+        out = [u.reshape(shape).to(x.dtype) for u in out.unbind(dim=1)]
+        return _back_rotate(out, ss, cs, True, self.compute_strain, self.nu)
+
+
+
+
+def tabulate(params:dict, extent:float=None, max_depth:float=None, h_min:float=None, growth:float=1.15,
+             compute_strain:bool=True, is_degree:bool=True, fault_origin:str="topleft", nu:float=0.25,
+             n_test:int=2000, batch_size:int=16384, dtype=None, device=None, generator=None):
+    """
+    Precompute a `ResponseTable` of a rectangular fault geometry.
+
+    The grid is rectilinear in the fault-local coordinates of `DC3D`. Along each axis,
+    the spacing is `h_min` at the edges of the fault (and at the surface and the depths of its top and bottom
+    for the z axis) and grows geometrically by `growth` away from them, i.e. the nodes are log-spaced
+    in the distance to the fault. The unit responses at the nodes are evaluated with `DC3D`
+    in batches of `batch_size`, and the interpolation error is measured on `n_test` random points.
+
+    Parameters
+    ----------
+    params : dict of float
+        `depth`, `length`, `width` and `dip` of the fault (other keys are ignored).
+    extent : float, default None
+        Horizontal distance covered by the table beyond the fault. If None, 5 * max(length, width).
+    max_depth : float, default None
+        Depth covered by the table. If None, the table covers the surface only (z = 0),
+        and the interpolation is bicubic.
+    h_min : float, default None
+        Spacing at the fault edges. If None, min(length, width) / 20.
+    growth : float, default 1.15
+        Ratio of consecutive spacings away from the fault.
+    compute_strain : bool, default True
+        Tabulate the 9 displacement derivatives as well.
+    is_degree, fault_origin, nu
+        Same as those of `OkadaWrapper.compute`.
+    n_test : int, default 2000
+        Number of points at which the error is measured.
+    batch_size : int, default 16384
+        Number of nodes evaluated in one call of `DC3D`.
+    dtype, device
+        Of the table. If None, the default dtype and device.
+    generator : torch.Generator, default None
+        Random number generator (on CPU) of the test points.
+
+    Returns
+    -------
+    ResponseTable
+    """
+
+    if fault_origin not in ["topleft", "center"]:
+        raise ValueError("'fault_origin' must be either 'topleft' or 'center'.")
+    missing = [k for k in TABLE_PARAMS if k not in params]
+    assert len(missing) == 0, f"'params' requires {', '.join(repr(k) for k in missing)}."
+    assert growth >= 1.0, "'growth' must be at least 1."
+    dtype = dtype if dtype is not None else torch.get_default_dtype()
+
+    table = ResponseTable(params, None, None, compute_strain, is_degree, fault_origin, nu)
+    depth, length, width = table.params["depth"], table.params["length"], table.params["width"]
+    sd, cd = table.sd, table.cd
+    extent = 5.0 * max(length, width) if extent is None else float(extent)
+    h_min = min(length, width) / 20.0 if h_min is None else float(h_min)
+
+    # edges of the fault in the fault-local system
+    y_edges = [table.aw[0] * cd, table.aw[1] * cd]
+    z_edges = [-depth + table.aw[0] * sd, -depth + table.aw[1] * sd]
+    x_nodes = _axis(table.al[0] - extent, table.al[1] + extent, table.al, h_min, growth)
+    y_nodes = _axis(min(y_edges) - extent, max(y_edges) + extent, y_edges, h_min, growth)
+    z_nodes = [0.0] if max_depth is None else _axis(-float(max_depth), 0.0, z_edges + [0.0], h_min, growth)
+    axes = tuple(torch.tensor(a, dtype=dtype, device=device) for a in (x_nodes, y_nodes, z_nodes))
+    for a in axes:
+        assert len(a) == 1 or len(a) >= 4, "each axis needs at least 4 nodes; decrease 'h_min'."
+    table.axes = axes
+
+    # unit responses at the nodes
+    X, Y, Z = [v.reshape(-1) for v in torch.meshgrid(*axes, indexing="ij")]
+    with torch.no_grad():
+        table.values = torch.cat([
+            torch.cat([table._exact(X[i:i + batch_size], Y[i:i + batch_size], Z[i:i + batch_size], 1.0, 0.0),
+                       table._exact(X[i:i + batch_size], Y[i:i + batch_size], Z[i:i + batch_size], 0.0, 1.0)], dim=1)
+            for i in range(0, len(X), batch_size)
+        ])
+
+        # error at a random point of each of `n_test` random cells
+        q = []
+        for a in axes:
+            if len(a) == 1:
+                q.append(a.expand(n_test))
+                continue
+            cell = torch.randint(0, len(a) - 1, (n_test,), generator=generator).to(a.device)
+            t = torch.rand((n_test,), generator=generator, dtype=a.dtype).to(a.device)
+            q.append(a[cell] + t * (a[cell + 1] - a[cell]))
+        G, mask = table._interpolate(*q)
+        G = G.reshape(n_test, 2, table.n_comp)
+        exact = torch.stack([table._exact(*q, 1.0, 0.0), table._exact(*q, 0.0, 1.0)], dim=1)
+        keep = ~mask                                          # points evaluated exactly have no error
+        E = (G - exact)[keep]
+        E, peak = E.abs().amax(1), exact[keep].abs().amax(1)   # max over the slip directions
+    table.error = TableError(
+        max_error=E.amax(0),
+        rms_error=torch.sqrt((E**2).mean(0)),
+        max_relative=E.amax(0) / torch.clamp(peak.amax(0), min=torch.finfo(dtype).tiny),
+        n_test=int(keep.sum()),
+    )
+    table.counts = {"table": 0, "exact": 0}
+    return table
@@ -0,0 +1,181 @@
+import math
+import numpy as np
+import torch
+from .functional import okada, pack, infer_model, param_names
+
+
+
+
+def kajiura_filter(uplift, dx:float, dy:float, depth, n_depths:int=8, pad:int=None):
+    """
+    Sea-surface height generated by an instantaneous seafloor uplift (Kajiura, 1963):
+    the low-pass filter 1 / cosh(k H) applied by FFT.
+
+    For a variable water depth, the field is filtered with `n_depths` reference depths
+    between the minimum and the maximum of `depth`, and each cell is linearly interpolated
+    between the two reference depths around its own depth (local-depth approximation).
+
+    Parameters
+    ----------
+    uplift : torch.Tensor
+        Seafloor uplift on a regular grid. Shape (ny, nx).
+    dx, dy : float
+        Grid spacings, in the unit of `depth`.
+    depth : float or torch.Tensor
+        Water depth (positive). Scalar or shape (ny, nx). Values below the smallest positive depth
+        (e.g. land) are filtered with the smallest positive depth.
+    n_depths : int, default 8
+        Number of reference depths for a variable depth. With 1, the mean positive depth is used.
+    pad : int, default None
+        Number of cells added on each side (replicating the edges) against the periodicity of the FFT.
+        If None, 3 times the maximum depth in cells.
+
+    Returns
+    -------
+    torch.Tensor
+        Shape (ny, nx).
+    """
+    ny, nx = uplift.shape
+    depth = torch.as_tensor(depth, dtype=uplift.dtype, device=uplift.device)
+    positive = depth[depth > 0]
+    assert positive.numel() > 0, "'depth' must have positive values."
+    h_min, h_max = float(positive.min()), float(positive.max())
+    if pad is None:
+        pad = int(math.ceil(3.0 * h_max / min(dx, dy)))
+
+    U = torch.nn.functional.pad(uplift[None, None], (pad, pad, pad, pad), mode="replicate")[0, 0]
+    F = torch.fft.rfft2(U)
+    ky = 2.0 * torch.pi * torch.fft.fftfreq(U.shape[0], d=dy, dtype=uplift.dtype, device=uplift.device)
+    kx = 2.0 * torch.pi * torch.fft.rfftfreq(U.shape[1], d=dx, dtype=uplift.dtype, device=uplift.device)
+    k = torch.sqrt(ky[:, None]**2 + kx[None, :]**2)
+
+    def filtered(h):
+        e = torch.exp(-k * h)                               # 1 / cosh(k h) without overflow
+        return torch.fft.irfft2(F * (2.0 * e / (1.0 + e**2)), s=U.shape)[pad:pad + ny, pad:pad + nx]
+
+    if depth.dim() == 0:
+        return filtered(float(depth))
+    if n_depths == 1 or h_max - h_min <= 1e-12 * h_max:
+        return filtered(float(positive.mean()))
+
+    # hat functions of the local depth over the reference depths
+    H = torch.linspace(h_min, h_max, n_depths, dtype=uplift.dtype, device=uplift.device)
+    t = (depth.clamp(h_min, h_max) - h_min) / (H[1] - H[0])
+    out = torch.zeros_like(uplift)
+    for j in range(n_depths):
+        w = torch.clamp(1.0 - torch.abs(t - j), min=0.0)
+        if bool((w > 0).any()):
+            out += w * filtered(float(H[j]))
+    return out
+
+
+
+def tsunami_initial(path:str, x, y, bathymetry, params, horizontal:bool=True, kajiura:bool=True,
+                    n_depths:int=8, tile:tuple=(256, 256), batch_size:int=None,
+                    is_degree:bool=True, fault_origin:str="topleft", nu:float=0.25,
+                    dtype=np.float64, progress=None):
+    """
+    Initial sea-surface height of a tsunami on a bathymetry grid, written to a memory-mapped `.npy` file.
+
+    1. The surface displacements of all sources are evaluated tile by tile (`SRECTF`/`SPOINT`,
+       the sources of a tile in batched calls of `OkadaTorch.functional.okada`) and summed.
+    2. The vertical seafloor displacement is uz + ux dH/dx + uy dH/dy (Tanioka & Satake, 1996),
+       where the water depth H is differentiated by central differences across the tiles.
+    3. The Kajiura filter (`kajiura_filter`) is applied to the whole grid by FFT.
+    Cells with H <= 0 (land) are set to zero.
+
+    Parameters
+    ----------
+    path : str
+        Output file (`.npy`). The array has shape (ny, nx).
+    x, y : torch.Tensor
+        1D, evenly spaced coordinate axes of the grid.
+    bathymetry : numpy.ndarray or torch.Tensor
+        Water depth H (positive downward) in the unit of x and y. Shape (ny, nx).
+        Can be a `numpy.memmap`; only tiles of it are read before the filter.
+    params : dict of torch.Tensor
+        Source parameters in the format of `OkadaWrapper.compute`. Values can be tensors of shape (n_sources,),
+        e.g. from `FaultMesh.params(rake, slip)` (with the `origin` and `is_degree` of the mesh),
+        to sum several patches in one pass over the grid.
+    horizontal : bool, default True
+        Add the contribution of the horizontal displacements over the bathymetry slope.
+    kajiura : bool, default True
+        Apply the Kajiura filter. If False, the output is the vertical seafloor displacement.
+    n_depths : int, default 8
+        Number of reference depths of the filter (see `kajiura_filter`).
+    tile : tuple of int, default (256, 256)
+        Tile size in (y, x).
+    batch_size : int, default None
+        Number of sources evaluated in one call. If None, about 16384 cell-sources per call.
+    is_degree, fault_origin, nu
+        Same as those of `OkadaWrapper.compute`.
+    dtype : numpy dtype, default np.float64
+        Data type of the output file.
+    progress : callable, default None
+        Called as `progress(n_done, n_total)` after each tile.
+
+    Returns
+    -------
+    numpy.memmap
+        Initial sea-surface height of shape (ny, nx).
+    """
+
+    assert x.dim() == 1 and y.dim() == 1, "x and y must be 1D tensors."
+    assert len(tile) == 2, "'tile' must be a tuple of 2 ints."
+    nx, ny = len(x), len(y)
+    assert tuple(bathymetry.shape) == (ny, nx), "shape of 'bathymetry' must be (len(y), len(x))."
+    dx, dy = float(x[1] - x[0]), float(y[1] - y[0])
+    assert torch.allclose(torch.diff(x), torch.full_like(x[1:], dx)) and \
+        torch.allclose(torch.diff(y), torch.full_like(y[1:], dy)), "x and y must be evenly spaced."
+
+    model = infer_model(params)
+    theta = pack({k: params[k] for k in param_names(model)}, model, dtype=x.dtype, device=x.device).reshape(-1, len(param_names(model)))
+
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(ny, nx))
+    ty, tx = tile
+    if batch_size is None:
+        batch_size = max(1, 16384 // (ty * tx))
+    n_tiles = ((ny + ty - 1) // ty) * ((nx + tx - 1) // tx)
+    n_done = 0
+
+
+    # ---- 1. vertical seafloor displacement, tile by tile ----
+    with torch.no_grad():
+        for y0 in range(0, ny, ty):
+            for x0 in range(0, nx, tx):
+                sy, sx = slice(y0, min(y0 + ty, ny)), slice(x0, min(x0 + tx, nx))
+                Y, X = torch.meshgrid(y[sy], x[sx], indexing="ij")
+                u = torch.zeros((3,) + X.shape, dtype=x.dtype, device=x.device)
+                for i in range(0, len(theta), batch_size):
+                    U = okada(theta[i:i + batch_size], X, Y, None, model, False, is_degree, fault_origin, nu)
+                    u += torch.where(torch.isfinite(U), U, 0.0).sum(0)
+                uplift = u[2]
+
+                if horizontal:
+                    # one cell of halo for the central differences
+                    hy = slice(max(y0 - 1, 0), min(y0 + ty + 1, ny))
+                    hx = slice(max(x0 - 1, 0), min(x0 + tx + 1, nx))
+                    H = torch.as_tensor(np.asarray(bathymetry[hy, hx]) if not isinstance(bathymetry, torch.Tensor) else bathymetry[hy, hx])
+                    H = H.to(dtype=x.dtype, device=x.device)
+                    dHdy, dHdx = torch.gradient(H, spacing=(dy, dx))
+                    iy, ix = sy.start - hy.start, sx.start - hx.start
+                    crop = (slice(iy, iy + X.shape[0]), slice(ix, ix + X.shape[1]))
+                    uplift = uplift + u[0] * dHdx[crop] + u[1] * dHdy[crop]
+
+                out[sy, sx] = uplift.cpu().numpy().astype(dtype, copy=False)
+                n_done += 1
+                if progress is not None:
+                    progress(n_done, n_tiles)
+    out.flush()
+
+
+    # ---- 2. Kajiura filter over the whole grid, and land mask ----
+    H = torch.as_tensor(np.asarray(bathymetry) if not isinstance(bathymetry, torch.Tensor) else bathymetry)
+    H = H.to(dtype=x.dtype, device=x.device)
+    eta = torch.as_tensor(np.asarray(out), dtype=x.dtype, device=x.device)
+    if kajiura:
+        eta = kajiura_filter(eta, abs(dx), abs(dy), H, n_depths)
+    eta = torch.where(H > 0, eta, 0.0)
+    out[...] = eta.cpu().numpy().astype(dtype, copy=False)
+    out.flush()
+    return out
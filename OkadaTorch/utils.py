@@ -1,9 +1,87 @@
 import torch
+from typing import NamedTuple
+from .profiling import profiled
 
 PI2 = 2.0 * torch.pi
 EPS = 1.0e-6
+# EPS is tuned for float64. In float32, coordinate differences of O(100) are
+# only resolved to O(1e-5), so a larger threshold is needed to catch the same singular points.
+EPS_BY_DTYPE = {torch.float32: 1.0e-4}
 
 
+
+def _eps(T):
+    """
+    Threshold for (near-)zero values according to the dtype of `T`.
+    """
+    if isinstance(T, torch.Tensor):
+        return EPS_BY_DTYPE.get(T.dtype, EPS)
+    return EPS
+
+
+
+def _is_reduced(T):
+    """
+    Check if `T` is in a precision lower than float64.
+    """
+    return isinstance(T, torch.Tensor) and T.dtype != torch.float64
+
+
+
+def _r_plus(R, A, B2):
+    """
+    R + A, where R**2 = A**2 + B2.
+
+    In reduced precision, B2 / (R - A) is used for A < 0 instead.
+    It is equal to R + A, but does not cancel when -A is close to R
+    (far field on the negative side of a fault edge).
+    """
+    if not _is_reduced(R):
+        return R + A
+    NEG = A < 0.0
+    return torch.where(NEG, B2 / torch.where(NEG, R - A, 1.0), R + A)
+
+
+
+def _nonzero(V):
+    """
+    Check if the contribution of a dislocation (or potency) component has to be evaluated.
+
+    Only Python numbers (e.g. the constant `0.0` passed by `OkadaWrapper` for the tensile component) 
+    are tested. Tensors are always evaluated, since inspecting their values would require 
+    a host-device synchronisation and breaks `vmap`, `torch.compile` and `torch.export`.
+    """
+    if isinstance(V, torch.Tensor):
+        return True
+    return V != 0.0
+
+
+
+def _accumulate(U, DU, A=1.0):
+    """
+    U[I] = U[I] + A * DU[I] for all I, in place of the list `U`.
+
+    Entries of `U` that are None are treated as zero, so that accumulators
+    need no zero-filled buffers. `A` of 1.0 or -1.0 is applied as an addition
+    or a subtraction without a multiplication.
+    """
+    for I in range(len(U)):
+        if isinstance(A, float) and A == -1.0:
+            U[I] = -DU[I] if U[I] is None else U[I] - DU[I]
+        else:
+            V = DU[I] if (isinstance(A, float) and A == 1.0) else A * DU[I]
+            U[I] = V if U[I] is None else U[I] + V
+
+
+
+def _filled(U, T):
+    """
+    Replace the entries of `U` that are not tensors (no contribution was accumulated) by zeros like `T`.
+    """
+    return [V if isinstance(V, torch.Tensor) else torch.zeros_like(T) for V in U]
+
+
+@profiled("_SRECTG")
 def _SRECTG(ALP, XI, ET, Q, SD, CD, DISL1, DISL2, DISL3, compute_strain):
     """
     Indefinite integral of surface displacements, strains and tilts
@@ -46,11 +124,11 @@ def _SRECTG(ALP, XI, ET, Q, SD, CD, DISL1, DISL2, DISL3, compute_strain):
     PyTorch implementation by M.Someya in 2025.
     """
 
-    # Initialization
+    # Initialization (Python zeros; turned into tensors by the first contribution)
     if compute_strain:
-        U1, U2, U3, U11, U12, U21, U22, U31, U32 = [torch.zeros_like(XI) for _ in range(9)]
+        U1, U2, U3, U11, U12, U21, U22, U31, U32 = [0.0] * 9
     else:
-        U1, U2, U3 = [torch.zeros_like(XI) for _ in range(3)]
+        U1, U2, U3 = [0.0] * 3
 
 
     XI2 = XI**2
@@ -60,13 +138,13 @@ def _SRECTG(ALP, XI, ET, Q, SD, CD, DISL1, DISL2, DISL3, compute_strain):
     R = torch.sqrt(R2)
     D = ET * SD - Q * CD
     Y = ET * CD + Q * SD
-    RET = R + ET
+    RET = _r_plus(R, ET, XI2 + Q2)
     RET = torch.where(
         RET < 0.0,
         0.0,
         RET
     )
-    RD = R + D
+    RD = _r_plus(R, D, XI2 + Y**2)
     
     TT = torch.where(
         Q != 0.0, 
@@ -85,36 +163,49 @@ def _SRECTG(ALP, XI, ET, Q, SD, CD, DISL1, DISL2, DISL3, compute_strain):
     )
     # Modification to prevent zero-division. 
     # RRX = 1.0 / ( R * (R + XI))
+    RXI = _r_plus(R, XI, ET2 + Q2)
     RRX = torch.where(
-        torch.abs(R * (R + XI)) < EPS,
-        1.0e6, 
-        1.0 / (R * (R + XI))
+        torch.abs(R * RXI) < _eps(XI),
+        1.0 / _eps(XI), 
+        1.0 / (R * RXI)
     )
 
     RRE = RE / R
 
-    if CD != 0.0:
-        # INCLINED FAULT
-        TD = SD / CD
-        X = torch.sqrt(XI2 + Q2)
-        A5 = torch.where(
-            XI == 0.0, 
-            0.0, 
-            ALP * 2.0 / CD * torch.atan( 
-                (ET * (X + Q * CD) + X * (R + X) * SD) / (XI * (R + X) * CD) 
-            )
+    # Both the inclined and the vertical branch are evaluated and selected elementwise,
+    # so that CD can be a tensor (no data-dependent Python branch).
+    # CDI is CD with zeros replaced by one, which keeps the unused inclined branch
+    # (and its gradient) finite for vertical faults.
+    if not isinstance(CD, torch.Tensor):
+        CD = torch.tensor(CD, dtype=XI.dtype, device=XI.device)
+    VERT = (CD == 0.0)
+    CDI = torch.where(VERT, 1.0, CD)
+
+    # INCLINED FAULT
+    TD = SD / CDI
+    X = torch.sqrt(XI2 + Q2)
+    A5I = torch.where(
+        XI == 0.0, 
+        0.0, 
+        ALP * 2.0 / CDI * torch.atan( 
+            (ET * (X + Q * CDI) + X * (R + X) * SD) / (XI * (R + X) * CDI) 
         )
-        A4 =  ALP / CD * (torch.log(RD) - SD * DLE)
-        A3 =  ALP * ( Y / RD / CD - DLE) + TD * A4
-        A1 = -ALP / CD * XI / RD         - TD * A5
-    else:
-        # VERTICAL FAULT
-        RD2 = RD**2
-        A1 = -ALP / 2.0 * XI * Q / RD2
-        A3 =  ALP / 2.0 * (ET / RD + Y * Q / RD2 - DLE)
-        A4 = -ALP * Q / RD
-        A5 = -ALP * XI * SD / RD
-
+    )
+    A4I =  ALP / CDI * (torch.log(RD) - SD * DLE)
+    A3I =  ALP * ( Y / RD / CDI - DLE) + TD * A4I
+    A1I = -ALP / CDI * XI / RD         - TD * A5I
+
+    # VERTICAL FAULT
+    RD2 = RD**2
+    A1V = -ALP / 2.0 * XI * Q / RD2
+    A3V =  ALP / 2.0 * (ET / RD + Y * Q / RD2 - DLE)
+    A4V = -ALP * Q / RD
+    A5V = -ALP * XI * SD / RD
+
+    A1 = torch.where(VERT, A1V, A1I)
+    A3 = torch.where(VERT, A3V, A3I)
+    A4 = torch.where(VERT, A4V, A4I)
+    A5 = torch.where(VERT, A5V, A5I)
     A2 = -ALP * DLE - A3
 
 
@@ -124,18 +215,22 @@ def _SRECTG(ALP, XI, ET, Q, SD, CD, DISL1, DISL2, DISL3, compute_strain):
         AET = (2.0 * R + ET) * RRE**2 / R
         R3 = R**3
 
-        if CD != 0.0:
-            # INCLINED FAULT
-            C1 = ALP / CD * XI * (RRD - SD * RRE)
-            C3 = ALP / CD * (Q * RRE - Y * RRD)
-            B1 = ALP / CD * (XI2 * RRD - 1.0) / RD - TD * C3
-            B2 = ALP / CD * XI * Y * RRD / RD      - TD * C1
-        else:
-            # VERTICAL FAULT
-            B1 = ALP / 2.0 * Q       / RD2 * (2.0 * XI2 * RRD - 1.0)
-            B2 = ALP / 2.0 * XI * SD / RD2 * (2.0 * Q2  * RRD - 1.0)
-            C1 = ALP * XI * Q * RRD / RD
-            C3 = ALP * SD / RD * (XI2 * RRD - 1.0)
+        # INCLINED FAULT
+        C1I = ALP / CDI * XI * (RRD - SD * RRE)
+        C3I = ALP / CDI * (Q * RRE - Y * RRD)
+        B1I = ALP / CDI * (XI2 * RRD - 1.0) / RD - TD * C3I
+        B2I = ALP / CDI * XI * Y * RRD / RD      - TD * C1I
+
+        # VERTICAL FAULT
+        B1V = ALP / 2.0 * Q       / RD2 * (2.0 * XI2 * RRD - 1.0)
+        B2V = ALP / 2.0 * XI * SD / RD2 * (2.0 * Q2  * RRD - 1.0)
+        C1V = ALP * XI * Q * RRD / RD
+        C3V = ALP * SD / RD * (XI2 * RRD - 1.0)
+
+        B1 = torch.where(VERT, B1V, B1I)
+        B2 = torch.where(VERT, B2V, B2I)
+        C1 = torch.where(VERT, C1V, C1I)
+        C3 = torch.where(VERT, C3V, C3I)
 
         B3 = -ALP * XI * RRE - B2
         B4 = -ALP * (CD / R + Q * SD * RRE) - B1
@@ -145,7 +240,7 @@ def _SRECTG(ALP, XI, ET, Q, SD, CD, DISL1, DISL2, DISL3, compute_strain):
 
 
     # STRIKE-SLIP CONTRIBUTION
-    if DISL1 != 0.0:
+    if _nonzero(DISL1):
         UN = DISL1 / PI2
         REQ = RRE * Q
         U1 = U1 - UN * (REQ * XI + TT          + A1 * SD)
@@ -162,7 +257,7 @@ def _SRECTG(ALP, XI, ET, Q, SD, CD, DISL1, DISL2, DISL3, compute_strain):
 
 
     # DIP-SLIP CONTRIBUTION
-    if DISL2 != 0.0:
+    if _nonzero(DISL2):
         UN = DISL2 / PI2
         SDCD = SD * CD
         U1 = U1 - UN * (Q / R                 - A3 * SDCD)
@@ -179,7 +274,7 @@ def _SRECTG(ALP, XI, ET, Q, SD, CD, DISL1, DISL2, DISL3, compute_strain):
 
 
     # TENSILE-FAULT CONTRIBUTION
-    if DISL3 != 0.0:
+    if _nonzero(DISL3):
         UN = DISL3 / PI2
         SDSD = SD**2
         U1 = U1 + UN * (Q2 * RRE                                - A3 * SDSD)
@@ -197,14 +292,15 @@ def _SRECTG(ALP, XI, ET, Q, SD, CD, DISL1, DISL2, DISL3, compute_strain):
 
 
     if compute_strain:
-        return [U1, U2, U3, U11, U12, U21, U22, U31, U32]
+        return _filled([U1, U2, U3, U11, U12, U21, U22, U31, U32], XI)
     else:
-        return [U1, U2, U3]
+        return _filled([U1, U2, U3], XI)
 
 
 
 
 
+@profiled("_UA0")
 def _UA0(X, Y, D, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
     """
     Displacement and strain at depth (Part-A) 
@@ -217,7 +313,7 @@ def _UA0(X, Y, D, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
     POT1, POT2, POT3, POT4 : float or torch.Tensor
         Strike-, dip-, tensile- and inflate-potency.
     C0, C1
-        Instance of classes `COMMON0` and `COMMON1`.
+        Instances of `COMMON0` and `COMMON1`.
     compute_strain : bool
         Option to calculate the spatial derivative of the displacement.
         New in the PyTorch implementation.
@@ -234,8 +330,8 @@ def _UA0(X, Y, D, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
 
     # Initialization
     N_variable = 12 if compute_strain else 3
-    U = [torch.zeros_like(X) for _ in range(N_variable)]
-    DU = [torch.zeros_like(X) for _ in range(N_variable)]
+    U = [None] * N_variable
+    DU = [None] * N_variable
 
 
     ALP1, ALP2, SD, CD = C0.ALP1, C0.ALP2, C0.SD, C0.CD
@@ -249,7 +345,7 @@ def _UA0(X, Y, D, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
 
 
     # STRIKE-SLIP CONTRIBUTION
-    if (POT1 != 0.0):
+    if _nonzero(POT1):
         DU[ 0] =  ALP1 * Q / R3      + ALP2 * X2    * QR
         DU[ 1] =  ALP1 * X / R3 * SD + ALP2 * XY    * QR
         DU[ 2] = -ALP1 * X / R3 * CD + ALP2 * X * D * QR
@@ -265,13 +361,12 @@ def _UA0(X, Y, D, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
             DU[10] = 3.0 * X / R5 * ( ALP1 * D * SD + ALP2 * Y * UZ)
             DU[11] = 3.0 * X / R5 * (-ALP1 * D * CD + ALP2 * (D * UZ - Q))
 
-        for I in range(N_variable):
-            U[I] = U[I] + POT1 / PI2 * DU[I]
+        _accumulate(U, DU, POT1 / PI2)
 
 
 
     # DIP-SLIP CONTRIBUTION
-    if (POT2 != 0.0):
+    if _nonzero(POT2):
         DU[ 0] =                  ALP2 * X * P * QR
         DU[ 1] =  ALP1 * S / R3 + ALP2 * Y * P * QR
         DU[ 2] = -ALP1 * T / R3 + ALP2 * D * P * QR
@@ -287,13 +382,12 @@ def _UA0(X, Y, D, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
             DU[10] =  ALP1 * (C2D / R3 + 3.0 * D * S / R5) + ALP2 * 3.0 * Y / R5 * VZ
             DU[11] =  ALP1 * (S2D / R3 - 3.0 * D * T / R5) + ALP2 * (3.0 * D / R5 * VZ - P * QR)
     
-        for I in range(N_variable):
-            U[I] = U[I] + POT2 / PI2 * DU[I]
+        _accumulate(U, DU, POT2 / PI2)
 
 
 
     # TENSILE-FAULT CONTRIBUTION
-    if (POT3 != 0.0):
+    if _nonzero(POT3):
         DU[ 0] = ALP1 * X / R3 - ALP2 * X * Q * QR
         DU[ 1] = ALP1 * T / R3 - ALP2 * Y * Q * QR
         DU[ 2] = ALP1 * S / R3 - ALP2 * D * Q * QR
@@ -309,13 +403,12 @@ def _UA0(X, Y, D, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
             DU[10] = -ALP1 * (S2D / R3 - 3.0 * D * T / R5) - ALP2 * Y * QR * WZ
             DU[11] =  ALP1 * (C2D / R3 + 3.0 * D * S / R5) - ALP2 * (D * WZ - Q) * QR
 
-        for I in range(N_variable):
-            U[I] = U[I] + POT3 / PI2 * DU[I]
+        _accumulate(U, DU, POT3 / PI2)
 
 
 
     # INFLATE SOURCE CONTRIBUTION
-    if (POT4 != 0.0):
+    if _nonzero(POT4):
         DU[ 0] = -ALP1 * X / R3
         DU[ 1] = -ALP1 * Y / R3
         DU[ 2] = -ALP1 * D / R3
@@ -331,14 +424,14 @@ def _UA0(X, Y, D, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
             DU[10] = -DU[8]
             DU[11] =  ALP1 * C3 / R3
         
-        for I in range(N_variable):
-            U[I] = U[I] + POT4 / PI2 * DU[I]
+        _accumulate(U, DU, POT4 / PI2)
 
 
-    return U
+    return _filled(U, X)
 
 
 
+@profiled("_UB0")
 def _UB0(X, Y, D, Z, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
     """
     Displacement and strain at depth (Part-B) 
@@ -351,7 +444,7 @@ def _UB0(X, Y, D, Z, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
     POT1, POT2, POT3, POT4 : float or torch.Tensor
         Strike-, dip-, tensile- and inflate-potency.
     C0, C1
-        Instance of classes `COMMON0` and `COMMON1`.
+        Instances of `COMMON0` and `COMMON1`.
     compute_strain : bool
         Option to calculate the spatial derivative of the displacement.
         New in the PyTorch implementation.
@@ -368,8 +461,8 @@ def _UB0(X, Y, D, Z, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
 
     # Initialization
     N_variable = 12 if compute_strain else 3
-    U = [torch.zeros_like(X) for _ in range(N_variable)]
-    DU = [torch.zeros_like(X) for _ in range(N_variable)]
+    U = [None] * N_variable
+    DU = [None] * N_variable
 
     ALP3, SD, SDSD, SDCD = C0.ALP3, C0.SD, C0.SDSD, C0.SDCD
     P, Q, XY, X2, Y2 = C1.P, C1.Q, C1.XY, C1.X2, C1.Y2
@@ -404,7 +497,7 @@ def _UB0(X, Y, D, Z, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
 
 
     # STRIKE-SLIP CONTRIBUTION
-    if (POT1 != 0.0) :
+    if _nonzero(POT1):
         DU[ 0] = -X2 * QR    - ALP3 * FI1 * SD
         DU[ 1] = -XY * QR    - ALP3 * FI2 * SD
         DU[ 2] = -C * X * QR - ALP3 * FI4 * SD
@@ -420,12 +513,11 @@ def _UB0(X, Y, D, Z, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
             DU[10] = -3.0 * XY / R5 * UZ          + ALP3 * FK2 * SD
             DU[11] =  3.0 * X / R5 * (-C * UZ + ALP3 * Y * SD)
 
-        for I in range(N_variable):
-            U[I] = U[I] + POT1 / PI2 * DU[I]
+        _accumulate(U, DU, POT1 / PI2)
 
 
     # DIP-SLIP CONTRIBUTION
-    if (POT2 != 0.0):
+    if _nonzero(POT2):
         DU[ 0] = -X * P * QR + ALP3 * FI3 * SDCD
         DU[ 1] = -Y * P * QR + ALP3 * FI1 * SDCD
         DU[ 2] = -C * P * QR + ALP3 * FI5 * SDCD
@@ -441,12 +533,11 @@ def _UB0(X, Y, D, Z, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
             DU[10] = -3.0 * Y / R5 * VZ          - ALP3 * FK1 * SDCD
             DU[11] = -3.0 * C / R5 * VZ          + ALP3 * A3 / R3 * SDCD
 
-        for I in range(N_variable):
-            U[I] = U[I] + POT2 / PI2 * DU[I]
+        _accumulate(U, DU, POT2 / PI2)
 
 
     # TENSILE-FAULT CONTRIBUTION
-    if (POT3 != 0.0):
+    if _nonzero(POT3):
         DU[ 0] = X * Q * QR - ALP3 * FI3 * SDSD
         DU[ 1] = Y * Q * QR - ALP3 * FI1 * SDSD
         DU[ 2] = C * Q * QR - ALP3 * FI5 * SDSD
@@ -462,12 +553,11 @@ def _UB0(X, Y, D, Z, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
             DU[10] =  Y * QR * WZ       + ALP3 * FK1 * SDSD
             DU[11] =  C * QR * WZ       - ALP3 * A3 / R3 * SDSD
 
-        for I in range(N_variable):
-            U[I] = U[I] + POT3 / PI2 * DU[I]
+        _accumulate(U, DU, POT3 / PI2)
 
 
     # INFLATE SOURCE CONTRIBUTION
-    if (POT4 != 0.0):
+    if _nonzero(POT4):
         DU[ 0] = ALP3 * X / R3
         DU[ 1] = ALP3 * Y / R3
         DU[ 2] = ALP3 * D / R3
@@ -483,14 +573,14 @@ def _UB0(X, Y, D, Z, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
             DU[10] = -DU[8]
             DU[11] = -ALP3 * C3 / R3
 
-        for I in range(N_variable):
-            U[I] = U[I] + POT4 / PI2 * DU[I]
+        _accumulate(U, DU, POT4 / PI2)
 
 
-    return U
+    return _filled(U, X)
 
 
 
+@profiled("_UC0")
 def _UC0(X, Y, D, Z, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
     """
     Displacement and strain at depth (Part-C) 
@@ -503,7 +593,7 @@ def _UC0(X, Y, D, Z, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
     POT1, POT2, POT3, POT4 : float or torch.Tensor
         Strike-, dip-, tensile- and inflate-potency.
     C0, C1
-        Instance of classes `COMMON0` and `COMMON1`.
+        Instances of `COMMON0` and `COMMON1`.
     compute_strain : bool
         Option to calculate the spatial derivative of the displacement.
         New in the PyTorch implementation.
@@ -520,8 +610,8 @@ def _UC0(X, Y, D, Z, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
 
     # Initialization
     N_variable = 12 if compute_strain else 3
-    U = [torch.zeros_like(X) for _ in range(N_variable)]
-    DU = [torch.zeros_like(X) for _ in range(N_variable)]
+    U = [None] * N_variable
+    DU = [None] * N_variable
 
 
     ALP4, ALP5, SD, CD, SDSD, SDCD, S2D, C2D = C0.ALP4, C0.ALP5, C0.SD, C0.CD, C0.SDSD, C0.SDCD, C0.S2D, C0.C2D
@@ -546,7 +636,7 @@ def _UC0(X, Y, D, Z, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
 
 
     # STRIKE-SLIP CONTRIBUTION
-    if (POT1 != 0.0):
+    if _nonzero(POT1):
         DU[ 0] = -ALP4 * A3 / R3 * CD + ALP5 * C * QR * A5
         DU[ 1] = 3.0 * X / R5 * ( ALP4 * Y * CD + ALP5 * C * (SD - Y * QR5))
         DU[ 2] = 3.0 * X / R5 * (-ALP4 * Y * SD + ALP5 * C * (CD + D * QR5))
@@ -562,12 +652,11 @@ def _UC0(X, Y, D, Z, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
             DU[10] = 15.0 * X / R7 * ( ALP4 * Y * D * CD  + ALP5 * C * (D * B7 * SD - Y * C7 * CD))
             DU[11] = 15.0 * X / R7 * (-ALP4 * Y * D * SD  + ALP5 * C * (2.0* D * CD - Q * C7))
 
-        for I in range(N_variable):
-            U[I] = U[I] + POT1 / PI2 * DU[I]
+        _accumulate(U, DU, POT1 / PI2)
 
 
     # DIP-SLIP CONTRIBUTION
-    if (POT2 != 0.0):
+    if _nonzero(POT2):
         DU[ 0] =  ALP4 * 3.0 * X * T / R5              - ALP5 * C * P * QRX
         DU[ 1] = -ALP4 / R3 * (C2D - 3.0 * Y * T / R2) + ALP5 * 3.0 * C / R5 * (S - Y * P * QR5)
         DU[ 2] = -ALP4 * A3 / R3 * SDCD                + ALP5 * 3.0 * C / R5 * (T + D * P * QR5)
@@ -583,12 +672,11 @@ def _UC0(X, Y, D, Z, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
             DU[10] = 3.0 / R5 *     (-ALP4 * (D * B5 * C2D + Y * C5 * S2D) - ALP5 * C * ((3.0 + A5) * C2D + Y * P * DR5 * QR7))
             DU[11] = 3.0 / R5 *     (-ALP4 * D * A5 * SDCD                 - ALP5 * C * (S2D - 10.0 * D * T / R2 + P * QR5 * C7))
 
-        for I in range(N_variable):
-            U[I] = U[I] + POT2 / PI2 * DU[I]
+        _accumulate(U, DU, POT2 / PI2)
 
 
     # TENSILE-FAULT CONTRIBUTION
-    if (POT3 != 0.0):
+    if _nonzero(POT3):
         DU[ 0] = 3.0 * X / R5 * (-ALP4 * S + ALP5 * (C * Q * QR5 - Z))
         DU[ 1] =  ALP4 / R3 * (S2D - 3.0 * Y * S / R2) + ALP5 * 3.0 / R5 * (C * (T - Y + Y * Q * QR5) - Y * Z)
         DU[ 2] = -ALP4 / R3 * (1.0 - A3 * SDSD)        - ALP5 * 3.0 / R5 * (C * (S - D + D * Q * QR5) - D * Z)
@@ -604,12 +692,11 @@ def _UC0(X, Y, D, Z, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
             DU[10] = 3.0 / R5 *     ( ALP4 * (D * B5 * S2D - Y* C5 * C2D) + ALP5 * (C * ((3.0 + A5) * S2D - Y * DR5 * D7) - Y * (1.0 + Z * DR5)))
             DU[11] = 3.0 / R5 *     (-ALP4 * D * (1.0 - A5 * SDSD)        - ALP5 * (C * (C2D + 10.0 * D * (S - D) / R2 - Q * QR5 * C7) + Z * (1.0 + C5)))
 
-        for I in range(N_variable):
-            U[I] = U[I] + POT3 / PI2 * DU[I]
+        _accumulate(U, DU, POT3 / PI2)
 
 
     # INFLATE SOURCE CONTRIBUTION
-    if (POT4 != 0.0):
+    if _nonzero(POT4):
         DU[ 0] = ALP4 * 3.0 * X * D / R5
         DU[ 1] = ALP4 * 3.0 * Y * D / R5
         DU[ 2] = ALP4 * C3 / R3
@@ -625,17 +712,17 @@ def _UC0(X, Y, D, Z, POT1, POT2, POT3, POT4, C0, C1, compute_strain):
             DU[10] = DU[8]
             DU[11] =  ALP4 * 3.0 * D / R5 * (2.0 + C5)
     
-        for I in range(N_variable):
-            U[I] = U[I] + POT4 / PI2 * DU[I]
+        _accumulate(U, DU, POT4 / PI2)
 
 
-    return U
+    return _filled(U, X)
 
 
 
 
 
 
+@profiled("_UA")
 def _UA(XI, ET, Q, DISL1, DISL2, DISL3, C0, C2, compute_strain):
     """
     Displacement and strain at depth (Part-A) 
@@ -648,7 +735,7 @@ def _UA(XI, ET, Q, DISL1, DISL2, DISL3, C0, C2, compute_strain):
     DISL1, DISL2, DISL3 : float or torch.Tensor
         Strike-, dip-, tensile-dislocations.
     C0, C2
-        Instance of classes `COMMON0` and `COMMON2`.
+        Instances of `COMMON0` and `COMMON2`.
     compute_strain : bool
         Option to calculate the spatial derivative of the displacement.
         New in the PyTorch implementation.
@@ -665,8 +752,8 @@ def _UA(XI, ET, Q, DISL1, DISL2, DISL3, C0, C2, compute_strain):
 
     # Initialization
     N_variable = 12 if compute_strain else 3
-    U = [torch.zeros_like(XI) for _ in range(N_variable)]
-    DU = [torch.zeros_like(XI) for _ in range(N_variable)]
+    U = [None] * N_variable
+    DU = [None] * N_variable
 
     ALP1, ALP2 = C0.ALP1, C0.ALP2
     R, TT, ALX, ALE, X11, Y11 = C2.R, C2.TT, C2.ALX, C2.ALE, C2.X11, C2.Y11
@@ -682,7 +769,7 @@ def _UA(XI, ET, Q, DISL1, DISL2, DISL3, C0, C2, compute_strain):
 
 
     # STRIKE-SLIP CONTRIBUTION
-    if (DISL1 != 0.0):
+    if _nonzero(DISL1):
         DU[ 0] = TT / 2.0   + ALP2 * XI * QY
         DU[ 1] =              ALP2 * Q / R
         DU[ 2] = ALP1 * ALE - ALP2 * Q * QY
@@ -698,12 +785,11 @@ def _UA(XI, ET, Q, DISL1, DISL2, DISL3, C0, C2, compute_strain):
             DU[10] =                              ALP2 * EZ
             DU[11] = -ALP1 * (SD / R - QY * CD) - ALP2 * Q * FZ
 
-        for I in range(N_variable):
-            U[I] = U[I] + DISL1 / PI2 * DU[I]
+        _accumulate(U, DU, DISL1 / PI2)
     
 
     # DIP-SLIP CONTRIBUTION
-    if (DISL2 != 0.0):
+    if _nonzero(DISL2):
         DU[ 0] =              ALP2 * Q / R
         DU[ 1] = TT / 2.0   + ALP2 * ET * QX
         DU[ 2] = ALP1 * ALX - ALP2 * Q * QX
@@ -719,12 +805,11 @@ def _UA(XI, ET, Q, DISL1, DISL2, DISL3, C0, C2, compute_strain):
             DU[10] =  ALP1 * Y * X11 + XY / 2.0 * CD + ALP2 * ET * GZ
             DU[11] = -ALP1 * D * X11                 - ALP2 * Q * GZ
 
-        for I in range(N_variable):
-            U[I] = U[I] + DISL2 / PI2 * DU[I]
+        _accumulate(U, DU, DISL2 / PI2)
 
     
     # TENSILE-FAULT CONTRIBUTION
-    if (DISL3 != 0.0):
+    if _nonzero(DISL3):
         DU[ 0] = -ALP1 * ALE - ALP2 * Q * QY
         DU[ 1] = -ALP1 * ALX - ALP2 * Q * QX
         DU[ 2] =  TT / 2.0   - ALP2 * (ET * QX + XI * QY)
@@ -740,14 +825,14 @@ def _UA(XI, ET, Q, DISL1, DISL2, DISL3, C0, C2, compute_strain):
             DU[10] =  ALP1 * D * X11             - ALP2 * Q * GZ
             DU[11] =  ALP1 * (Y * X11 + XY * CD) + ALP2 * Q * HZ
 
-        for I in range(N_variable):
-            U[I] = U[I] + DISL3 / PI2 * DU[I]
+        _accumulate(U, DU, DISL3 / PI2)
 
 
-    return U
+    return _filled(U, XI)
 
 
 
+@profiled("_UB")
 def _UB(XI, ET, Q, DISL1, DISL2, DISL3, C0, C2, compute_strain):
     """
     Displacement and strain at depth (Part-B) 
@@ -760,7 +845,7 @@ def _UB(XI, ET, Q, DISL1, DISL2, DISL3, C0, C2, compute_strain):
     DISL1, DISL2, DISL3 : float or torch.Tensor
         Strike-, dip-, tensile-dislocations.
     C0, C2
-        Instance of classes `COMMON0` and `COMMON2`.
+        Instances of `COMMON0` and `COMMON2`.
     compute_strain : bool
         Option to calculate the spatial derivative of the displacement.
         New in the PyTorch implementation.
@@ -777,30 +862,35 @@ def _UB(XI, ET, Q, DISL1, DISL2, DISL3, C0, C2, compute_strain):
 
     # Initialization
     N_variable = 12 if compute_strain else 3
-    U = [torch.zeros_like(XI) for _ in range(N_variable)]
-    DU = [torch.zeros_like(XI) for _ in range(N_variable)]
+    U = [None] * N_variable
+    DU = [None] * N_variable
 
-    ALP3, SD, CD, SDSD, CDCD, SDCD = C0.ALP3, C0.SD, C0.CD, C0.SDSD, C0.CDCD, C0.SDCD
+    ALP3, SD, CD, SDSD, SDCD = C0.ALP3, C0.SD, C0.CD, C0.SDSD, C0.SDCD
     XI2, Q2, R, Y, D, TT = C2.XI2, C2.Q2, C2.R, C2.Y, C2.D, C2.TT
     ALE, X11, Y11 = C2.ALE, C2.X11, C2.Y11
         
-    RD = R + D
+    RD = _r_plus(R, D, XI2 + Y**2)
 
-    if (CD != 0.0):
-        X = torch.sqrt(XI2 + Q2)
-        AI4 = torch.where(
-            XI == 0.0,
-            0.0,
-            1.0 / CDCD * (XI / RD * SDCD + 2.0 * torch.atan(
-                (ET * (X + Q * CD) + X * (R + X) * SD) / (XI * (R + X) * CD) 
-            ))
-        )
-        AI3 = (Y * CD / RD - ALE + SD * torch.log(RD)) / CDCD
-    else:
-        RD2 = RD**2
-        AI3 = (ET / RD + Y * Q / RD2 - ALE) / 2.0
-        AI4 = XI * Y / RD2 / 2.0
+    # Both branches are evaluated and selected elementwise (see `_SRECTG`).
+    VERT = (CD == 0.0)
+    CDI = torch.where(VERT, 1.0, CD)
 
+    X = torch.sqrt(XI2 + Q2)
+    AI4I = torch.where(
+        XI == 0.0,
+        0.0,
+        1.0 / CDI**2 * (XI / RD * SDCD + 2.0 * torch.atan(
+            (ET * (X + Q * CDI) + X * (R + X) * SD) / (XI * (R + X) * CDI) 
+        ))
+    )
+    AI3I = (Y * CDI / RD - ALE + SD * torch.log(RD)) / CDI**2
+
+    RD2 = RD**2
+    AI3V = (ET / RD + Y * Q / RD2 - ALE) / 2.0
+    AI4V = XI * Y / RD2 / 2.0
+
+    AI3 = torch.where(VERT, AI3V, AI3I)
+    AI4 = torch.where(VERT, AI4V, AI4I)
     AI1 = -XI / RD * CD - AI4 * SD 
     AI2 = torch.log(RD) + AI3 * SD 
     QX = Q * X11
@@ -815,16 +905,20 @@ def _UB(XI, ET, Q, DISL1, DISL2, DISL3, C0, C2, compute_strain):
         AJ2 = XI * Y / RD * D11
         AJ5 = -(D + Y**2 / RD) * D11
 
-        if (CD != 0.0):
-            AK1 = XI * (D11 - Y11 * SD) / CD
-            AK3 = (Q * Y11 - Y * D11) / CD
-            AJ3 = (AK1 - AJ2 * SD) / CD
-            AJ6 = (AK3 - AJ5 * SD) / CD
-        else:
-            AK1 = XI * Q / RD * D11
-            AK3 = SD / RD * (XI2 * D11 - 1.0)
-            AJ3 = -XI / RD2 * (Q2 * D11 - 0.5)
-            AJ6 = - Y / RD2 * (XI2 * D11 - 0.5)
+        AK1I = XI * (D11 - Y11 * SD) / CDI
+        AK3I = (Q * Y11 - Y * D11) / CDI
+        AJ3I = (AK1I - AJ2 * SD) / CDI
+        AJ6I = (AK3I - AJ5 * SD) / CDI
+
+        AK1V = XI * Q / RD * D11
+        AK3V = SD / RD * (XI2 * D11 - 1.0)
+        AJ3V = -XI / RD2 * (Q2 * D11 - 0.5)
+        AJ6V = - Y / RD2 * (XI2 * D11 - 0.5)
+
+        AK1 = torch.where(VERT, AK1V, AK1I)
+        AK3 = torch.where(VERT, AK3V, AK3I)
+        AJ3 = torch.where(VERT, AJ3V, AJ3I)
+        AJ6 = torch.where(VERT, AJ6V, AJ6I)
 
         XY = XI * Y11
         AK2 = 1.0 / R + AK3 * SD
@@ -835,7 +929,7 @@ def _UB(XI, ET, Q, DISL1, DISL2, DISL3, C0, C2, compute_strain):
 
 
     # STRIKE-SLIP CONTRIBUTION
-    if (DISL1 != 0.0):
+    if _nonzero(DISL1):
         DU[ 0] = -XI * QY - TT - ALP3 * AI1 * SD
         DU[ 1] = -Q / R        + ALP3 * Y / RD * SD
         DU[ 2] =  Q * QY       - ALP3 * AI2 * SD
@@ -851,12 +945,11 @@ def _UB(XI, ET, Q, DISL1, DISL2, DISL3, C0, C2, compute_strain):
             DU[10] = -EZ                + ALP3 * Y * D11 * SD
             DU[11] =  Q*FZ              + ALP3 * AK2 * SD
 
-        for I in range(N_variable):
-            U[I] = U[I] + DISL1 / PI2 * DU[I]
+        _accumulate(U, DU, DISL1 / PI2)
 
 
     # DIP-SLIP CONTRIBUTION
-    if (DISL2 != 0.0):
+    if _nonzero(DISL2):
         DU[ 0] = -Q / R        + ALP3 * AI3 * SDCD
         DU[ 1] = -ET * QX - TT - ALP3 * XI / RD * SDCD
         DU[ 2] =  Q * QX       + ALP3 * AI4 * SDCD
@@ -872,12 +965,11 @@ def _UB(XI, ET, Q, DISL1, DISL2, DISL3, C0, C2, compute_strain):
             DU[10] = -ET * GZ - XY * CD - ALP3 * XI * D11 * SDCD
             DU[11] =  Q * GZ            - ALP3 * AK4 * SDCD
 
-        for I in range(N_variable):
-            U[I] = U[I] + DISL2 / PI2 * DU[I]
+        _accumulate(U, DU, DISL2 / PI2)
 
 
     # TENSILE-FAULT CONTRIBUTION
-    if (DISL3 != 0.0):
+    if _nonzero(DISL3):
         DU[ 0] = Q * QY                 - ALP3 * AI3 * SDSD
         DU[ 1] = Q * QX                 + ALP3 * XI / RD * SDSD
         DU[ 2] = ET * QX + XI * QY - TT - ALP3 * AI4 * SDSD
@@ -893,14 +985,14 @@ def _UB(XI, ET, Q, DISL1, DISL2, DISL3, C0, C2, compute_strain):
             DU[10] =  Q * GZ        + ALP3 * XI * D11 * SDSD
             DU[11] = -Q * HZ        + ALP3 * AK4 * SDSD
 
-        for I in range(N_variable):
-            U[I] = U[I] + DISL3 / PI2 * DU[I]
+        _accumulate(U, DU, DISL3 / PI2)
 
 
-    return U
+    return _filled(U, XI)
 
 
 
+@profiled("_UC")
 def _UC(XI, ET, Q, Z, DISL1, DISL2, DISL3, C0, C2, compute_strain):
     """
     Displacement and strain at depth (Part-C) 
@@ -913,7 +1005,7 @@ def _UC(XI, ET, Q, Z, DISL1, DISL2, DISL3, C0, C2, compute_strain):
     DISL1, DISL2, DISL3 : float or torch.Tensor
         Strike-, dip-, tensile-dislocations.
     C0, C2
-        Instance of classes `COMMON0` and `COMMON2`.
+        Instances of `COMMON0` and `COMMON2`.
     compute_strain : bool
         Option to calculate the spatial derivative of the displacement.
         New in the PyTorch implementation.
@@ -930,8 +1022,8 @@ def _UC(XI, ET, Q, Z, DISL1, DISL2, DISL3, C0, C2, compute_strain):
 
     # Initialization
     N_variable = 12 if compute_strain else 3
-    U = [torch.zeros_like(XI) for _ in range(N_variable)]
-    DU = [torch.zeros_like(XI) for _ in range(N_variable)]
+    U = [None] * N_variable
+    DU = [None] * N_variable
 
     ALP4, ALP5, SD, CD  = C0.ALP4, C0.ALP5, C0.SD, C0.CD, 
     XI2, Q2, R, R3, Y, D = C2.XI2, C2.Q2, C2.R, C2.R3, C2.Y, C2.D
@@ -964,7 +1056,7 @@ def _UC(XI, ET, Q, Z, DISL1, DISL2, DISL3, C0, C2, compute_strain):
 
 
     # STRIKE-SLIP CONTRIBUTION
-    if (DISL1 != 0.0):
+    if _nonzero(DISL1):
         DU[ 0] = ALP4 * XY * CD                  - ALP5 * XI * Q * Z32
         DU[ 1] = ALP4 * (CD / R + 2.0 * QY * SD) - ALP5 * C * Q / R3
         DU[ 2] = ALP4 * QY * CD                  - ALP5 * (C * ET / R3 - Z * Y11 + XI2 * Z32)
@@ -980,12 +1072,11 @@ def _UC(XI, ET, Q, Z, DISL1, DISL2, DISL3, C0, C2, compute_strain):
             DU[10] =  ALP4 * 2.0 * (Y / R3 - Y0 * CD) * SD + D / R3 * CD - ALP5 * (CDR * CD + C * D * QR)
             DU[11] =  YY0 * CD                                           - ALP5 * (CDR * SD - C * Y * QR - Y0 * SDSD + Q * Z0 * CD)
 
-        for I in range(N_variable):
-            U[I] = U[I] + DISL1 / PI2 * DU[I]
+        _accumulate(U, DU, DISL1 / PI2)
 
 
     # DIP-SLIP CONTRIBUTION
-    if (DISL2 != 0.0):
+    if _nonzero(DISL2):
         DU[ 0] =  ALP4 * CD / R - QY * SD - ALP5 * C * Q / R3
         DU[ 1] =  ALP4 * Y * X11          - ALP5 * C * ET * Q * X32
         DU[ 2] = -D * X11 - XY * SD       - ALP5 * C * (X11 - Q2 * X32)
@@ -1001,12 +1092,11 @@ def _UC(XI, ET, Q, Z, DISL1, DISL2, DISL3, C0, C2, compute_strain):
             DU[10] =  ALP4 * Y * D * X32               - ALP5 * C * ((Y - 2.0 * Q * SD) * X32 + D * ET * Q * X53)
             DU[11] = -XI * PPZ * SD + X11 - D**2 * X32 - ALP5 * C * ((D - 2.0 * Q * CD) * X32 - D * Q2 * X53)
 
-        for I in range(N_variable):
-            U[I] = U[I] + DISL2 / PI2 * DU[I]
+        _accumulate(U, DU, DISL2 / PI2)
 
 
     # TENSILE-FAULT CONTRIBUTION
-    if (DISL3 != 0.0):
+    if _nonzero(DISL3):
         DU[ 0] = -ALP4 * (SD / R + QY * CD)      - ALP5 * (Z * Y11 - Q2 * Z32)
         DU[ 1] =  ALP4 * 2.0 * XY * SD + D * X11 - ALP5 * C * (X11 - Q2 * X32)
         DU[ 2] =  ALP4 * (Y * X11 + XY * CD)     + ALP5 * Q * (C * ET * X32 + XI * Z32)
@@ -1022,323 +1112,375 @@ def _UC(XI, ET, Q, Z, DISL1, DISL2, DISL3, C0, C2, compute_strain):
             DU[10] =  ALP4 * 2.0 * XI * PPZ * SD - X11 + D**2 * X32 - ALP5 *  C * ((D - 2.0 * Q * CD) * X32 - D * Q2 * X53)
             DU[11] =  ALP4 * (XI * PPZ * CD + Y * D * X32)          + ALP5 * (C * ((Y - 2.0 * Q * SD) * X32 + D * ET * Q * X53) + XI * QQZ)
 
-        for I in range(N_variable):
-            U[I] = U[I] + DISL3 / PI2 * DU[I]
+        _accumulate(U, DU, DISL3 / PI2)
 
 
-    return U
+    return _filled(U, XI)
 
 
 
 
 
-class COMMON0:
+class COMMON0(NamedTuple):
     """
-    Class to hold medium constants and fault-dip constants.
+    Medium constants and fault-dip constants.
     In the original FORTRAN code, this was written using the COMMON statement.
+    In the PyTorch implementation, this is an immutable NamedTuple returned by `DCCON0`.
+    """
+    ALP1: torch.Tensor
+    ALP2: torch.Tensor
+    ALP3: torch.Tensor
+    ALP4: torch.Tensor
+    ALP5: torch.Tensor
+    SD: torch.Tensor
+    CD: torch.Tensor
+    SDSD: torch.Tensor
+    CDCD: torch.Tensor
+    SDCD: torch.Tensor
+    S2D: torch.Tensor
+    C2D: torch.Tensor
+
+
+
+@profiled("DCCON0")
+def DCCON0(ALPHA, DIP, is_degree):
     """
+    Calculate medium constants and fault-dip constants.
 
-    def __init__(self):
-        self.ALP1 = None
-        self.ALP2 = None
-        self.ALP3 = None
-        self.ALP4 = None
-        self.ALP5 = None
-        self.SD = None
-        self.CD = None
-        self.SDSD = None
-        self.CDCD = None
-        self.SDCD = None
-        self.S2D = None
-        self.C2D = None
-
-
-    def DCCON0(self, ALPHA, DIP, is_degree):
-        """
-        Calculate medium constants and fault-dip constants.
-
-        Parameters
-        ----------
-        ALPHA
-            Medium constant. (lambda+myu)/(lambda+2*myu)
-        DIP
-            Dip-angle. (degree)
-        is_degree : bool
-            Flag if `DIP` is in degree or not (= in radian). 
-
-        Caution
-        -------
-        If cos(dip) is sufficiently small, it is set to zero.
-        """
-
-        self.ALP1 = (1.0 - ALPHA) / 2.0
-        self.ALP2 = ALPHA / 2.0
-        self.ALP3 = (1.0 - ALPHA) / ALPHA
-        self.ALP4 = 1.0 - ALPHA
-        self.ALP5 = ALPHA
-
-        if is_degree:
-            SD = torch.sin(torch.deg2rad(DIP))
-            CD = torch.cos(torch.deg2rad(DIP))
-        else:
-            SD = torch.sin(DIP)
-            CD = torch.cos(DIP)
-
-        mask = (torch.abs(CD) < EPS)
-        self.SD = torch.where(
-            mask, 
-            torch.sign(SD), 
-            SD
-        )
-        self.CD = torch.where(
-            mask, 
-            0.0, 
-            CD
-        )
+    Parameters
+    ----------
+    ALPHA
+        Medium constant. (lambda+myu)/(lambda+2*myu)
+    DIP
+        Dip-angle. (degree)
+    is_degree : bool
+        Flag if `DIP` is in degree or not (= in radian). 
+
+    Returns
+    -------
+    COMMON0
 
-        self.SDSD = self.SD**2
-        self.CDCD = self.CD**2
-        self.SDCD = self.SD * self.CD
-        self.S2D = 2.0 * self.SDCD
-        self.C2D = self.CDCD - self.SDSD
+    Caution
+    -------
+    If cos(dip) is sufficiently small, it is set to zero.
+    """
+
+    if is_degree:
+        SD = torch.sin(torch.deg2rad(DIP))
+        CD = torch.cos(torch.deg2rad(DIP))
+    else:
+        SD = torch.sin(DIP)
+        CD = torch.cos(DIP)
+
+    mask = (torch.abs(CD) < _eps(CD))
+    SD = torch.where(
+        mask, 
+        torch.sign(SD), 
+        SD
+    )
+    CD = torch.where(
+        mask, 
+        0.0, 
+        CD
+    )
+
+    SDSD = SD**2
+    CDCD = CD**2
+    SDCD = SD * CD
+
+    return COMMON0(
+        ALP1=(1.0 - ALPHA) / 2.0,
+        ALP2=ALPHA / 2.0,
+        ALP3=(1.0 - ALPHA) / ALPHA,
+        ALP4=1.0 - ALPHA,
+        ALP5=ALPHA,
+        SD=SD,
+        CD=CD,
+        SDSD=SDSD,
+        CDCD=CDCD,
+        SDCD=SDCD,
+        S2D=2.0 * SDCD,
+        C2D=CDCD - SDSD,
+    )
 
 
 
-class COMMON1:
+class COMMON1(NamedTuple):
     """
-    Class to hold staiton geometry constants for point source.
+    Staiton geometry constants for point source.
     In the original FORTRAN code, this was written using the COMMON statement.
+    In the PyTorch implementation, this is an immutable NamedTuple returned by `DCCON1`.
     """
+    P: torch.Tensor
+    Q: torch.Tensor
+    S: torch.Tensor
+    T: torch.Tensor
+    XY: torch.Tensor
+    X2: torch.Tensor
+    Y2: torch.Tensor
+    D2: torch.Tensor
+    R: torch.Tensor
+    R2: torch.Tensor
+    R3: torch.Tensor
+    R5: torch.Tensor
+    R7: torch.Tensor
+    QR: torch.Tensor
+    QRX: torch.Tensor
+    A3: torch.Tensor
+    A5: torch.Tensor
+    B3: torch.Tensor
+    C3: torch.Tensor
+    UY: torch.Tensor
+    VY: torch.Tensor
+    WY: torch.Tensor
+    UZ: torch.Tensor
+    VZ: torch.Tensor
+    WZ: torch.Tensor
+
+
+
+@profiled("DCCON1")
+def DCCON1(X, Y, D, C0):
+    """
+    Calculate staiton geometry constants for point source.
 
-    def __init__(self):
-        self.P = None
-        self.Q = None
-        self.S = None
-        self.T = None
-        self.XY = None
-        self.X2 = None
-        self.Y2 = None
-        self.D2 = None
-        self.R = None
-        self.R2 = None
-        self.R3 = None
-        self.R5 = None
-        self.R7 = None
-        self.QR = None
-        self.QRX = None
-        self.A3 = None
-        self.A5 = None
-        self.B3 = None
-        self.C3 = None
-        self.UY = None
-        self.VY = None
-        self.WY = None
-        self.UZ = None
-        self.VZ = None
-        self.WZ = None
-
-    
-    def DCCON1(self, X, Y, D, C0):
-        """
-        Calculate staiton geometry constants for point source.
-
-        Parameters
-        ----------
-        X, Y, D
-            Station coordinates in fault system
-        C0
-            Instance of classes `COMMON0`.
-
-        Caution
-        -------
-        If X,Y,D are sufficiently small, they are set to zero.
-        """
-
-        SD, CD = C0.SD, C0.CD 
-
-        X = torch.where(
-            torch.abs(X) < EPS,
-            0.0,
-            X
-        )
-        Y = torch.where(
-            torch.abs(Y) < EPS,
-            0.0,
-            Y
-        )
-        D = torch.where(
-            torch.abs(D) < EPS,
-            0.0,
-            D
-        )
+    Parameters
+    ----------
+    X, Y, D
+        Station coordinates in fault system
+    C0
+        Instance of `COMMON0`.
 
-        self.P = Y * CD + D * SD
-        self.Q = Y * SD - D * CD
-        self.S = self.P * SD + self.Q * CD
-        self.T = self.P * CD - self.Q * SD
-        self.XY = X * Y
-        self.X2 = X**2
-        self.Y2 = Y**2
-        self.D2 = D**2
-        self.R2 = self.X2 + self.Y2 + self.D2
-        self.R = torch.sqrt(self.R2)
-        
-        # if (self.R == 0.0).any():
-        #     raise ValueError("R contains zero(s), which is not allowed.")
-        
-        self.R3 = self.R**3
-        self.R5 = self.R**5
-        self.R7 = self.R**7
+    Returns
+    -------
+    COMMON1
 
-        self.A3 = 1.0 - 3.0 * self.X2 / self.R2
-        self.A5 = 1.0 - 5.0 * self.X2 / self.R2
-        self.B3 = 1.0 - 3.0 * self.Y2 / self.R2
-        self.C3 = 1.0 - 3.0 * self.D2 / self.R2
+    Caution
+    -------
+    If X,Y,D are sufficiently small, they are set to zero.
+    """
 
-        self.QR = 3.0 * self.Q / self.R5
-        self.QRX = 5.0 * self.QR * X / self.R2
+    SD, CD = C0.SD, C0.CD 
 
-        self.UY = SD - 5.0 * Y * self.Q / self.R2
-        self.UZ = CD + 5.0 * D * self.Q / self.R2
-        self.VY = self.S - 5.0 * Y * self.P * self.Q / self.R2
-        self.VZ = self.T + 5.0 * D * self.P * self.Q / self.R2
-        self.WY = self.UY + SD
-        self.WZ = self.UZ + CD
+    X = torch.where(
+        torch.abs(X) < _eps(X),
+        0.0,
+        X
+    )
+    Y = torch.where(
+        torch.abs(Y) < _eps(Y),
+        0.0,
+        Y
+    )
+    D = torch.where(
+        torch.abs(D) < _eps(D),
+        0.0,
+        D
+    )
 
+    P = Y * CD + D * SD
+    Q = Y * SD - D * CD
+    S = P * SD + Q * CD
+    T = P * CD - Q * SD
+    X2 = X**2
+    Y2 = Y**2
+    D2 = D**2
+    R2 = X2 + Y2 + D2
+    R = torch.sqrt(R2)
+    
+    # if (R == 0.0).any():
+    #     raise ValueError("R contains zero(s), which is not allowed.")
+    
+    R3 = R**3
+    R5 = R3 * R2
+
+    QR = 3.0 * Q / R5
+    UY = SD - 5.0 * Y * Q / R2
+    UZ = CD + 5.0 * D * Q / R2
+
+    return COMMON1(
+        P=P,
+        Q=Q,
+        S=S,
+        T=T,
+        XY=X * Y,
+        X2=X2,
+        Y2=Y2,
+        D2=D2,
+        R=R,
+        R2=R2,
+        R3=R3,
+        R5=R5,
+        R7=R5 * R2,
+        QR=QR,
+        QRX=5.0 * QR * X / R2,
+        A3=1.0 - 3.0 * X2 / R2,
+        A5=1.0 - 5.0 * X2 / R2,
+        B3=1.0 - 3.0 * Y2 / R2,
+        C3=1.0 - 3.0 * D2 / R2,
+        UY=UY,
+        VY=S - 5.0 * Y * P * Q / R2,
+        WY=UY + SD,
+        UZ=UZ,
+        VZ=T + 5.0 * D * P * Q / R2,
+        WZ=UZ + CD,
+    )
 
 
 
-class COMMON2:
+class COMMON2(NamedTuple):
     """
-    Class to hold staiton geometry constants for finite source.
+    Staiton geometry constants for finite source.
     In the original FORTRAN code, this was written using the COMMON statement.
+    In the PyTorch implementation, this is an immutable NamedTuple returned by `DCCON2`.
     """
+    XI2: torch.Tensor
+    ET2: torch.Tensor
+    Q2: torch.Tensor
+    R: torch.Tensor
+    R2: torch.Tensor
+    R3: torch.Tensor
+    R5: torch.Tensor
+    Y: torch.Tensor
+    D: torch.Tensor
+    TT: torch.Tensor
+    ALX: torch.Tensor
+    ALE: torch.Tensor
+    X11: torch.Tensor
+    Y11: torch.Tensor
+    X32: torch.Tensor
+    Y32: torch.Tensor
+    EY: torch.Tensor
+    EZ: torch.Tensor
+    FY: torch.Tensor
+    FZ: torch.Tensor
+    GY: torch.Tensor
+    GZ: torch.Tensor
+    HY: torch.Tensor
+    HZ: torch.Tensor
+
+
+
+@profiled("DCCON2")
+def DCCON2(XI, ET, Q, SD, CD, KXI, KET):
+    """
+    Calculate staiton geometry constants for finite source.
 
-    def __init__(self):
-        self.XI2 = None
-        self.ET2 = None
-        self.Q2 = None
-        self.R = None
-        self.R2 = None
-        self.R3 = None
-        self.R5 = None
-        self.Y = None
-        self.D = None
-        self.TT = None
-        self.ALX = None
-        self.ALE = None
-        self.X11 = None
-        self.Y11 = None
-        self.X32 = None
-        self.Y32 = None
-        self.EY = None
-        self.EZ = None
-        self.FY = None
-        self.FZ = None
-        self.GY = None
-        self.GZ = None
-        self.HY = None
-        self.HZ = None
-
-
-    def DCCON2(self, XI, ET, Q, SD, CD, KXI, KET):
-        """
-        Calculate staiton geometry constants for finite source.
-
-        Parameters
-        ----------
-        XI, ET, Q
-            Station coordinates in fault system
-        SD, CD
-            sin, cos of dip-angle
-        KXI, KET
-            KXI=1, KET=1 means R+XI<EPS, R+ET<EPS, respectively.
-
-        Caution
-        -------
-        If XI,ET,Q are sufficiently small, they are set to zero.
-        """
-
-
-        XI = torch.where(
-            torch.abs(XI) < EPS,
-            0.0,
-            XI
-        )
-        ET = torch.where(
-            torch.abs(ET) < EPS,
-            0.0,
-            ET
-        )
-        Q = torch.where(
-            torch.abs(Q) < EPS,
-            0.0,
-            Q
-        )
-        
+    Parameters
+    ----------
+    XI, ET, Q
+        Station coordinates in fault system
+    SD, CD
+        sin, cos of dip-angle
+    KXI, KET
+        KXI=1, KET=1 means R+XI<EPS, R+ET<EPS, respectively.
 
-        self.XI2 = XI**2
-        self.ET2 = ET**2
-        self.Q2 = Q**2
-        self.R2 = self.XI2 + self.ET2 + self.Q2
-        self.R = torch.sqrt(self.R2)
-        # if (self.R == 0.0).any():
-        #     raise ValueError("R contains zero(s), which is not allowed.")
-        
-        self.R3 = self.R**3
-        self.R5 = self.R**5
-        self.Y = ET * CD + Q * SD
-        self.D = ET * SD - Q * CD
-
-        self.TT = torch.where(
-            Q == 0.0, 
-            0.0,
-            torch.atan(XI * ET / (Q * self.R)), 
-        )
+    Returns
+    -------
+    COMMON2
 
+    Caution
+    -------
+    If XI,ET,Q are sufficiently small, they are set to zero.
+    """
 
-        RXI = self.R + XI
-        self.ALX = torch.where(
-            KXI == 1,
-            -torch.log(self.R - XI),
-            torch.log(RXI)
-        )
-        self.X11 = torch.where(
-            KXI == 1,
-            0.0,
-            1.0 / (self.R * RXI)
-        )
-        self.X32 = torch.where(
-            KXI == 1,
-            0.0,
-            (self.R + RXI) * self.X11**2 / self.R
-        )
 
+    XI = torch.where(
+        torch.abs(XI) < _eps(XI),
+        0.0,
+        XI
+    )
+    ET = torch.where(
+        torch.abs(ET) < _eps(ET),
+        0.0,
+        ET
+    )
+    Q = torch.where(
+        torch.abs(Q) < _eps(Q),
+        0.0,
+        Q
+    )
+    
 
-        RET = self.R + ET
-        self.ALE = torch.where(
-            KET == 1,
-            -torch.log(self.R - ET),
-            torch.log(RET)
-        ) 
-        self.Y11 = torch.where(
-            KET == 1,
-            0.0,
-            1.0 / (self.R * RET)
-        )
-        self.Y32 = torch.where(
-            KET == 1,
-            0.0,
-            (self.R + RET) * self.Y11**2 / self.R
-        )
+    XI2 = XI**2
+    ET2 = ET**2
+    Q2 = Q**2
+    R2 = XI2 + ET2 + Q2
+    R = torch.sqrt(R2)
+    # if (R == 0.0).any():
+    #     raise ValueError("R contains zero(s), which is not allowed.")
+    
+    R3 = R**3
+    R5 = R3 * R2
+    Y = ET * CD + Q * SD
+    D = ET * SD - Q * CD
 
+    TT = torch.where(
+        Q == 0.0, 
+        0.0,
+        torch.atan(XI * ET / (Q * R)), 
+    )
+
+
+    RXI = _r_plus(R, XI, ET2 + Q2)
+    ALX = torch.where(
+        KXI == 1,
+        -torch.log(R - XI),
+        torch.log(RXI)
+    )
+    X11 = torch.where(
+        KXI == 1,
+        0.0,
+        1.0 / (R * RXI)
+    )
+    X32 = torch.where(
+        KXI == 1,
+        0.0,
+        (R + RXI) * X11**2 / R
+    )
 
-        self.EY = SD / self.R - self.Y * Q / self.R3
-        self.EZ = CD / self.R + self.D * Q / self.R3
-        self.FY = self.D / self.R3 + self.XI2 * self.Y32 * SD
-        self.FZ = self.Y / self.R3 + self.XI2 * self.Y32 * CD
-        self.GY = 2.0 * self.X11 * SD - self.Y * Q * self.X32
-        self.GZ = 2.0 * self.X11 * CD + self.D * Q * self.X32
-        self.HY = self.D * Q * self.X32 + XI * Q * self.Y32 * SD
-        self.HZ = self.Y * Q * self.X32 + XI * Q * self.Y32 * CD
 
+    RET = _r_plus(R, ET, XI2 + Q2)
+    ALE = torch.where(
+        KET == 1,
+        -torch.log(R - ET),
+        torch.log(RET)
+    ) 
+    Y11 = torch.where(
+        KET == 1,
+        0.0,
+        1.0 / (R * RET)
+    )
+    Y32 = torch.where(
+        KET == 1,
+        0.0,
+        (R + RET) * Y11**2 / R
+    )
+
+
+    return COMMON2(
+        XI2=XI2,
+        ET2=ET2,
+        Q2=Q2,
+        R=R,
+        R2=R2,
+        R3=R3,
+        R5=R5,
+        Y=Y,
+        D=D,
+        TT=TT,
+        ALX=ALX,
+        ALE=ALE,
+        X11=X11,
+        Y11=Y11,
+        X32=X32,
+        Y32=Y32,
+        EY=SD / R - Y * Q / R3,
+        EZ=CD / R + D * Q / R3,
+        FY=D / R3 + XI2 * Y32 * SD,
+        FZ=Y / R3 + XI2 * Y32 * CD,
+        GY=2.0 * X11 * SD - Y * Q * X32,
+        GZ=2.0 * X11 * CD + D * Q * X32,
+        HY=D * Q * X32 + XI * Q * Y32 * SD,
+        HZ=Y * Q * X32 + XI * Q * Y32 * CD,
+    )
@@ -0,0 +1,140 @@
+import os
+import json
+import hashlib
+import numpy as np
+import torch
+from .okadawrapper import OkadaWrapper
+
+
+
+
+def _fingerprint(x, y, z, params:dict, compute_strain:bool, is_degree:bool, fault_origin:str, nu:float):
+    """
+    SHA-256 of the grid, the source parameters and the flags of a volume run.
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps([bool(compute_strain), bool(is_degree), fault_origin, float(nu), sorted(params)]).encode())
+    for v in [x, y, z] + [params[k] for k in sorted(params)]:
+        a = np.ascontiguousarray(torch.as_tensor(v).detach().cpu().numpy(), dtype=np.float64)
+        h.update(str(a.shape).encode())
+        h.update(a.tobytes())
+    return h.hexdigest()
+
+
+
+
+def compute_volume(path:str, x, y, z, params:dict,
+                   compute_strain:bool=True, is_degree:bool=True, fault_origin:str="topleft", nu:float=0.25,
+                   tile:tuple=(1, 256, 256), dtype=np.float64, resume:bool=True, progress=None, okada=None):
+    """
+    Evaluate `DC3D` or `DC3D0` on a 3D grid tile by tile,
+    streaming the outputs into a memory-mapped `.npy` file.
+
+    The grid is split into tiles of (z, y, x) size `tile`.
+    Only one tile is held in memory at once, together with its temporaries.
+    Completed tiles are recorded in a sidecar file (`path + ".done.npy"`),
+    so that an interrupted run can be resumed. A fingerprint of the grid, the source parameters
+    and the flags is stored in `path + ".done.json"`, and a run is resumed only if it matches.
+
+    Parameters
+    ----------
+    path : str
+        Output file (`.npy`). The array has shape (n_out, nz, ny, nx),
+        where n_out is 12 if `compute_strain` is `True` and 3 otherwise,
+        and the components are ordered as the output of `OkadaWrapper.compute`.
+    x, y, z : torch.Tensor
+        1D coordinate axes of the grid. Values of z must be non-positive.
+    params : dict of torch.Tensor
+        Same as that of `OkadaWrapper.compute`.
+    compute_strain, is_degree, fault_origin, nu
+        Same as those of `OkadaWrapper.compute`.
+    tile : tuple of int, default (1, 256, 256)
+        Tile size in (z, y, x).
+    dtype : numpy dtype, default np.float64
+        Data type of the output file.
+    resume : bool, default True
+        If `True` and the output file exists, tiles already written are skipped.
+        A ValueError is raised if the existing file was computed for another grid, source or flags.
+        If `False`, the output file is overwritten.
+    progress : callable, default None
+        Called as `progress(n_done, n_total)` after each tile.
+    okada : OkadaWrapper, default None
+        Instance used for the forward computation. If None, a new one is created.
+
+    Returns
+    -------
+    numpy.memmap
+        Memory-mapped output array of shape (n_out, nz, ny, nx).
+    """
+
+    assert x.dim() == 1 and y.dim() == 1 and z.dim() == 1, "x, y and z must be 1D tensors."
+    assert (z <= 0.0).all(), "values of z must be non-positive."
+    assert len(tile) == 3, "'tile' must be a tuple of 3 ints."
+
+    if okada is None:
+        okada = OkadaWrapper()
+
+    n_out = 12 if compute_strain else 3
+    nz, ny, nx = len(z), len(y), len(x)
+    shape = (n_out, nz, ny, nx)
+    tz, ty, tx = tile
+    n_tiles = ((nz + tz - 1) // tz, (ny + ty - 1) // ty, (nx + tx - 1) // tx)
+    done_path = path + ".done.npy"
+    key_path = path + ".done.json"
+    key = _fingerprint(x, y, z, params, compute_strain, is_degree, fault_origin, nu)
+
+
+    # ---- 1. open (or create) the output and the progress record ----
+    if resume and os.path.exists(path) and os.path.exists(done_path):
+        out = np.lib.format.open_memmap(path, mode="r+")
+        done = np.lib.format.open_memmap(done_path, mode="r+")
+        if out.shape != shape or out.dtype != np.dtype(dtype) or done.shape != n_tiles:
+            raise ValueError(
+                f"existing file '{path}' does not match the requested grid; use resume=False to overwrite."
+            )
+        stored = None
+        if os.path.exists(key_path):
+            with open(key_path) as f:
+                stored = json.load(f).get("fingerprint")
+        if stored != key:
+            raise ValueError(
+                f"existing file '{path}' was computed for other parameters; use resume=False to overwrite."
+            )
+    else:
+        with open(key_path, "w") as f:
+            json.dump({"fingerprint": key}, f)
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+        done = np.lib.format.open_memmap(done_path, mode="w+", dtype=np.bool_, shape=n_tiles)
+        done[...] = False
+        done.flush()
+
+
+    # ---- 2. loop over tiles ----
+    n_total = done.size
+    n_done = int(done.sum())
+    with torch.no_grad():
+        for iz in range(n_tiles[0]):
+            for iy in range(n_tiles[1]):
+                for ix in range(n_tiles[2]):
+                    if done[iz, iy, ix]:
+                        continue
+                    sz = slice(iz * tz, min((iz + 1) * tz, nz))
+                    sy = slice(iy * ty, min((iy + 1) * ty, ny))
+                    sx = slice(ix * tx, min((ix + 1) * tx, nx))
+
+                    Z, Y, X = torch.meshgrid(z[sz], y[sy], x[sx], indexing="ij")
+                    buf = okada.workspace((n_out,) + X.shape, X.dtype, X.device)
+                    okada.compute(
+                        {"x": X, "y": Y, "z": Z}, params,
+                        compute_strain, is_degree, fault_origin, nu, out=buf
+                    )
+                    out[:, sz, sy, sx] = buf.cpu().numpy().astype(dtype, copy=False)
+                    out.flush()
+
+                    done[iz, iy, ix] = True
+                    done.flush()
+                    n_done += 1
+                    if progress is not None:
+                        progress(n_done, n_total)
+
+    return out
@@ -0,0 +1,52 @@
+"""
+Allocations, allocated bytes, peak memory and wall time of the kernels through `OkadaWrapper.compute`,
+as quoted in the commit that removed the dead zero buffers of the kernels.
+
+200,000 random stations, float64, CPU, strain on, inside `torch.no_grad()`.
+Memory is measured with `torch.profiler.profile(profile_memory=True)`; the peak is the running sum
+of the allocations and frees of one call. Wall time is the mean of 5 calls.
+
+To compare two versions, run it on a checkout of each, e.g.
+
+    git worktree add /tmp/before <commit>^
+    python benchmarks/allocations.py /tmp/before
+    python benchmarks/allocations.py .
+"""
+import sys
+import time
+import torch
+from torch.profiler import profile, ProfilerActivity
+
+sys.path.insert(0, sys.argv[1] if len(sys.argv) > 1 else ".")
+from OkadaTorch import OkadaWrapper
+
+torch.set_default_dtype(torch.float64)
+torch.manual_seed(0)
+
+n = 200000
+x, y, z = torch.rand(n) * 60 - 30, torch.rand(n) * 60 - 30, -torch.rand(n) * 10
+rectangle = {k: torch.tensor(v) for k, v in dict(x_fault=0.0, y_fault=0.0, depth=5.0, length=20.0, width=10.0,
+                                                 strike=30.0, dip=45.0, rake=60.0, slip=1.0).items()}
+point = {k: v for k, v in rectangle.items() if k not in ("length", "width")}
+
+okada = OkadaWrapper()
+cases = [("SRECTF", {"x": x, "y": y}, rectangle), ("DC3D", {"x": x, "y": y, "z": z}, rectangle),
+         ("SPOINT", {"x": x, "y": y}, point), ("DC3D0", {"x": x, "y": y, "z": z}, point)]
+with torch.no_grad():
+    for name, coords, params in cases:
+        okada.compute(coords, params)
+        with profile(activities=[ProfilerActivity.CPU], profile_memory=True) as prof:
+            okada.compute(coords, params)
+        events = sorted([e for e in prof.events() if e.cpu_memory_usage != 0], key=lambda e: e.time_range.start)
+        allocs = [e.cpu_memory_usage for e in events if e.cpu_memory_usage > 0]
+        current = peak = 0
+        for e in events:
+            current += e.cpu_memory_usage
+            peak = max(peak, current)
+
+        t = time.perf_counter()
+        for _ in range(5):
+            okada.compute(coords, params)
+        elapsed = (time.perf_counter() - t) / 5
+        print(f"{name:7s} allocs {len(allocs):6d}  bytes {sum(allocs) / 1e9:6.2f} GB  "
+              f"peak {peak / 1e6:7.1f} MB  time {elapsed:.3f} s")
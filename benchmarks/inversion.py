@@ -0,0 +1,49 @@
+"""
+Timings and convergence of `OkadaTorch.inversion` quoted in docs/Inversion.md.
+
+900 surface stations, 10 x 5 patches of 4 km x 4 km (dip 30°), strike- and dip-slip columns,
+float64 data with the Laplacian in the default dtype, CPU with 1 thread.
+
+    python benchmarks/inversion.py
+"""
+import math
+import time
+import torch
+from OkadaTorch.inversion import greens, laplacian, sweep, solve, lsqr, cg
+
+torch.set_num_threads(1)
+f64 = torch.float64
+
+x = torch.linspace(-40.0, 40.0, 30, dtype=f64)
+X, Y = torch.meshgrid(x, x, indexing="xy")
+coords = {"x": X, "y": Y}
+
+n_strike, n_dip, size, dip = 10, 5, 4.0, 30.0
+i_s, i_d = [v.flatten().to(f64) for v in torch.meshgrid(torch.arange(n_strike), torch.arange(n_dip), indexing="xy")]
+n = n_strike * n_dip
+patches = {
+    "x_fault": i_d * size * math.cos(math.radians(dip)), "y_fault": -20.0 + i_s * size,
+    "depth": 2.0 + i_d * size * math.sin(math.radians(dip)),
+    "length": torch.full((n,), size, dtype=f64), "width": torch.full((n,), size, dtype=f64),
+    "strike": torch.zeros(n, dtype=f64), "dip": torch.full((n,), dip, dtype=f64),
+}
+
+t = time.perf_counter()
+G = greens(coords, patches)
+print(f"greens: {time.perf_counter() - t:.3f} s, G {tuple(G.shape)}")
+
+s = torch.exp(-((i_s - 4.5)**2 / 8.0 + (i_d - 2.0)**2 / 2.0))
+d = G @ torch.cat([0.3 * s, s]) + 0.01 * torch.randn(G.shape[0], generator=torch.Generator().manual_seed(0), dtype=f64)
+L = laplacian(n_strike, n_dip, n_comp=2, spacing=(size, size))
+
+t = time.perf_counter()
+sw = sweep(G, d, L, torch.logspace(-2, 2, 30, dtype=f64))
+print(f"sweep over 30 values: {time.perf_counter() - t:.4f} s")
+
+lam = float(sw.lams[sw.best_abic])
+direct = solve(G, d, L, lam)
+for name, solver in [("lsqr", lsqr), ("cg", cg)]:
+    for tol in [1e-8, 1e-10, 1e-12]:
+        m, n_iter = solver(G, d, L, lam, tol=tol)
+        error = float(torch.linalg.norm(m - direct) / torch.linalg.norm(direct))
+        print(f"{name}: tol {tol:.0e}, {n_iter} iterations, relative difference from solve {error:.1e}")
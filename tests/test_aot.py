@@ -0,0 +1,13 @@
+import pytest
+import torch
+from OkadaTorch import OkadaWrapper
+
+
+def test_cache_not_used_by_default(tmp_path):
+    okada = OkadaWrapper(cache_dir=str(tmp_path))
+    assert okada.kernels is None
+
+
+def test_use_aot_requires_cache_dir():
+    with pytest.raises(ValueError):
+        OkadaWrapper(use_aot=True)
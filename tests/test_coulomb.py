@@ -0,0 +1,15 @@
+import torch
+from OkadaTorch.coulomb import coulomb
+
+
+PARAMS = dict(x_fault=0.0, y_fault=0.0, depth=5.0, length=10.0, width=5.0,
+              strike=30.0, dip=45.0, rake=90.0, slip=1.0)
+
+
+def test_optimal_with_zero_friction():
+    x = torch.linspace(-20.0, 20.0, 7, dtype=torch.float64)
+    coords = {"x": x, "y": 0.5 * x, "z": torch.full_like(x, -8.0)}
+    regional = torch.diag(torch.tensor([-1e6, 0.0, -2e6], dtype=torch.float64))
+    cfs, shear, normal = coulomb(coords, PARAMS, friction=0.0, optimal=True, regional_stress=regional)
+    assert torch.isfinite(cfs).all()
+    torch.testing.assert_close(cfs, shear)
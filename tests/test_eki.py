@@ -0,0 +1,31 @@
+import torch
+from OkadaTorch.eki import esmda, eki
+
+
+def _problem(n_members=20):
+    g = torch.Generator().manual_seed(0)
+    G = torch.randn(30, 2, generator=g, dtype=torch.float64)
+    d = G @ torch.tensor([1.0, -0.5], dtype=torch.float64)
+    calls = []
+    def forward(e):
+        calls.append(len(e))
+        return e @ G.T
+    prior = torch.randn(n_members, 2, generator=g, dtype=torch.float64)
+    return forward, prior, d, calls
+
+
+def test_one_sided_bounds():
+    forward, prior, d, _ = _problem()
+    lower = torch.tensor([0.0, -0.2], dtype=torch.float64)
+    res = esmda(forward, prior, d, lower=lower, generator=torch.Generator().manual_seed(1))
+    assert (res.ensemble >= lower).all()
+    res = eki(forward, prior, d, upper=[0.5, 0.0], n_iter=2, generator=torch.Generator().manual_seed(1))
+    assert (res.ensemble <= torch.tensor([0.5, 0.0], dtype=torch.float64)).all()
+
+
+def test_eki_forward_count():
+    forward, prior, d, calls = _problem()
+    res = eki(forward, prior, d, n_iter=3, generator=torch.Generator().manual_seed(1))
+    assert calls == [21, 21, 21, 1]
+    assert res.n_forward == sum(calls) == 3 * 21 + 1
+    assert len(res.misfit) == 4
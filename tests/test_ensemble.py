@@ -0,0 +1,31 @@
+import torch
+from OkadaTorch.ensemble import EnsembleAccumulator
+
+
+def _samples():
+    g = torch.Generator().manual_seed(0)
+    return torch.randn(4000, 3, 5, generator=g, dtype=torch.float64) * torch.arange(1.0, 6.0, dtype=torch.float64)
+
+
+def test_value_range_skips_warmup():
+    values = _samples()
+    acc = EnsembleAccumulator(n_bins=256, value_range=(-20.0, 20.0))
+    for chunk in values.split(100):
+        acc.update(chunk)
+        assert acc._buffer == []
+    assert acc.hist.dtype == torch.int32
+    stats = acc.result()
+    torch.testing.assert_close(stats.mean, values.mean(0))
+    torch.testing.assert_close(stats.std, values.std(0))
+    exact = torch.quantile(values, torch.tensor([0.05, 0.5, 0.95], dtype=torch.float64), dim=0)
+    assert (stats.quantiles - exact).abs().max() < 40.0 / 256
+
+
+def test_warmup_matches_value_range():
+    values = _samples()
+    a, b = EnsembleAccumulator(), EnsembleAccumulator(value_range=(-30.0, 30.0))
+    for chunk in values.split(500):
+        a.update(chunk)
+        b.update(chunk)
+    qa, qb = a.result().quantiles, b.result().quantiles
+    assert (qa - qb).abs().max() < 0.2
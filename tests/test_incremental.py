@@ -0,0 +1,36 @@
+import torch
+from OkadaTorch import OkadaWrapper
+
+
+PARAMS = dict(x_fault=0.0, y_fault=0.0, depth=5.0, length=10.0, width=5.0,
+              strike=30.0, dip=45.0, rake=90.0, slip=1.0)
+
+
+def _wrapper():
+    x = torch.linspace(-20.0, 20.0, 9, dtype=torch.float64)
+    okada = OkadaWrapper(incremental=True, dtype=torch.float64)
+    okada.bind({"x": x, "y": 0.5 * x, "z": torch.zeros_like(x)})
+    return okada
+
+
+def test_status_does_not_alias_cache():
+    okada = _wrapper()
+    okada.compute(params=PARAMS)
+    okada.compute(params={**PARAMS, "slip": 2.0})             # builds the Green's functions
+    _, status = okada.compute(params={**PARAMS, "slip": 3.0}, return_status=True)
+    status.iret[1] = 7
+    okada.remove_stations(torch.tensor([0]))
+    assert int(status.iret[1]) == 7
+    _, status = okada.compute(params={**PARAMS, "slip": 4.0}, return_status=True)
+    assert bool((status.iret != 7).all())
+
+
+def test_removed_stations_match_direct():
+    okada = _wrapper()
+    okada.compute(params=PARAMS)
+    okada.compute(params={**PARAMS, "slip": 2.0})
+    okada.remove_stations(torch.tensor([0, 4]))
+    out = okada.compute(params={**PARAMS, "rake": 60.0})
+    ref = OkadaWrapper(dtype=torch.float64).compute(okada.stations, {**PARAMS, "rake": 60.0})
+    for u, v in zip(out, ref):
+        assert torch.allclose(u, v)
@@ -0,0 +1,38 @@
+import math
+import torch
+from OkadaTorch.inversion import laplacian, solve, sweep, lsqr, cg
+
+
+def _problem():
+    g = torch.Generator().manual_seed(0)
+    L = laplacian(5, 4, n_comp=2)                        # default dtype (float32)
+    G = torch.randn(120, L.shape[1], generator=g, dtype=torch.float64)
+    m = torch.randn(L.shape[1], generator=g, dtype=torch.float64)
+    d = G @ m + 0.1 * torch.randn(120, generator=g, dtype=torch.float64)
+    return G, d, L
+
+
+def test_iterative_solvers_match_solve():
+    G, d, L = _problem()
+    assert L.dtype == torch.get_default_dtype()
+    direct = solve(G, d, L, 0.5)
+    for solver in (lsqr, cg):
+        m, n_iter = solver(G, d, L, 0.5, tol=1e-12)
+        assert isinstance(n_iter, int)
+        assert m.dtype == torch.float64
+        torch.testing.assert_close(m, direct, rtol=1e-8, atol=1e-8)
+    # matrix-free operator
+    m, _ = lsqr((lambda v: G @ v, lambda u: G.T @ u), d, L, 0.5, tol=1e-12)
+    torch.testing.assert_close(m, direct, rtol=1e-8, atol=1e-8)
+
+
+def test_sweep_matches_solve():
+    G, d, L = _problem()
+    sw = sweep(G, d, L, torch.logspace(-2, 2, 30, dtype=torch.float64))
+    for k in (sw.best_abic, sw.best_lcurve):
+        lam = float(sw.lams[k])
+        assert math.isfinite(lam) and lam > 0
+        m = solve(G, d, L, lam)
+        Ld = L.to_dense().to(m)
+        torch.testing.assert_close(sw.residual_norm[k], torch.linalg.norm(G @ m - d), rtol=1e-6, atol=0.0)
+        torch.testing.assert_close(sw.model_norm[k], torch.linalg.norm(Ld @ m), rtol=1e-6, atol=0.0)
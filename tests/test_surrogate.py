@@ -0,0 +1,16 @@
+import torch
+from OkadaTorch.surrogate import fit_surrogate
+
+
+def test_counts_split_surrogate_and_fallback():
+    x = torch.linspace(-20.0, 20.0, 6, dtype=torch.float64)
+    fixed = {"x_fault": 0.0, "y_fault": 0.0, "length": 10.0, "width": 5.0, "strike": 30.0, "rake": 90.0, "slip": 1.0}
+    box = {"depth": (3.0, 8.0), "dip": (30.0, 70.0)}
+    emulator = fit_surrogate({"x": x, "y": 0.5 * x}, fixed, box, n_train=200, n_test=50, degree=3,
+                             generator=torch.Generator().manual_seed(0))
+    theta = torch.tensor([[5.0, 45.0], [4.0, 60.0], [10.0, 45.0]], dtype=torch.float64)
+    out = emulator(theta)
+    assert emulator.counts == {"surrogate": 2, "exact": 1}
+    torch.testing.assert_close(out[2], emulator.exact(theta[2:])[0])
+    emulator(theta[:2], fallback=False)
+    assert emulator.counts == {"surrogate": 4, "exact": 1}
@@ -0,0 +1,47 @@
+import itertools
+import pytest
+import torch
+from OkadaTorch import OkadaWrapper
+from OkadaTorch.syncfree import check_sync_free
+
+
+POINT = dict(x_fault=0.0, y_fault=0.0, depth=5.0, strike=30.0, dip=45.0, rake=90.0, slip=1.0)
+RECTANGLE = dict(POINT, length=10.0, width=5.0)
+
+
+def _inputs(model, internal):
+    x = torch.linspace(-20.0, 20.0, 8, dtype=torch.float64)
+    coords = {"x": x, "y": 0.5 * x}
+    if internal:
+        coords["z"] = -torch.linspace(0.0, 4.0, 8, dtype=torch.float64)
+    params = {k: torch.tensor(v, dtype=torch.float64) for k, v in (POINT if model == "point" else RECTANGLE).items()}
+    return coords, params
+
+
+@pytest.mark.parametrize("model, internal, compute_strain, fault_origin, compute_dtype", list(itertools.product(
+    ["point", "rectangle"], [False, True], [False, True], ["topleft", "center"], [None, torch.float32])))
+def test_kernels_are_sync_free(model, internal, compute_strain, fault_origin, compute_dtype):
+    coords, params = _inputs(model, internal)
+    okada = OkadaWrapper(sync_free=True)
+    u, status = check_sync_free(okada.compute, coords, params, compute_strain, fault_origin=fault_origin,
+                                compute_dtype=compute_dtype, invalid="zero", return_status=True)
+    assert len(u) == (12 if compute_strain else 3)
+    assert all(v.device.type == "meta" and v.shape == coords["x"].shape for v in u)
+
+
+@pytest.mark.parametrize("model", ["point", "rectangle"])
+def test_derivatives_are_sync_free(model):
+    coords, params = _inputs(model, True)
+    okada = OkadaWrapper(sync_free=True)
+    check_sync_free(okada.gradient, coords, params, "slip", compute_strain=False)
+    check_sync_free(okada.hessian, coords, params, "dip", "slip", compute_strain=False)
+
+
+@pytest.mark.parametrize("options", [dict(surface_dispatch=True), dict(invalid="raise"), dict(invalid="drop")])
+def test_synchronising_options_are_rejected(options):
+    coords, params = _inputs("rectangle", True)
+    with pytest.raises(ValueError):
+        OkadaWrapper(sync_free=True).compute(coords, params, **options)
+    # the same options do read values on the host
+    with pytest.raises(AssertionError):
+        check_sync_free(OkadaWrapper().compute, coords, params, **options)
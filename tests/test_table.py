@@ -0,0 +1,58 @@
+import torch
+from OkadaTorch.table import tabulate
+from OkadaTorch.functional import okada, pack
+
+
+GEOMETRY = {"depth": 3.0, "length": 20.0, "width": 10.0, "dip": 40.0}
+
+
+def _stations(n=3000):
+    g = torch.Generator().manual_seed(0)
+    x = (torch.rand(n, generator=g, dtype=torch.float64) - 0.5) * 120
+    y = (torch.rand(n, generator=g, dtype=torch.float64) - 0.5) * 120
+    z = -torch.rand(n, generator=g, dtype=torch.float64) * 12
+    return x, y, z
+
+
+def _relative_error(U, E):
+    ok = torch.isfinite(E).all(0)
+    return ((U - E)[:, ok].abs().amax(1) / E[:, ok].abs().amax(1)).max()
+
+
+def test_lookup_matches_okada():
+    x, y, z = _stations()
+    table = tabulate(GEOMETRY, max_depth=15.0, dtype=torch.float64)
+    params = {"x_fault": 5.0, "y_fault": -3.0, "strike": 30.0, "rake": 70.0, "slip": 2.0}
+    U = torch.stack(table.compute({"x": x, "y": y, "z": z}, params))
+    E = okada(pack({**params, **GEOMETRY}, "rectangle", dtype=torch.float64)[None], x, y, z)[0]
+    assert _relative_error(U, E) < 0.01
+
+
+def test_batched_sources_combined_in_the_table():
+    x, y, _ = _stations(20000)
+    table = tabulate(GEOMETRY, dtype=torch.float64)
+    params = {"x_fault": torch.tensor([5.0, -10.0]), "y_fault": torch.tensor([-3.0, 4.0]),
+              "strike": torch.tensor([30.0, 200.0]), "rake": torch.tensor([70.0, -45.0]), "slip": torch.tensor([2.0, 0.5])}
+    assert 2 * len(table.values) <= x.numel()             # tables of both sources are combined before the lookups
+    U = torch.stack(table.compute({"x": x, "y": y}, params), dim=1)
+    geometry = {k: torch.full((2,), v) for k, v in GEOMETRY.items()}
+    E = okada(pack({**params, **geometry}, "rectangle", dtype=torch.float64), x, y)
+    for b in range(2):
+        assert _relative_error(U[b], E[b]) < 0.01
+        torch.testing.assert_close(U[b], torch.stack(table.compute({"x": x, "y": y}, {k: v[b] for k, v in params.items()})))
+
+
+def test_gradient_matches_inference():
+    x, y, z = _stations(500)
+    table = tabulate(GEOMETRY, max_depth=15.0, dtype=torch.float64)
+    x_fault = torch.tensor(5.0, dtype=torch.float64, requires_grad=True)
+    params = {"x_fault": x_fault, "y_fault": -3.0, "strike": 30.0, "rake": 70.0, "slip": 2.0}
+    U = torch.stack(table.compute({"x": x, "y": y, "z": z}, params))
+    with torch.no_grad():
+        torch.testing.assert_close(U.detach(), torch.stack(table.compute({"x": x, "y": y, "z": z}, params)))
+    (grad,) = torch.autograd.grad(U[2].sum(), x_fault)
+    h = 1e-4
+    with torch.no_grad():
+        up = torch.stack(table.compute({"x": x, "y": y, "z": z}, {**params, "x_fault": 5.0 + h}))[2].sum()
+        down = torch.stack(table.compute({"x": x, "y": y, "z": z}, {**params, "x_fault": 5.0 - h}))[2].sum()
+    torch.testing.assert_close(grad, (up - down) / (2 * h), rtol=1e-4, atol=1e-8)
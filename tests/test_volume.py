@@ -0,0 +1,30 @@
+import pytest
+import torch
+from OkadaTorch.volume import compute_volume
+
+
+PARAMS = dict(x_fault=0.0, y_fault=0.0, depth=5.0, length=10.0, width=5.0,
+              strike=30.0, dip=45.0, rake=90.0, slip=1.0)
+
+
+def test_resume_requires_same_inputs(tmp_path):
+    path = str(tmp_path / "volume.npy")
+    x = torch.linspace(-10.0, 10.0, 4, dtype=torch.float64)
+    z = torch.tensor([-1.0, -2.0], dtype=torch.float64)
+    out = compute_volume(path, x, x, z, PARAMS, tile=(1, 2, 2))
+    first = out.copy()
+
+    # same inputs: every tile is skipped
+    calls = []
+    compute_volume(path, x, x, z, PARAMS, tile=(1, 2, 2), progress=lambda n, m: calls.append(n))
+    assert calls == []
+
+    with pytest.raises(ValueError):
+        compute_volume(path, x, x, z, {**PARAMS, "slip": 2.0}, tile=(1, 2, 2))
+    with pytest.raises(ValueError):
+        compute_volume(path, x, x, z, PARAMS, fault_origin="center", tile=(1, 2, 2))
+    with pytest.raises(ValueError):
+        compute_volume(path, x + 1.0, x, z, PARAMS, tile=(1, 2, 2))
+
+    out = compute_volume(path, x, x, z, {**PARAMS, "slip": 2.0}, tile=(1, 2, 2), resume=False)
+    assert abs(out - 2.0 * first).max() < 1e-12